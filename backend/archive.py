@@ -0,0 +1,80 @@
+"""Background archival of long-answered questions.
+
+Every ``ARCHIVE_INTERVAL`` seconds, questions answered more than
+``ARCHIVE_AFTER_DAYS`` ago are moved, with their answers, from the hot
+tables into the attached archive database. Work is done in batches of
+``ARCHIVE_BATCH_SIZE`` with a short pause between them, so each write
+transaction stays small and regular writes interleave with the job.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from .async_db import archive_answered_batch, get_archive_counts
+from .config import ARCHIVE_AFTER_DAYS, ARCHIVE_INTERVAL, ARCHIVE_BATCH_SIZE, ARCHIVE_BATCH_PAUSE
+
+class Archiver:
+    def __init__(self, after_days: float = ARCHIVE_AFTER_DAYS, interval: float = ARCHIVE_INTERVAL,
+                 batch_size: int = ARCHIVE_BATCH_SIZE, batch_pause: float = ARCHIVE_BATCH_PAUSE):
+        self.after_days = after_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.archived = 0
+        self.runs = 0
+        self.last_run_at = None
+        self.last_run_seconds = None
+        self.last_error = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        if self.after_days <= 0:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as exc:
+                self.last_error = repr(exc)
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> int:
+        cutoff = (datetime.utcnow() - timedelta(days=self.after_days)).isoformat()
+        started = time.perf_counter()
+        moved = 0
+        while True:
+            batch = await archive_answered_batch(cutoff, self.batch_size)
+            moved += batch
+            self.archived += batch
+            if not batch:
+                break
+            await asyncio.sleep(self.batch_pause)
+        self.runs += 1
+        self.last_run_at = time.time()
+        self.last_run_seconds = round(time.perf_counter() - started, 3)
+        return moved
+
+    async def stats(self) -> dict:
+        return {
+            "enabled": self.after_days > 0,
+            "after_days": self.after_days,
+            "archived": self.archived,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": self.last_run_seconds,
+            "last_error": self.last_error,
+            **await get_archive_counts(),
+        }
+
+archiver = Archiver()
@@ -0,0 +1,220 @@
+"""Awaitable data-access API over the engine chosen in storage.py.
+
+Every helper in db.py is blocking, so calling it from an ``async def`` route
+stalls the event loop (and every WebSocket broadcast) for the duration of
+the query. The wrappers below run the same helpers on a dedicated, bounded
+thread pool sized to the connection pool, so a slow query only occupies a
+worker thread. Engines marked ``inline`` (the in-memory one) never block
+and are called directly instead.
+"""
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .storage import engine
+from .config import DB_EXECUTOR_WORKERS, WRITE_COALESCE_MAX_BATCH, WRITE_COALESCE_MAX_DELAY_MS, METRICS_ENABLED
+from .metrics import Counter, Gauge, db_in_flight, db_query_errors, db_query_seconds
+
+_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+async def run_db(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    db_in_flight.inc()
+    try:
+        return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+    finally:
+        db_in_flight.dec()
+
+INLINE = getattr(engine, "inline", False)
+
+def timed(func, name: str | None = None):
+    """Record ``func``'s run time (not its wait for a thread) under its name."""
+    if not METRICS_ENABLED:
+        return func
+    name = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            db_query_errors.inc(name)
+            raise
+        finally:
+            db_query_seconds.observe(time.perf_counter() - started, name)
+    return wrapper
+
+async def call_engine(func, *args, **kwargs):
+    if INLINE:
+        return func(*args, **kwargs)
+    return await run_db(func, *args, **kwargs)
+
+def shutdown_executor():
+    _executor.shutdown(wait=True)
+
+async def stream_db(gen_func, *args, **kwargs):
+    """Drive a blocking generator from the engine on the executor, one step at a time."""
+    gen = gen_func(*args, **kwargs)
+    step = timed(next, gen_func.__name__)
+    try:
+        while True:
+            item = await call_engine(step, gen, None)
+            if item is None:
+                return
+            yield item
+    finally:
+        await call_engine(gen.close)
+
+def _awaitable(func):
+    func = timed(func)
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await call_engine(func, *args, **kwargs)
+    return wrapper
+
+class WriteCoalescer:
+    """Group commit for question/answer inserts.
+
+    Concurrent submissions are queued and flushed together through the
+    engine's run_write_batch, one transaction (and one fsync) per flush. A
+    flush starts once ``max_batch`` ops are queued or the oldest has waited
+    ``max_delay_ms``; ops arriving during a flush form the next batch. Each
+    caller still gets its own row or its own exception. Inline engines have
+    nothing to group, so they bypass the queue.
+    """
+
+    def __init__(self, max_batch: int = WRITE_COALESCE_MAX_BATCH, max_delay_ms: float = WRITE_COALESCE_MAX_DELAY_MS):
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.flushes = 0
+        self.ops = 0
+        self.max_flush_size = 0
+        self.flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self._pending = []
+        self._wakeup: asyncio.Event | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch > 1 and not INLINE
+
+    async def submit(self, name: str, *args):
+        if not self.enabled:
+            return await call_engine(timed(getattr(engine, name)), *args)
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        future = loop.create_future()
+        self._pending.append((name, args, future))
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self._wakeup.set)
+        return await future
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            while self._pending:
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+                started = time.perf_counter()
+                try:
+                    results = await call_engine(run_write_batch, [(name, args) for name, args, _ in batch])
+                except Exception as exc:
+                    results = [exc] * len(batch)
+                elapsed = time.perf_counter() - started
+                self.flushes += 1
+                self.ops += len(batch)
+                self.max_flush_size = max(self.max_flush_size, len(batch))
+                self.flush_seconds += elapsed
+                self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+                for (_, _, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+    async def stop(self):
+        # Flush whatever is still queued, then stop the flusher.
+        if self._task is None:
+            return
+        if self._pending:
+            self._wakeup.set()
+            while self._pending:
+                await asyncio.sleep(self.max_delay)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000,
+            "flushes": self.flushes,
+            "ops": self.ops,
+            "avg_flush_size": round(self.ops / self.flushes, 2) if self.flushes else 0,
+            "max_flush_size": self.max_flush_size,
+            "avg_flush_ms": round(self.flush_seconds / self.flushes * 1000, 3) if self.flushes else 0,
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 3),
+            "queued": len(self._pending),
+        }
+
+run_write_batch = timed(engine.run_write_batch)
+
+write_coalescer = WriteCoalescer()
+Counter("qa_write_coalescer_flushes_total", "Group-commit transactions.", collect=lambda: write_coalescer.flushes)
+Counter("qa_write_coalescer_ops_total", "Inserts written through group commit.", collect=lambda: write_coalescer.ops)
+Gauge("qa_write_coalescer_queued", "Inserts waiting for the next flush.", collect=lambda: len(write_coalescer._pending))
+
+async def create_question(message: str, user_id: int | None = None, username: str | None = None):
+    return await write_coalescer.submit("create_question", message, user_id, username)
+
+async def create_answer(question_id: int, message: str, user_id: int | None = None, username: str | None = None):
+    return await write_coalescer.submit("create_answer", question_id, message, user_id, username)
+
+init_db = _awaitable(engine.init_db)
+get_user_by_email = _awaitable(engine.get_user_by_email)
+get_user_by_username = _awaitable(engine.get_user_by_username)
+get_user_by_id = _awaitable(engine.get_user_by_id)
+create_user = _awaitable(engine.create_user)
+update_user_password = _awaitable(engine.update_user_password)
+update_user_role = _awaitable(engine.update_user_role)
+get_all_questions = _awaitable(engine.get_all_questions)
+get_questions_page = _awaitable(engine.get_questions_page)
+get_question_by_id = _awaitable(engine.get_question_by_id)
+update_question_status = _awaitable(engine.update_question_status)
+update_questions_status = _awaitable(engine.update_questions_status)
+get_answers_for_question = _awaitable(engine.get_answers_for_question)
+get_answers_for_questions = _awaitable(engine.get_answers_for_questions)
+get_all_questions_with_answers = _awaitable(engine.get_all_questions_with_answers)
+search_questions = _awaitable(engine.search_questions)
+get_data_version = _awaitable(engine.get_data_version)
+get_changes_since = _awaitable(engine.get_changes_since)
+compact_changes = _awaitable(engine.compact_changes)
+claim_webhooks = _awaitable(engine.claim_webhooks)
+complete_webhooks = _awaitable(engine.complete_webhooks)
+fail_webhooks = _awaitable(engine.fail_webhooks)
+get_webhook_outbox_counts = _awaitable(engine.get_webhook_outbox_counts)
+archive_answered_batch = _awaitable(engine.archive_answered_batch)
+get_archive_counts = _awaitable(engine.get_archive_counts)
+import_questions = _awaitable(engine.import_questions)
+log_resync = _awaitable(engine.log_resync)
+get_stats = _awaitable(engine.get_stats)
+get_user_stats = _awaitable(engine.get_user_stats)
+rebuild_stats = _awaitable(engine.rebuild_stats)
@@ -0,0 +1,104 @@
+"""Small in-process caches for the authentication and feed hot paths."""
+import threading
+import time
+from collections import OrderedDict
+
+from .config import USER_CACHE_SIZE, USER_CACHE_TTL, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL, FEED_CACHE_SIZE, FEED_CACHE_TTL
+
+class TTLCache:
+    """LRU cache whose entries also expire after ``ttl`` seconds.
+
+    Lookups happen on the event loop while invalidations come from the DB
+    executor threads, so every operation takes a lock.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+class VersionedCache(TTLCache):
+    """TTLCache whose keys start with a data version that only goes up.
+
+    An entry for an older version can never be hit again, so the first
+    lookup or store under a newer version drops all of them at once rather
+    than leaving them to LRU eviction, and a store for a stale version (a
+    slow request that read before a write) is ignored.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize, ttl)
+        self.version = None
+        # Reentrant so set() can check the version and store atomically.
+        self._lock = threading.RLock()
+
+    def _advance(self, version) -> bool:
+        with self._lock:
+            if self.version is None or version > self.version:
+                self.version = version
+                self.evictions += len(self._data)
+                self._data.clear()
+            return version == self.version
+
+    def get(self, key, default=None):
+        self._advance(key[0])
+        return super().get(key, default)
+
+    def set(self, key, value, ttl: float | None = None):
+        with self._lock:
+            if self._advance(key[0]):
+                super().set(key, value, ttl)
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self.version = None
+
+# user_id -> users row as a dict
+user_cache = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+# raw JWT -> user_id, so repeat requests skip signature verification
+token_cache = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+# (data_version, query params) -> serialized GET /questions body and headers;
+# only the current version's entries are kept
+feed_cache = VersionedCache(FEED_CACHE_SIZE, FEED_CACHE_TTL)
@@ -0,0 +1,67 @@
+"""Periodic compaction of the change log.
+
+Every ``CHANGE_LOG_COMPACT_INTERVAL`` seconds, all but the newest
+``CHANGE_LOG_RETENTION`` changes are deleted and the resync floor is
+raised to match. Clients resuming from below the floor are told to resync.
+"""
+import asyncio
+import logging
+import time
+
+from .async_db import compact_changes
+from .config import CHANGE_LOG_RETENTION, CHANGE_LOG_COMPACT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class ChangeLogCompactor:
+    def __init__(self, keep: int = CHANGE_LOG_RETENTION, interval: float = CHANGE_LOG_COMPACT_INTERVAL):
+        self.keep = keep
+        self.interval = interval
+        self.compacted = 0
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at = None
+        self.last_error = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as exc:
+                # A failing compaction lets the log grow without bound, so say so.
+                logger.exception("change log compaction failed")
+                self.failures += 1
+                self.last_error = repr(exc)
+
+    async def run_once(self) -> int:
+        deleted = await compact_changes(self.keep)
+        self.compacted += deleted
+        self.runs += 1
+        self.last_run_at = time.time()
+        return deleted
+
+    def stats(self) -> dict:
+        return {
+            "keep": self.keep,
+            "compacted": self.compacted,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at,
+            "last_error": self.last_error,
+        }
+
+compactor = ChangeLogCompactor()
@@ -10,3 +10,112 @@ JWT_SECRET = os.getenv("JWT_SECRET", "your-super-secret-jwt-key")
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./qa_dashboard.db")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-20000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+# Set to false on large databases to apply migrations ahead of time with
+# `python -m backend.migrations apply` instead of during startup.
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", str(DB_POOL_SIZE)))
+# Rows fetched per fetchmany() when exporting, and questions per import transaction.
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+# Group commit for question/answer inserts; a max batch of 1 disables it.
+WRITE_COALESCE_MAX_BATCH = int(os.getenv("WRITE_COALESCE_MAX_BATCH", "64"))
+WRITE_COALESCE_MAX_DELAY_MS = float(os.getenv("WRITE_COALESCE_MAX_DELAY_MS", "2"))
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_CONCURRENCY = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", str(PASSWORD_HASH_WORKERS)))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "30"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+FEED_CACHE_SIZE = int(os.getenv("FEED_CACHE_SIZE", "256"))
+FEED_CACHE_TTL = float(os.getenv("FEED_CACHE_TTL", "300"))
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+# What to do when a client's queue is full: "drop_oldest" or "disconnect"
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")
+# Server pings every interval; a socket that sends nothing (not even a pong)
+# for WS_IDLE_TIMEOUT seconds is closed.
+WS_HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", "25"))
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "75"))
+# Concurrent sockets per process, per authenticated user and per anonymous IP; 0 = no limit.
+WS_MAX_CONNECTIONS = int(os.getenv("WS_MAX_CONNECTIONS", "10000"))
+WS_MAX_CONNECTIONS_PER_USER = int(os.getenv("WS_MAX_CONNECTIONS_PER_USER", "5"))
+WS_MAX_CONNECTIONS_PER_IP = int(os.getenv("WS_MAX_CONNECTIONS_PER_IP", "50"))
+# Clients that subscribe with "coalesce": true get events that arrive within
+# this window sent as one "batch" frame.
+WS_COALESCE_WINDOW_MS = float(os.getenv("WS_COALESCE_WINDOW_MS", "50"))
+WS_MAX_SUBSCRIBED_QUESTIONS = int(os.getenv("WS_MAX_SUBSCRIBED_QUESTIONS", "500"))
+# Server-Sent Events (GET /questions/events): per-client buffer, keep-alive
+# comment interval (seconds) and the reconnect delay suggested to browsers (ms).
+# SSE streams count towards the WS_MAX_CONNECTIONS* limits.
+SSE_BUFFER_SIZE = int(os.getenv("SSE_BUFFER_SIZE", "256"))
+SSE_KEEPALIVE_INTERVAL = float(os.getenv("SSE_KEEPALIVE_INTERVAL", "15"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+# "local" for a single worker, "sqlite" to share broadcasts across uvicorn workers
+EVENT_BUS = os.getenv("EVENT_BUS", "local")
+EVENT_BUS_PATH = os.getenv("EVENT_BUS_PATH", "qa_events.db")
+EVENT_BUS_POLL_INTERVAL = float(os.getenv("EVENT_BUS_POLL_INTERVAL", "0.05"))
+EVENT_BUS_RETENTION_SECONDS = float(os.getenv("EVENT_BUS_RETENTION_SECONDS", "600"))
+# How long a broadcast waits for a lower change-log seq that was published after it.
+EVENT_BUS_REORDER_WINDOW_MS = float(os.getenv("EVENT_BUS_REORDER_WINDOW_MS", "200"))
+
+WEBHOOK_CONCURRENCY = int(os.getenv("WEBHOOK_CONCURRENCY", "4"))
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "1"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+WEBHOOK_BACKOFF_BASE = float(os.getenv("WEBHOOK_BACKOFF_BASE", "1"))
+WEBHOOK_BACKOFF_MAX = float(os.getenv("WEBHOOK_BACKOFF_MAX", "300"))
+WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "5"))
+WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", "1"))
+
+# Change log: how many entries to keep, how often to compact, and how far
+# behind a resuming client may be before it is told to resync.
+CHANGE_LOG_RETENTION = int(os.getenv("CHANGE_LOG_RETENTION", "10000"))
+CHANGE_LOG_COMPACT_INTERVAL = float(os.getenv("CHANGE_LOG_COMPACT_INTERVAL", "300"))
+CHANGES_MAX_REPLAY = int(os.getenv("CHANGES_MAX_REPLAY", "1000"))
+
+# Token-bucket limits as "<requests>/<seconds>", keyed by user_id when the
+# request carries a valid token and by client IP otherwise.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+RATE_LIMIT_LOGIN = os.getenv("RATE_LIMIT_LOGIN", "10/60")
+RATE_LIMIT_REGISTER = os.getenv("RATE_LIMIT_REGISTER", "5/300")
+RATE_LIMIT_QUESTIONS = os.getenv("RATE_LIMIT_QUESTIONS", "30/60")
+RATE_LIMIT_ANSWERS = os.getenv("RATE_LIMIT_ANSWERS", "60/60")
+RATE_LIMIT_ADMIN = os.getenv("RATE_LIMIT_ADMIN", "300/60")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# Use the first X-Forwarded-For address as the client IP (only behind a trusted proxy).
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() in ("1", "true", "yes")
+# Reject new HTTP requests with 503 once this many are in flight; 0 disables.
+MAX_IN_FLIGHT_REQUESTS = int(os.getenv("MAX_IN_FLIGHT_REQUESTS", "512"))
+
+# Answered questions older than this move to the archive file; 0 disables archival.
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+# Defaults to "<database>_archive.db" next to the main database.
+ARCHIVE_DATABASE_PATH = os.getenv("ARCHIVE_DATABASE_PATH", "")
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", "0.05"))
+
+# Dashboard stats: at most one stats_update push per interval (only when data
+# changed), and how often the counters are checked against a full recount.
+STATS_PUSH_INTERVAL = float(os.getenv("STATS_PUSH_INTERVAL", "1"))
+STATS_REBUILD_INTERVAL = float(os.getenv("STATS_REBUILD_INTERVAL", "3600"))
+STATS_TOP_USERS = int(os.getenv("STATS_TOP_USERS", "10"))
+
+# Prometheus metrics at GET /metrics. Disabling also skips request and
+# query timing.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# How often the event-loop lag probe wakes; 0 disables it.
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
@@ -1,80 +1,190 @@
+import json
+import os
+import queue
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
 from datetime import datetime
-import bcrypt
-from .config import ADMIN_DEFAULT_EMAIL, ADMIN_DEFAULT_PASSWORD
+from .cache import user_cache
+from .migrations import SCHEMA_VERSION, STATS_RECOUNT, USER_ACTIVITY, migrate, schema_version, init_archive, recount_stats
+from .config import (
+    DATABASE_URL, WEBHOOK_URL, MIGRATE_ON_STARTUP, ARCHIVE_DATABASE_PATH, DB_POOL_SIZE, DB_POOL_TIMEOUT, SQLITE_JOURNAL_MODE,
+    EXPORT_BATCH_SIZE, SQLITE_SYNCHRONOUS, SQLITE_CACHE_SIZE, SQLITE_MMAP_SIZE, SQLITE_BUSY_TIMEOUT_MS, SQLITE_STATEMENT_CACHE,
+)
 
-DATABASE_PATH = "qa_dashboard.db"
+def sqlite_path(url: str) -> str | None:
+    """The file in a ``sqlite:///relative.db`` or ``sqlite:////absolute.db`` URL."""
+    scheme, _, rest = url.partition("://")
+    return rest[1:] if scheme == "sqlite" and rest.startswith("/") else None
 
-def get_connection():
-    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+DATABASE_PATH = sqlite_path(DATABASE_URL) or "qa_dashboard.db"
+# Stay under SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds (default 999).
+SQLITE_MAX_PARAMS = 900
+
+# Feed ordering: escalated first, then newest first. The rank expression must
+# match idx_questions_feed exactly so SQLite can walk the index instead of
+# sorting in a temp B-tree.
+FEED_RANK = "CASE WHEN q.status = 'Escalated' THEN 0 ELSE 1 END"
+
+STATUS_WEBHOOK_EVENTS = {"Answered": "question_answered", "Escalated": "question_escalated"}
+
+QUESTION_COLUMNS = "question_id, user_id, message, timestamp, status, answered_at"
+ANSWER_COLUMNS = "answer_id, question_id, user_id, message, timestamp"
+
+# Read sources for include_archived. A row can briefly exist in both stores
+# while it is being archived; the hot copy wins.
+ALL_QUESTIONS = f'''(
+    SELECT {QUESTION_COLUMNS} FROM main.questions
+    UNION ALL
+    SELECT {QUESTION_COLUMNS} FROM archive.questions
+    WHERE question_id NOT IN (SELECT question_id FROM main.questions)
+)'''
+ALL_ANSWERS = f'''(
+    SELECT {ANSWER_COLUMNS} FROM main.answers
+    UNION ALL
+    SELECT {ANSWER_COLUMNS} FROM archive.answers
+    WHERE answer_id NOT IN (SELECT answer_id FROM main.answers)
+)'''
+
+def archive_path(path: str | None = None) -> str:
+    return ARCHIVE_DATABASE_PATH or os.path.splitext(path or DATABASE_PATH)[0] + "_archive.db"
+
+def get_connection(path: str | None = None, archive: str | None = None):
+    """Open a tuned connection; ``archive`` is attached as "archive" if given.
+
+    Only the app's own database has an archive. Other files opened through
+    here (the event bus, the migrations CLI) leave it out so no stray
+    ``_archive.db`` is created next to them.
+    """
+    conn = sqlite3.connect(
+        path or DATABASE_PATH,
+        check_same_thread=False,
+        timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+        cached_statements=SQLITE_STATEMENT_CACHE,
+    )
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = {int(SQLITE_CACHE_SIZE)}")
+    conn.execute(f"PRAGMA mmap_size = {int(SQLITE_MMAP_SIZE)}")
+    conn.execute(f"PRAGMA busy_timeout = {int(SQLITE_BUSY_TIMEOUT_MS)}")
+    if archive:
+        conn.execute("ATTACH DATABASE ? AS archive", (archive,))
+        conn.execute(f"PRAGMA archive.journal_mode = {SQLITE_JOURNAL_MODE}")
+        conn.execute(f"PRAGMA archive.synchronous = {SQLITE_SYNCHRONOUS}")
+        init_archive(conn)
     return conn
 
+class ConnectionPool:
+    """A bounded pool of long-lived SQLite connections.
+
+    Connections are opened lazily up to ``size`` and handed out LIFO so the
+    warmest page cache is reused first. Each connection keeps its own
+    prepared-statement cache across requests.
+    """
+
+    def __init__(self, path: str, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return get_connection(self.path, archive_path(self.path))
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection available after {self.timeout}s")
+
+    def release(self, conn, discard: bool = False):
+        if discard or self._closed:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                # Cheap unless the planner saw enough new data to want fresh stats.
+                conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+_pool: ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    pool = _pool
+    if pool is None or pool.path != DATABASE_PATH:
+        with _pool_lock:
+            if _pool is None or _pool.path != DATABASE_PATH:
+                if _pool is not None:
+                    _pool.close()
+                _pool = ConnectionPool(DATABASE_PATH)
+            pool = _pool
+    return pool
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
 @contextmanager
 def get_db():
-    conn = get_connection()
+    pool = get_pool()
+    conn = pool.acquire()
+    discard = False
     try:
         yield conn
         conn.commit()
     except Exception:
-        conn.rollback()
+        try:
+            conn.rollback()
+        except sqlite3.Error:
+            discard = True
         raise
     finally:
-        conn.close()
-
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+        pool.release(conn, discard=discard)
 
 def init_db():
+    # Fast path: a current schema costs one PRAGMA read on startup.
     with get_db() as conn:
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                email TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                role TEXT DEFAULT 'user' CHECK(role IN ('guest', 'user', 'admin'))
+        if schema_version(conn) >= SCHEMA_VERSION:
+            return
+        if not MIGRATE_ON_STARTUP:
+            raise RuntimeError(
+                f"Database schema is at version {schema_version(conn)}, expected {SCHEMA_VERSION}; "
+                "run `python -m backend.migrations apply`"
             )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS questions (
-                question_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                message TEXT NOT NULL,
-                timestamp TEXT NOT NULL,
-                status TEXT DEFAULT 'Pending' CHECK(status IN ('Pending', 'Escalated', 'Answered')),
-                FOREIGN KEY (user_id) REFERENCES users(user_id)
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS answers (
-                answer_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                question_id INTEGER NOT NULL,
-                user_id INTEGER,
-                message TEXT NOT NULL,
-                timestamp TEXT NOT NULL,
-                FOREIGN KEY (question_id) REFERENCES questions(question_id),
-                FOREIGN KEY (user_id) REFERENCES users(user_id)
-            )
-        ''')
-        
-        cursor.execute("SELECT * FROM users WHERE email = ?", (ADMIN_DEFAULT_EMAIL,))
-        if not cursor.fetchone():
-            hashed_password = hash_password(ADMIN_DEFAULT_PASSWORD)
-            cursor.execute(
-                "INSERT INTO users (username, email, password, role) VALUES (?, ?, ?, ?)",
-                ("admin", ADMIN_DEFAULT_EMAIL, hashed_password, "admin")
-            )
-        
-        conn.commit()
+        migrate(conn)
 
 def get_user_by_email(email: str):
     with get_db() as conn:
@@ -94,16 +204,27 @@ def get_user_by_id(user_id: int):
         cursor.execute("SELECT * FROM users WHERE user_id = ?", (user_id,))
         return cursor.fetchone()
 
-def create_user(username: str, email: str, password: str, role: str = "user"):
-    hashed_password = hash_password(password)
+def create_user(username: str, email: str, password_hash: str, role: str = "user"):
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute(
             "INSERT INTO users (username, email, password, role) VALUES (?, ?, ?, ?)",
-            (username, email, hashed_password, role)
+            (username, email, password_hash, role)
         )
         return cursor.lastrowid
 
+def update_user_password(user_id: int, password_hash: str):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE users SET password = ? WHERE user_id = ?", (password_hash, user_id))
+    user_cache.invalidate(user_id)
+
+def update_user_role(user_id: int, role: str):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE users SET role = ? WHERE user_id = ?", (role, user_id))
+    user_cache.invalidate(user_id)
+
 def get_all_questions():
     with get_db() as conn:
         cursor = conn.cursor()
@@ -113,31 +234,262 @@ def get_all_questions():
             LEFT JOIN users u ON q.user_id = u.user_id 
             ORDER BY 
                 CASE WHEN q.status = 'Escalated' THEN 0 ELSE 1 END,
-                q.timestamp DESC
+                q.timestamp DESC,
+                q.question_id DESC
         ''')
         return cursor.fetchall()
 
+def _feed_segment(cursor, where: str, params: list, after, limit: int, source: str = "questions"):
+    if after:
+        where += " AND (q.timestamp, q.question_id) < (?, ?)"
+        params = params + [after[1], after[2]]
+    cursor.execute(f'''
+        SELECT q.*, u.username, {FEED_RANK} AS feed_rank
+        FROM {source} q 
+        LEFT JOIN users u ON q.user_id = u.user_id 
+        WHERE {where}
+        ORDER BY q.timestamp DESC, q.question_id DESC
+        LIMIT ?
+    ''', params + [limit])
+    return cursor.fetchall()
+
+def get_questions_page(limit: int, after: tuple | None = None, status: str | None = None, include_archived: bool = False):
+    """Keyset-paginate the feed.
+
+    ``after`` is the (feed_rank, timestamp, question_id) key of the last row
+    of the previous page. Returns the rows and the key to resume from, or
+    None when the feed is exhausted. Archived questions are only read when
+    ``include_archived`` is set.
+    """
+    source = ALL_QUESTIONS if include_archived else "questions"
+    with get_db() as conn:
+        cursor = conn.cursor()
+        if status:
+            rows = _feed_segment(cursor, "q.status = ?", [status], after, limit + 1, source)
+        else:
+            # Walk the escalated segment, then the rest, each straight off the index.
+            start_rank = after[0] if after else 0
+            rows = []
+            for rank in range(start_rank, 2):
+                rows += _feed_segment(cursor, f"{FEED_RANK} = ?", [rank], after if rank == start_rank else None, limit + 1 - len(rows), source)
+                if len(rows) > limit:
+                    break
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, (last["feed_rank"], last["timestamp"], last["question_id"])
+
 def get_question_by_id(question_id: int):
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM questions WHERE question_id = ?", (question_id,))
         return cursor.fetchone()
 
-def create_question(message: str, user_id: int | None = None):
-    timestamp = datetime.utcnow().isoformat()
+def _bump_data_version(cursor):
+    # Every question/answer write bumps this in its own transaction; cached
+    # feed responses are keyed on it.
+    cursor.execute("UPDATE meta SET value = value + 1 WHERE key = 'data_version'")
+
+def get_data_version() -> int:
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO questions (user_id, message, timestamp, status) VALUES (?, ?, ?, ?)",
-            (user_id, message, timestamp, "Pending")
-        )
-        return {"question_id": cursor.lastrowid, "user_id": user_id, "message": message, "timestamp": timestamp, "status": "Pending"}
+        cursor.execute("SELECT value FROM meta WHERE key = 'data_version'")
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+def _answer_dict(answer, username: str | None = None) -> dict:
+    return {
+        "answer_id": answer["answer_id"],
+        "question_id": answer["question_id"],
+        "user_id": answer["user_id"],
+        "username": username or (answer["username"] if "username" in answer.keys() else None),
+        "message": answer["message"],
+        "timestamp": answer["timestamp"],
+    }
+
+def _log_change(cursor, change_type: str, question_id: int, data: dict) -> dict:
+    """Append to the change log in the caller's transaction.
+
+    Returns the message to broadcast; its ``seq`` lets clients resume from
+    the log after a disconnect.
+    """
+    cursor.execute(
+        "INSERT INTO changes (type, question_id, data, created_at) VALUES (?, ?, ?, ?)",
+        (change_type, question_id, json.dumps(data), time.time())
+    )
+    return {"type": change_type, "seq": cursor.lastrowid, "data": data}
+
+def get_changes_since(since: int, limit: int):
+    """Return (changes, floor, latest) for a client that has seen up to ``since``.
+
+    ``floor`` is the highest seq already compacted away; a client behind it
+    has to resync from the full feed.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM meta WHERE key = 'changes_floor'")
+        floor = cursor.fetchone()[0]
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'")
+        row = cursor.fetchone()
+        latest = row[0] if row else 0
+        cursor.execute("SELECT seq, type, data FROM changes WHERE seq > ? ORDER BY seq LIMIT ?", (since, limit))
+        changes = [{"type": row["type"], "seq": row["seq"], "data": json.loads(row["data"])} for row in cursor.fetchall()]
+    return changes, floor, latest
+
+def compact_changes(keep: int):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'")
+        row = cursor.fetchone()
+        cutoff = (row[0] if row else 0) - keep
+        if cutoff <= 0:
+            return 0
+        cursor.execute("DELETE FROM changes WHERE seq <= ?", (cutoff,))
+        deleted = cursor.rowcount
+        cursor.execute("UPDATE meta SET value = MAX(value, ?) WHERE key = 'changes_floor'", (cutoff,))
+        return deleted
+
+def _enqueue_webhook(cursor, event: str, data: dict):
+    # Written in the caller's transaction, so an event exists iff its change does.
+    if not WEBHOOK_URL:
+        return
+    now = time.time()
+    cursor.execute(
+        "INSERT INTO webhook_outbox (event, payload, created_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+        (event, json.dumps(data), now, now)
+    )
+
+def _insert_question(cursor, message: str, user_id: int | None = None, username: str | None = None):
+    timestamp = datetime.utcnow().isoformat()
+    cursor.execute(
+        "INSERT INTO questions (user_id, message, timestamp, status) VALUES (?, ?, ?, ?)",
+        (user_id, message, timestamp, "Pending")
+    )
+    question = {"question_id": cursor.lastrowid, "user_id": user_id, "message": message, "timestamp": timestamp, "status": "Pending"}
+    _bump_data_version(cursor)
+    _enqueue_webhook(cursor, "new_question", {
+        "question_id": question["question_id"],
+        "message": message,
+        "username": username,
+        "timestamp": timestamp
+    })
+    question["change"] = _log_change(cursor, "new_question", question["question_id"], {**question, "username": username, "answers": []})
+    return question
+
+def create_question(message: str, user_id: int | None = None, username: str | None = None):
+    with get_db() as conn:
+        return _insert_question(conn.cursor(), message, user_id, username)
 
 def update_question_status(question_id: int, status: str):
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute("UPDATE questions SET status = ? WHERE question_id = ?", (status, question_id))
-    return get_question_by_id(question_id)
+        # The change carries the old status too, so subscribers to either
+        # side of the transition get it; read it under the write lock.
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT status FROM questions WHERE question_id = ?", (question_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        previous_status = row[0]
+        # answered_at keeps the first time a question was answered; any other
+        # status clears it so the question is no longer archivable.
+        cursor.execute('''
+            UPDATE questions
+            SET status = ?, answered_at = CASE WHEN ? = 'Answered' THEN COALESCE(answered_at, ?) END
+            WHERE question_id = ?
+        ''', (status, status, datetime.utcnow().isoformat(), question_id))
+        _bump_data_version(cursor)
+        cursor.execute('''
+            SELECT q.*, u.username 
+            FROM questions q 
+            LEFT JOIN users u ON q.user_id = u.user_id 
+            WHERE q.question_id = ?
+        ''', (question_id,))
+        question = dict(cursor.fetchone())
+        cursor.execute('''
+            SELECT a.*, u.username 
+            FROM answers a 
+            LEFT JOIN users u ON a.user_id = u.user_id 
+            WHERE a.question_id = ?
+            ORDER BY a.timestamp ASC
+        ''', (question_id,))
+        question["answers"] = [_answer_dict(a) for a in cursor.fetchall()]
+        if status in STATUS_WEBHOOK_EVENTS:
+            _enqueue_webhook(cursor, STATUS_WEBHOOK_EVENTS[status], {
+                "question_id": question_id,
+                "message": question["message"],
+                "timestamp": question["timestamp"]
+            })
+        question["change"] = _log_change(cursor, "status_update", question_id, {**question, "previous_status": previous_status})
+        return question
+
+def update_questions_status(question_ids, status: str):
+    """Set ``status`` on many questions in one transaction.
+
+    Returns the updated questions (with usernames and answers, in request
+    order), the ids that do not exist, and one batched status_update change
+    covering the whole set (None if nothing matched). Webhook receivers get
+    the usual per-question event for each updated question.
+    """
+    ids = list(dict.fromkeys(question_ids))
+    now = datetime.utcnow().isoformat()
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        found = set()
+        previous = {}
+        rows = {}
+        answers = {}
+        for start in range(0, len(ids), SQLITE_MAX_PARAMS):
+            chunk = ids[start:start + SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f"SELECT question_id, status FROM questions WHERE question_id IN ({placeholders})", chunk)
+            previous.update(cursor.fetchall())
+            cursor.execute(f'''
+                UPDATE questions
+                SET status = ?, answered_at = CASE WHEN ? = 'Answered' THEN COALESCE(answered_at, ?) END
+                WHERE question_id IN ({placeholders})
+                RETURNING question_id
+            ''', [status, status, now] + chunk)
+            found.update(row[0] for row in cursor.fetchall())
+            cursor.execute(f'''
+                SELECT q.*, u.username 
+                FROM questions q 
+                LEFT JOIN users u ON q.user_id = u.user_id 
+                WHERE q.question_id IN ({placeholders})
+            ''', chunk)
+            rows.update((row["question_id"], row) for row in cursor.fetchall())
+            cursor.execute(f'''
+                SELECT a.*, u.username 
+                FROM answers a 
+                LEFT JOIN users u ON a.user_id = u.user_id 
+                WHERE a.question_id IN ({placeholders})
+                ORDER BY a.question_id, a.timestamp ASC
+            ''', chunk)
+            _group_answers(cursor.fetchall(), answers)
+        questions = []
+        for question_id in ids:
+            if question_id in found:
+                question = dict(rows[question_id])
+                question["answers"] = [_answer_dict(a) for a in answers.get(question_id, [])]
+                questions.append(question)
+        not_found = [question_id for question_id in ids if question_id not in found]
+        if not questions:
+            return {"questions": [], "not_found": not_found, "change": None}
+        _bump_data_version(cursor)
+        if status in STATUS_WEBHOOK_EVENTS:
+            # The same event, with the same payload, as the single-question routes.
+            for q in questions:
+                _enqueue_webhook(cursor, STATUS_WEBHOOK_EVENTS[status], {
+                    "question_id": q["question_id"],
+                    "message": q["message"],
+                    "timestamp": q["timestamp"]
+                })
+        change = _log_change(cursor, "status_update", None, [
+            {**q, "previous_status": previous[q["question_id"]]} for q in questions
+        ])
+        return {"questions": questions, "not_found": not_found, "change": change}
 
 def get_answers_for_question(question_id: int):
     with get_db() as conn:
@@ -151,12 +503,440 @@ def get_answers_for_question(question_id: int):
         ''', (question_id,))
         return cursor.fetchall()
 
-def create_answer(question_id: int, message: str, user_id: int | None = None):
+def _group_answers(rows, grouped: dict):
+    for row in rows:
+        grouped.setdefault(row["question_id"], []).append(row)
+    return grouped
+
+def get_answers_for_questions(question_ids, include_archived: bool = False):
+    grouped = {question_id: [] for question_id in question_ids}
+    ids = list(grouped)
+    if not ids:
+        return grouped
+    source = ALL_ANSWERS if include_archived else "answers"
+    with get_db() as conn:
+        cursor = conn.cursor()
+        for start in range(0, len(ids), SQLITE_MAX_PARAMS):
+            chunk = ids[start:start + SQLITE_MAX_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(f'''
+                SELECT a.*, u.username 
+                FROM {source} a 
+                LEFT JOIN users u ON a.user_id = u.user_id 
+                WHERE a.question_id IN ({placeholders})
+                ORDER BY a.question_id, a.timestamp ASC
+            ''', chunk)
+            _group_answers(cursor.fetchall(), grouped)
+    return grouped
+
+def get_all_questions_with_answers(include_archived: bool = False):
+    """Return every question and a question_id -> answers map using two queries."""
+    questions_source, answers_source = (ALL_QUESTIONS, ALL_ANSWERS) if include_archived else ("questions", "answers")
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT q.*, u.username 
+            FROM {questions_source} q 
+            LEFT JOIN users u ON q.user_id = u.user_id 
+            ORDER BY 
+                CASE WHEN q.status = 'Escalated' THEN 0 ELSE 1 END,
+                q.timestamp DESC,
+                q.question_id DESC
+        ''')
+        questions = cursor.fetchall()
+        cursor.execute(f'''
+            SELECT a.*, u.username 
+            FROM {answers_source} a 
+            LEFT JOIN users u ON a.user_id = u.user_id 
+            ORDER BY a.question_id, a.timestamp ASC
+        ''')
+        answers = _group_answers(cursor.fetchall(), {})
+    return questions, answers
+
+def _insert_answer(cursor, question_id: int, message: str, user_id: int | None = None, username: str | None = None):
     timestamp = datetime.utcnow().isoformat()
+    cursor.execute(
+        "INSERT INTO answers (question_id, user_id, message, timestamp) VALUES (?, ?, ?, ?)",
+        (question_id, user_id, message, timestamp)
+    )
+    answer = {"answer_id": cursor.lastrowid, "question_id": question_id, "user_id": user_id, "message": message, "timestamp": timestamp}
+    _bump_data_version(cursor)
+    _enqueue_webhook(cursor, "new_answer", {
+        "answer_id": answer["answer_id"],
+        "question_id": question_id,
+        "message": message,
+        "username": username,
+        "timestamp": timestamp
+    })
+    answer["change"] = _log_change(cursor, "new_answer", question_id, {"question_id": question_id, "answer": _answer_dict(answer, username)})
+    return answer
+
+def create_answer(question_id: int, message: str, user_id: int | None = None, username: str | None = None):
+    with get_db() as conn:
+        return _insert_answer(conn.cursor(), question_id, message, user_id, username)
+
+WRITE_OPS = {"create_question": _insert_question, "create_answer": _insert_answer}
+
+def run_write_batch(ops):
+    """Apply queued writes in one transaction (group commit).
+
+    ``ops`` is a list of (name, args) for WRITE_OPS. Each op runs under its
+    own savepoint, so a failing op is rolled back alone and reported in its
+    slot as the exception; the rest commit together with a single fsync.
+    """
+    results = []
     with get_db() as conn:
         cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO answers (question_id, user_id, message, timestamp) VALUES (?, ?, ?, ?)",
-            (question_id, user_id, message, timestamp)
+        cursor.execute("BEGIN IMMEDIATE")
+        for name, args in ops:
+            cursor.execute("SAVEPOINT write_op")
+            try:
+                results.append(WRITE_OPS[name](cursor, *args))
+            except Exception as exc:
+                cursor.execute("ROLLBACK TO write_op")
+                results.append(exc)
+            cursor.execute("RELEASE write_op")
+    return results
+
+def archive_answered_batch(cutoff: str, limit: int) -> int:
+    """Move up to ``limit`` questions answered before ``cutoff``, with their
+    answers, from the hot tables to the archive. Returns how many moved.
+
+    Commits across attached WAL databases are not atomic, so the rows are
+    first committed to the archive and only then deleted from the hot
+    tables. A crash in between leaves a duplicate that the next run
+    overwrites or removes, never a lost row.
+    """
+    limit = min(limit, SQLITE_MAX_PARAMS)
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT question_id FROM main.questions
+            WHERE status = 'Answered' AND answered_at < ?
+            ORDER BY answered_at
+            LIMIT ?
+        ''', (cutoff, limit))
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return 0
+        placeholders = ",".join("?" * len(ids))
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO archive.questions ({QUESTION_COLUMNS})
+            SELECT {QUESTION_COLUMNS} FROM main.questions WHERE question_id IN ({placeholders})
+        ''', ids)
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO archive.answers ({ANSWER_COLUMNS})
+            SELECT {ANSWER_COLUMNS} FROM main.answers WHERE question_id IN ({placeholders})
+        ''', ids)
+        conn.commit()
+
+        # Skip anything reopened (or reopened and answered again) since the
+        # copy, and keep any answer posted after it in the hot table. The
+        # archive copies of skipped questions are dropped in the same
+        # transaction, so they are not counted as archived.
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute(f'''
+            DELETE FROM main.questions
+            WHERE question_id IN ({placeholders}) AND status = 'Answered'
+              AND answered_at = (SELECT a.answered_at FROM archive.questions a WHERE a.question_id = main.questions.question_id)
+            RETURNING question_id
+        ''', ids)
+        moved = [row[0] for row in cursor.fetchall()]
+        skipped = sorted(set(ids) - set(moved))
+        if skipped:
+            placeholders = ",".join("?" * len(skipped))
+            cursor.execute(f"DELETE FROM archive.answers WHERE question_id IN ({placeholders})", skipped)
+            cursor.execute(f"DELETE FROM archive.questions WHERE question_id IN ({placeholders})", skipped)
+        if moved:
+            placeholders = ",".join("?" * len(moved))
+            cursor.execute(f'''
+                DELETE FROM main.answers
+                WHERE question_id IN ({placeholders})
+                  AND answer_id IN (SELECT answer_id FROM archive.answers)
+            ''', moved)
+            cursor.execute("UPDATE stats SET value = value + ? WHERE key = 'archived_questions'", (len(moved),))
+            _bump_data_version(cursor)
+        return len(moved)
+
+def get_archive_counts() -> dict:
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT (SELECT COUNT(*) FROM main.questions), (SELECT COUNT(*) FROM archive.questions)
+        ''')
+        hot, archived = cursor.fetchone()
+    return {"hot_questions": hot, "archived_questions": archived}
+
+def _fetch_rows(cursor, batch_size: int):
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield from rows
+
+def iter_export(include_archived: bool = False, batch_size: int = EXPORT_BATCH_SIZE):
+    """Yield lists of questions, each with its answers, in question_id order.
+
+    Questions and answers are read by two cursors in one read transaction
+    and merge-joined on question_id, so memory is bounded by ``batch_size``
+    and the export is a consistent snapshot however long it takes.
+    """
+    questions_source, answers_source = (ALL_QUESTIONS, ALL_ANSWERS) if include_archived else ("questions", "answers")
+    with get_db() as conn:
+        try:
+            conn.execute("BEGIN")
+            questions = conn.cursor()
+            questions.execute(f'''
+                SELECT q.*, u.username 
+                FROM {questions_source} q 
+                LEFT JOIN users u ON q.user_id = u.user_id 
+                ORDER BY q.question_id
+            ''')
+            answers_cursor = conn.cursor()
+            answers_cursor.execute(f'''
+                SELECT a.*, u.username 
+                FROM {answers_source} a 
+                LEFT JOIN users u ON a.user_id = u.user_id 
+                ORDER BY a.question_id, a.timestamp ASC
+            ''')
+            answers = _fetch_rows(answers_cursor, batch_size)
+            answer = next(answers, None)
+            while True:
+                rows = questions.fetchmany(batch_size)
+                if not rows:
+                    break
+                batch = []
+                for row in rows:
+                    question = {key: row[key] for key in ("question_id", "user_id", "username", "message", "timestamp", "status", "answered_at")}
+                    question["answers"] = []
+                    # Answers whose question no longer exists are skipped.
+                    while answer is not None and answer["question_id"] < row["question_id"]:
+                        answer = next(answers, None)
+                    while answer is not None and answer["question_id"] == row["question_id"]:
+                        question["answers"].append(_answer_dict(answer))
+                        answer = next(answers, None)
+                    batch.append(question)
+                yield batch
+        finally:
+            # Also runs when the consumer stops early; never hand a pooled
+            # connection back with the read transaction still open.
+            conn.rollback()
+
+def import_questions(records) -> dict:
+    """Insert exported questions and their answers in one transaction.
+
+    New ids are assigned past the current sequence so imports never collide
+    with existing rows. Authors are matched by username; unknown users are
+    imported as anonymous. Returns row counts for the chunk.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        usernames = list(
+            {r["username"] for r in records if r.get("username")}
+            | {a["username"] for r in records for a in r.get("answers", ()) if a.get("username")}
+        )
+        user_ids = {}
+        for start in range(0, len(usernames), SQLITE_MAX_PARAMS):
+            chunk = usernames[start:start + SQLITE_MAX_PARAMS]
+            cursor.execute(f"SELECT username, user_id FROM users WHERE username IN ({','.join('?' * len(chunk))})", chunk)
+            user_ids.update(cursor.fetchall())
+        cursor.execute("SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'questions'), 0)")
+        next_id = cursor.fetchone()[0] + 1
+        cursor.execute("SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'answers'), 0)")
+        last_answer_id = cursor.fetchone()[0]
+        questions = []
+        answers = []
+        for offset, record in enumerate(records):
+            question_id = next_id + offset
+            questions.append((
+                question_id, user_ids.get(record.get("username")), record["message"], record["timestamp"],
+                record["status"], record.get("answered_at"),
+            ))
+            answers.extend(
+                (question_id, user_ids.get(a.get("username")), a["message"], a["timestamp"])
+                for a in record.get("answers", ())
+            )
+        # Index the chunk for search in one statement per table rather than
+        # per row from the insert triggers (see migration 4).
+        cursor.execute("UPDATE meta SET value = 1 WHERE key = 'fts_deferred'")
+        cursor.executemany(
+            f"INSERT INTO questions ({QUESTION_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)", questions
+        )
+        cursor.executemany(
+            "INSERT INTO answers (question_id, user_id, message, timestamp) VALUES (?, ?, ?, ?)", answers
         )
-        return {"answer_id": cursor.lastrowid, "question_id": question_id, "user_id": user_id, "message": message, "timestamp": timestamp}
+        cursor.execute("INSERT INTO questions_fts (rowid, message) SELECT question_id, message FROM questions WHERE question_id >= ?", (next_id,))
+        cursor.execute("INSERT INTO answers_fts (rowid, message) SELECT answer_id, message FROM answers WHERE answer_id > ?", (last_answer_id,))
+        cursor.execute("UPDATE meta SET value = 0 WHERE key = 'fts_deferred'")
+        if questions:
+            _bump_data_version(cursor)
+    return {"questions": len(questions), "answers": len(answers)}
+
+def log_resync() -> dict:
+    """Tell every client, live or resuming, to reload the feed after a bulk load."""
+    with get_db() as conn:
+        return _log_change(conn.cursor(), "resync", None, {})
+
+QUESTION_STATUSES = ("Pending", "Escalated", "Answered")
+
+def get_stats(top_users: int = 10) -> dict:
+    """Dashboard totals from the trigger-maintained counters; no row scans."""
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT key, value FROM stats")
+        values = dict(cursor.fetchall())
+        cursor.execute('''
+            SELECT s.user_id, u.username, s.questions, s.answers
+            FROM user_stats s
+            LEFT JOIN users u ON s.user_id = u.user_id
+            ORDER BY s.questions + s.answers DESC
+            LIMIT ?
+        ''', (top_users,))
+        top = [dict(row) for row in cursor.fetchall()]
+    by_status = {status: values.get(f"questions:{status}", 0) for status in QUESTION_STATUSES}
+    return {
+        "by_status": by_status,
+        "total": sum(by_status.values()),
+        "unanswered": by_status["Pending"] + by_status["Escalated"],
+        "answers": values.get("answers", 0),
+        "archived_questions": values.get("archived_questions", 0),
+        "top_users": top,
+    }
+
+def get_user_stats(user_id: int) -> dict:
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT questions, answers FROM user_stats WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+    return {"questions": row["questions"], "answers": row["answers"]} if row else {"questions": 0, "answers": 0}
+
+def rebuild_stats() -> dict:
+    """Check every counter against a recount and repair any drift.
+
+    Drift is looked for with plain reads, so the write lock is only taken
+    when something is wrong. The repair recounts inside that transaction,
+    so concurrent writes can't be overwritten with stale values. Returns
+    how many counters of each kind were wrong.
+    """
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM stats WHERE value != {STATS_RECOUNT}")
+        totals = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT q.question_id
+            FROM questions q
+            LEFT JOIN (SELECT question_id, COUNT(*) AS n FROM answers GROUP BY question_id) a USING (question_id)
+            WHERE q.answer_count != COALESCE(a.n, 0)
+        ''')
+        questions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f'''
+            SELECT COUNT(*) FROM ({USER_ACTIVITY}) c
+            LEFT JOIN user_stats s USING (user_id)
+            WHERE s.user_id IS NULL OR s.questions != c.questions OR s.answers != c.answers
+        ''')
+        users = cursor.fetchone()[0]
+        if not (totals or questions or users):
+            return {"totals": 0, "answer_counts": 0, "users": 0}
+
+        cursor.execute("BEGIN IMMEDIATE")
+        if totals:
+            totals = recount_stats(cursor)
+        for start in range(0, len(questions), SQLITE_MAX_PARAMS):
+            chunk = questions[start:start + SQLITE_MAX_PARAMS]
+            cursor.execute(f'''
+                UPDATE questions
+                SET answer_count = (SELECT COUNT(*) FROM answers a WHERE a.question_id = questions.question_id)
+                WHERE question_id IN ({",".join("?" * len(chunk))})
+            ''', chunk)
+        if users:
+            cursor.execute(f"INSERT OR REPLACE INTO user_stats (user_id, questions, answers) {USER_ACTIVITY}")
+    return {"totals": totals, "answer_counts": len(questions), "users": users}
+
+def search_questions(match: str, limit: int, offset: int = 0, status: str | None = None):
+    """BM25-ranked questions whose text, or any of whose answers, match ``match``.
+
+    Each question appears once, ranked by its best hit. Snippets are only
+    computed for the returned page, from that best hit, with matched terms
+    wrapped in chr(2) ... chr(3).
+    """
+    where = "WHERE q.status = ?" if status else ""
+    params = [match, match] + ([status] if status else []) + [limit, offset]
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            WITH hits AS (
+                SELECT rowid AS question_id, bm25(questions_fts) AS score, NULL AS answer_id
+                FROM questions_fts WHERE questions_fts MATCH ?
+                UNION ALL
+                SELECT a.question_id, bm25(answers_fts), a.answer_id
+                FROM answers_fts JOIN answers a ON a.answer_id = answers_fts.rowid
+                WHERE answers_fts MATCH ?
+            ),
+            best AS (
+                SELECT question_id, MIN(score) AS score, answer_id FROM hits GROUP BY question_id
+            )
+            SELECT q.*, u.username, best.score, best.answer_id AS hit_answer_id
+            FROM best
+            JOIN questions q ON q.question_id = best.question_id
+            LEFT JOIN users u ON q.user_id = u.user_id
+            {where}
+            ORDER BY best.score, q.question_id DESC
+            LIMIT ? OFFSET ?
+        ''', params)
+        rows = cursor.fetchall()
+        snippets = {}
+        for fts, key, ids in (
+            ("questions_fts", "q", [r["question_id"] for r in rows if r["hit_answer_id"] is None]),
+            ("answers_fts", "a", [r["hit_answer_id"] for r in rows if r["hit_answer_id"] is not None]),
+        ):
+            if not ids:
+                continue
+            cursor.execute(f'''
+                SELECT rowid, snippet({fts}, 0, char(2), char(3), '…', 16)
+                FROM {fts} WHERE {fts} MATCH ? AND rowid IN ({",".join("?" * len(ids))})
+            ''', [match] + ids)
+            snippets.update(((key, rowid), snippet) for rowid, snippet in cursor.fetchall())
+    return [
+        {**dict(row), "snippet": snippets.get(("q", row["question_id"]) if row["hit_answer_id"] is None else ("a", row["hit_answer_id"]))}
+        for row in rows
+    ]
+
+def claim_webhooks(limit: int, lease_seconds: float):
+    """Lease up to ``limit`` due outbox rows so no other worker sends them meanwhile."""
+    now = time.time()
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute('''
+            UPDATE webhook_outbox SET next_attempt_at = ?
+            WHERE outbox_id IN (
+                SELECT outbox_id FROM webhook_outbox
+                WHERE status = 'pending' AND next_attempt_at <= ?
+                ORDER BY next_attempt_at, outbox_id
+                LIMIT ?
+            )
+            RETURNING outbox_id, event, payload, attempts
+        ''', (now + lease_seconds, now, limit))
+        rows = cursor.fetchall()
+    return sorted(rows, key=lambda row: row["outbox_id"])
+
+def complete_webhooks(outbox_ids):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany("DELETE FROM webhook_outbox WHERE outbox_id = ?", [(i,) for i in outbox_ids])
+
+def fail_webhooks(outbox_ids, error: str, retry_at: float, max_attempts: int):
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.executemany('''
+            UPDATE webhook_outbox
+            SET attempts = attempts + 1, last_error = ?, next_attempt_at = ?,
+                status = CASE WHEN attempts + 1 >= ? THEN 'dead' ELSE 'pending' END
+            WHERE outbox_id = ?
+        ''', [(error, retry_at, max_attempts, i) for i in outbox_ids])
+
+def get_webhook_outbox_counts():
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT status, COUNT(*) FROM webhook_outbox GROUP BY status")
+        return {row[0]: row[1] for row in cursor.fetchall()}
@@ -0,0 +1,184 @@
+"""Pub/sub layer behind ConnectionManager.broadcast.
+
+With ``uvicorn --workers N`` each process only holds its own sockets, so a
+broadcast has to reach the other workers before it can be fanned out.
+Buses receive already-serialized messages (plus their change-log seq, if
+any) and call ``deliver`` once per message in every process. Messages with
+a seq are delivered in seq order, not publish order. Two requests, or two
+workers, can commit changes 10 and 11 and publish 11 first. A seq that
+arrives ahead of a missing one is held for up to
+``EVENT_BUS_REORDER_WINDOW_MS``, so clients resuming from the last id they
+saw (SSE Last-Event-ID, ``?since=``) neither miss nor repeat a change.
+
+- ``local``: in-process only; what a single worker needs.
+- ``sqlite``: an append-only event log in a side SQLite file. Every worker
+  polls it, including the publisher, so each worker sees each event
+  exactly once.
+"""
+import asyncio
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import Awaitable, Callable
+
+from .async_db import run_db
+from .config import (
+    EVENT_BUS, EVENT_BUS_PATH, EVENT_BUS_POLL_INTERVAL, EVENT_BUS_RETENTION_SECONDS, EVENT_BUS_REORDER_WINDOW_MS,
+)
+from .db import get_connection
+
+Deliver = Callable[[str, int | None], Awaitable[None]]
+
+class EventBus(ABC):
+    reorder_window = EVENT_BUS_REORDER_WINDOW_MS / 1000
+    _release_task: asyncio.Task | None = None
+
+    async def start(self, deliver: Deliver):
+        self.deliver = deliver
+        # Highest seq handed to deliver, and later ones waiting for a gap.
+        self.last_seq: int | None = None
+        self._held: dict[int, str] = {}
+        self._order_lock = asyncio.Lock()
+
+    @abstractmethod
+    async def publish(self, text: str, seq: int | None = None):
+        ...
+
+    async def stop(self):
+        if self._release_task:
+            self._release_task.cancel()
+            self._release_task = None
+
+    async def _dispatch(self, text: str, seq: int | None):
+        """Hand one published message to ``deliver``, in seq order."""
+        async with self._order_lock:
+            if seq is not None and self.last_seq is not None and seq > self.last_seq + 1:
+                self._held[seq] = text
+                if self._release_task is None:
+                    self._release_task = asyncio.create_task(self._release_after_window())
+                return
+            # A seq at or below last_seq only shows up after its window
+            # expired; late is better than never.
+            await self.deliver(text, seq)
+            if seq is not None and (self.last_seq is None or seq > self.last_seq):
+                self.last_seq = seq
+                while self.last_seq + 1 in self._held:
+                    self.last_seq += 1
+                    await self.deliver(self._held.pop(self.last_seq), self.last_seq)
+
+    async def _release_after_window(self):
+        # Whatever never filled its gap goes out in seq order.
+        await asyncio.sleep(self.reorder_window)
+        async with self._order_lock:
+            self._release_task = None
+            for seq in sorted(self._held):
+                await self.deliver(self._held.pop(seq), seq)
+                self.last_seq = seq
+
+class LocalEventBus(EventBus):
+    async def publish(self, text: str, seq: int | None = None):
+        await self._dispatch(text, seq)
+
+class SQLiteEventBus(EventBus):
+    BATCH_SIZE = 500
+
+    def __init__(self, path: str = EVENT_BUS_PATH, poll_interval: float = EVENT_BUS_POLL_INTERVAL,
+                 retention_seconds: float = EVENT_BUS_RETENTION_SECONDS):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.last_event_id = 0
+        self._writer = None
+        self._reader = None
+        self._write_lock = threading.Lock()
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    def _open(self):
+        self._writer = get_connection(self.path)
+        self._writer.isolation_level = None
+        self._writer.execute('''
+            CREATE TABLE IF NOT EXISTS bus_events (
+                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                seq INTEGER,
+                created_at REAL NOT NULL
+            )
+        ''')
+        columns = [row[1] for row in self._writer.execute("PRAGMA table_info(bus_events)")]
+        if "seq" not in columns:
+            self._writer.execute("ALTER TABLE bus_events ADD COLUMN seq INTEGER")
+        self._reader = get_connection(self.path)
+        row = self._reader.execute("SELECT COALESCE(MAX(event_id), 0) FROM bus_events").fetchone()
+        self._reader.commit()
+        return row[0]
+
+    def _insert(self, text: str, seq: int | None):
+        with self._write_lock:
+            self._writer.execute("INSERT INTO bus_events (payload, seq, created_at) VALUES (?, ?, ?)", (text, seq, time.time()))
+
+    def _fetch(self, after: int):
+        rows = self._reader.execute(
+            "SELECT event_id, payload, seq FROM bus_events WHERE event_id > ? ORDER BY event_id LIMIT ?",
+            (after, self.BATCH_SIZE)
+        ).fetchall()
+        self._reader.commit()
+        return rows
+
+    def _prune(self):
+        with self._write_lock:
+            self._writer.execute("DELETE FROM bus_events WHERE created_at < ?", (time.time() - self.retention_seconds,))
+
+    async def start(self, deliver: Deliver):
+        await super().start(deliver)
+        self.last_event_id = await run_db(self._open)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._poll_loop())
+
+    async def publish(self, text: str, seq: int | None = None):
+        await run_db(self._insert, text, seq)
+        self._wakeup.set()
+
+    async def _poll_loop(self):
+        last_prune = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                rows = await run_db(self._fetch, self.last_event_id)
+                while rows:
+                    for event_id, payload, seq in rows:
+                        self.last_event_id = event_id
+                        await self._dispatch(payload, seq)
+                    rows = await run_db(self._fetch, self.last_event_id) if len(rows) == self.BATCH_SIZE else []
+                if time.monotonic() - last_prune > self.retention_seconds / 2:
+                    last_prune = time.monotonic()
+                    await run_db(self._prune)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await asyncio.sleep(self.poll_interval)
+
+    async def stop(self):
+        await super().stop()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for conn in (self._writer, self._reader):
+            if conn is not None:
+                conn.close()
+        self._writer = self._reader = None
+
+def create_event_bus(kind: str = EVENT_BUS) -> EventBus:
+    if kind == "sqlite":
+        return SQLiteEventBus()
+    if kind == "local":
+        return LocalEventBus()
+    raise ValueError(f"Unknown EVENT_BUS: {kind}")
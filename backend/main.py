@@ -1,21 +1,65 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import asyncio
+from typing import Optional
+from fastapi import Depends, FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
-from .db import init_db
-from .routers.auth import router as auth_router
+from .storage import engine, engine_name
+from .async_db import init_db, shutdown_executor, write_coalescer
+from .compaction import compactor
+from .config import METRICS_ENABLED
+from .metrics import CONTENT_TYPE, MetricsMiddleware, loop_lag, render
+from .passwords import hasher, PasswordHasherBusy
+from .ratelimit import LONG_LIVED, RateLimitMiddleware, limiter
+from .routers.auth import router as auth_router, seed_default_admin, decode_user_id, require_admin
 from .routers.questions import router as questions_router
-from .websocket_manager import manager
+from .serialization import FastJSONResponse
+from .websocket_manager import auth_token, manager
+from .webhooks import dispatcher
+from .archive import archiver
+from .stats import publisher
 
-app = FastAPI(title="Q&A Realtime Dashboard API", version="1.0.0")
+app = FastAPI(title="Q&A Realtime Dashboard API", version="1.0.0", default_response_class=FastJSONResponse)
 
-app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+# Added first so it sits inside CORS and 429/503 responses keep CORS headers.
+app.add_middleware(RateLimitMiddleware, limiter=limiter)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"], expose_headers=["X-Next-Cursor", "ETag"])
+if METRICS_ENABLED:
+    # Outermost, so the timing includes 429s, 503s and CORS preflights.
+    app.add_middleware(MetricsMiddleware, skip=LONG_LIVED)
 
 app.include_router(auth_router)
 app.include_router(questions_router)
 
+@app.exception_handler(PasswordHasherBusy)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(status_code=503, content={"detail": "Server busy, please retry"}, headers={"Retry-After": "1"})
+
 @app.on_event("startup")
 async def startup_event():
-    init_db()
+    hasher.warm_up()
+    await init_db()
+    await manager.start()
+    await dispatcher.start()
+    await archiver.start()
+    await publisher.start()
+    await compactor.start()
+    if METRICS_ENABLED:
+        await loop_lag.start()
+    app.state.admin_seed = asyncio.create_task(seed_default_admin())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await compactor.stop()
+    await loop_lag.stop()
+    await publisher.stop()
+    await archiver.stop()
+    await write_coalescer.stop()
+    await dispatcher.stop()
+    await manager.stop()
+    hasher.shutdown()
+    shutdown_executor()
+    engine.close_pool()
 
 @app.get("/")
 async def root():
@@ -25,11 +69,48 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/ws/stats")
+async def websocket_stats(admin: dict = Depends(require_admin)):
+    return manager.stats()
+
+@app.get("/ratelimit/stats")
+async def ratelimit_stats(admin: dict = Depends(require_admin)):
+    return limiter.stats()
+
+@app.get("/db/stats")
+async def db_stats(admin: dict = Depends(require_admin)):
+    return {"engine": engine_name, "write_coalescer": write_coalescer.stats(), "stats_publisher": publisher.stats(),
+            "change_log": compactor.stats()}
+
+@app.get("/archive/stats")
+async def archive_stats(admin: dict = Depends(require_admin)):
+    return await archiver.stats()
+
+@app.get("/webhooks/stats")
+async def webhook_stats(admin: dict = Depends(require_admin)):
+    return await dispatcher.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return Response(render(), media_type=CONTENT_TYPE)
+
 @app.websocket("/ws/questions")
-async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, since: Optional[int] = None, token: Optional[str] = None):
+    # Clients send {"type": "auth", "token": ...} as their first message.
+    # ?token= is deprecated: query strings end up in proxy and access logs.
+    user_id = decode_user_id(token) if token else None
+    key = f"user:{user_id}" if user_id else f"ip:{websocket.client.host if websocket.client else 'unknown'}"
     try:
+        if not await manager.connect(websocket, since, key):
+            return
         while True:
-            await websocket.receive_text()
+            text = await websocket.receive_text()
+            auth = auth_token(text)
+            if auth is None:
+                manager.handle_message(websocket, text)
+            elif not await manager.authenticate(websocket, decode_user_id(auth) if auth else None):
+                return
     except (WebSocketDisconnect, Exception):
         manager.disconnect(websocket)
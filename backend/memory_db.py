@@ -0,0 +1,730 @@
+"""In-memory storage engine (``DATABASE_URL=memory://``).
+
+Implements the same functions as db.py over dicts and sorted lists, for
+load tests, demos and throwaway event boards. Nothing touches the disk and
+everything is gone on restart. Every call is a few dict and list
+operations, so async_db runs them directly on the event loop; the engine is
+not thread-safe.
+
+The feed order (escalated first, then newest first) comes from one sorted
+list of (timestamp, question_id) per status, plus one for the archive,
+walked backwards from the cursor and merged. Search is a small inverted
+index scored like FTS5's bm25(): terms are case- and accent-insensitive,
+all of them must match, and a trailing ``*`` makes a prefix.
+"""
+import bisect
+import heapq
+import itertools
+import json
+import math
+import random
+import re
+import time
+import unicodedata
+from datetime import datetime
+
+from .cache import user_cache
+from .config import WEBHOOK_URL, EXPORT_BATCH_SIZE
+from .db import STATUS_WEBHOOK_EVENTS, QUESTION_STATUSES
+from .storage import IntegrityError
+
+USER_ROLES = ("guest", "user", "admin")
+QUESTION_FIELDS = ("question_id", "user_id", "message", "timestamp", "status", "answered_at")
+
+# FTS5's unicode61 tokenizer: runs of letters and digits, folded.
+TOKEN = re.compile(r"[^\W_]+")
+MATCH_TERM = re.compile(r'"([^"]*)"(\*?)')
+SENTENCE_END = re.compile(r"[.:]\s+$")
+BM25_K1 = 1.2
+BM25_B = 0.75
+SNIPPET_TOKENS = 16
+
+def answer_order(answer: dict) -> tuple:
+    return answer["timestamp"], answer["answer_id"]
+
+def answer_dict(answer: dict, username: str | None = None) -> dict:
+    return {
+        "answer_id": answer["answer_id"],
+        "question_id": answer["question_id"],
+        "user_id": answer["user_id"],
+        "username": username or answer.get("username"),
+        "message": answer["message"],
+        "timestamp": answer["timestamp"],
+    }
+
+def fold(token: str) -> str:
+    if token.isascii():
+        return token.lower()
+    return "".join(c for c in unicodedata.normalize("NFKD", token.casefold()) if not unicodedata.combining(c))
+
+class SortedKeys:
+    """Ascending (timestamp, id) keys, read newest first."""
+
+    __slots__ = ("keys",)
+
+    def __init__(self):
+        self.keys = []
+
+    def add(self, key):
+        bisect.insort(self.keys, key)
+
+    def remove(self, key):
+        index = bisect.bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            del self.keys[index]
+
+    def newest_first(self, before=None):
+        keys = self.keys
+        end = len(keys) if before is None else bisect.bisect_left(keys, before)
+        return (keys[i] for i in range(end - 1, -1, -1))
+
+def newest_first(lists, before=None):
+    return heapq.merge(*(keys.newest_first(before) for keys in lists), reverse=True)
+
+class SearchIndex:
+    """Term -> {document: term frequency}, with a sorted vocabulary for prefixes.
+
+    Documents are ("q", question_id) or ("a", answer_id). Statistics are kept
+    per kind, like the two FTS5 tables.
+    """
+
+    def __init__(self):
+        self.postings: dict[str, dict] = {}
+        self.vocabulary: list[str] = []
+        self.lengths: dict[tuple, int] = {}
+        self.documents = {"q": 0, "a": 0}
+        self.tokens = {"q": 0, "a": 0}
+
+    def add(self, document: tuple, text: str):
+        terms = [fold(token) for token in TOKEN.findall(text)]
+        self.lengths[document] = len(terms)
+        self.documents[document[0]] += 1
+        self.tokens[document[0]] += len(terms)
+        for term in terms:
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                bisect.insort(self.vocabulary, term)
+            postings[document] = postings.get(document, 0) + 1
+
+    def remove(self, document: tuple, text: str):
+        length = self.lengths.pop(document, None)
+        if length is None:
+            return
+        self.documents[document[0]] -= 1
+        self.tokens[document[0]] -= length
+        for term in {fold(token) for token in TOKEN.findall(text)}:
+            postings = self.postings[term]
+            postings.pop(document, None)
+            if not postings:
+                del self.postings[term]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, term)]
+
+    def expand(self, term: str, prefix: bool) -> list[str]:
+        if not prefix:
+            return [term] if term in self.postings else []
+        start = bisect.bisect_left(self.vocabulary, term)
+        end = bisect.bisect_left(self.vocabulary, term + "\U0010ffff")
+        return self.vocabulary[start:end]
+
+    def match(self, query: str) -> tuple[dict, list]:
+        """Score every document containing all query terms.
+
+        Returns ({document: score}, [(term, prefix)]); lower scores are
+        better, as with bm25().
+        """
+        terms = []
+        for phrase, star in MATCH_TERM.findall(query):
+            tokens = [fold(token) for token in TOKEN.findall(phrase)]
+            terms += [(token, bool(star) and i == len(tokens) - 1) for i, token in enumerate(tokens)]
+        if not terms:
+            return {}, terms
+        frequencies = []
+        for term, prefix in terms:
+            counts: dict = {}
+            for token in self.expand(term, prefix):
+                for document, count in self.postings[token].items():
+                    counts[document] = counts.get(document, 0) + count
+            if not counts:
+                return {}, terms
+            frequencies.append(counts)
+        matched = set(min(frequencies, key=len)).intersection(*frequencies)
+        idfs = {}
+        for kind, total in self.documents.items():
+            idfs[kind] = []
+            for counts in frequencies:
+                containing = sum(1 for document in counts if document[0] == kind)
+                idf = math.log((total - containing + 0.5) / (containing + 0.5))
+                idfs[kind].append(idf if idf > 0 else 1e-6)
+        scores = {}
+        for document in matched:
+            kind = document[0]
+            average = self.tokens[kind] / self.documents[kind]
+            length = self.lengths[document]
+            # Same terms in the same order as FTS5's bm25(), so scores match to the bit.
+            score = 0.0
+            for idf, counts in zip(idfs[kind], frequencies):
+                tf = counts[document]
+                score += idf * ((tf * (BM25_K1 + 1.0)) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / average)))
+            scores[document] = -1.0 * score
+        return scores, terms
+
+def snippet(text: str, terms: list) -> str:
+    """The best SNIPPET_TOKENS-token window, hits wrapped in chr(2)/chr(3).
+
+    Windows are chosen the way FTS5's snippet() does: 1000 points for each
+    distinct term in the window and 1 for each repeat, hits centred, and a
+    bonus for windows that start a sentence.
+    """
+    tokens = list(TOKEN.finditer(text))
+    size = len(tokens)
+    instances = [
+        (position, phrase)
+        for position, token in enumerate(tokens)
+        for phrase, (term, prefix) in enumerate(terms)
+        if (fold(token.group()).startswith(term) if prefix else fold(token.group()) == term)
+    ]
+
+    def score(start):
+        seen, total, first, last = set(), 0, None, 0
+        for position, phrase in instances:
+            if start <= position < start + SNIPPET_TOKENS:
+                total += 1 if phrase in seen else 1000
+                seen.add(phrase)
+                first = position if first is None else first
+                last = position + 1
+        if first is None:
+            return total, start
+        return total, max(0, min(first - (SNIPPET_TOKENS - (last - first)) // 2, size - SNIPPET_TOKENS))
+
+    # Tokens after ". " or ": " begin a sentence.
+    sentences = [0] + [
+        i for i in range(1, size)
+        if SENTENCE_END.search(text, tokens[i - 1].end(), tokens[i].start())
+    ]
+    best, start = 0, 0
+    for position, _ in instances:
+        total, centred = score(position)
+        if total > best:
+            best, start = total, centred
+        if size > SNIPPET_TOKENS:
+            sentence = sentences[bisect.bisect_right(sentences, position) - 1]
+            if sentence < position:
+                total = score(sentence)[0] + (120 if sentence == 0 else 100)
+                if total > best:
+                    best, start = total, sentence
+    hits = {position for position, _ in instances}
+    end = min(size, start + SNIPPET_TOKENS)
+    pieces = ["…" if start else text[:tokens[0].start()] if tokens else text]
+    for i in range(start, end):
+        if i > start:
+            pieces.append(text[tokens[i - 1].end():tokens[i].start()])
+        pieces.append(f"\x02{tokens[i].group()}\x03" if i in hits else tokens[i].group())
+    if tokens:
+        pieces.append("…" if end < size else text[tokens[-1].end():])
+    return "".join(pieces)
+
+class MemoryEngine:
+    inline = True
+
+    def __init__(self):
+        self.users: dict[int, dict] = {}
+        self.users_by_email: dict[str, dict] = {}
+        self.users_by_username: dict[str, dict] = {}
+        self.questions: dict[int, dict] = {}
+        self.answers: dict[int, dict] = {}
+        self.answers_by_question: dict[int, list] = {}
+        self.archived_questions: dict[int, dict] = {}
+        self.archived_answers: dict[int, list] = {}
+        self.feed = {status: SortedKeys() for status in QUESTION_STATUSES}
+        self.archived_feed = SortedKeys()
+        # (answered_at, question_id) of hot answered questions, oldest first.
+        self.answered = SortedKeys()
+        self.search = SearchIndex()
+        self.changes: list[dict] = []
+        self.changes_floor = 0
+        self.outbox: dict[int, dict] = {}
+        self.stats = {f"questions:{status}": 0 for status in QUESTION_STATUSES} | {"answers": 0, "archived_questions": 0}
+        self.user_stats: dict[int, dict] = {}
+        self.ids = {name: itertools.count(1) for name in ("users", "changes", "outbox")}
+        # Like AUTOINCREMENT, ids are never reused, even after archiving.
+        self.last_ids = {"questions": 0, "answers": 0}
+        # Like db.py, start from a random point so ETags never match across restarts.
+        self.data_version = random.randrange(10 ** 12)
+
+    def init_db(self):
+        pass
+
+    def close_pool(self):
+        pass
+
+    # Users
+
+    def get_user_by_email(self, email: str):
+        user = self.users_by_email.get(email)
+        return dict(user) if user else None
+
+    def get_user_by_username(self, username: str):
+        user = self.users_by_username.get(username)
+        return dict(user) if user else None
+
+    def get_user_by_id(self, user_id: int):
+        user = self.users.get(user_id)
+        return dict(user) if user else None
+
+    def create_user(self, username: str, email: str, password_hash: str, role: str = "user"):
+        if username in self.users_by_username or email in self.users_by_email:
+            raise IntegrityError("UNIQUE constraint failed")
+        if role not in USER_ROLES:
+            raise IntegrityError("CHECK constraint failed: role")
+        user_id = next(self.ids["users"])
+        user = {"user_id": user_id, "username": username, "email": email, "password": password_hash, "role": role}
+        self.users[user_id] = self.users_by_email[email] = self.users_by_username[username] = user
+        return user_id
+
+    def update_user_password(self, user_id: int, password_hash: str):
+        if user_id in self.users:
+            self.users[user_id]["password"] = password_hash
+        user_cache.invalidate(user_id)
+
+    def update_user_role(self, user_id: int, role: str):
+        if role not in USER_ROLES:
+            raise IntegrityError("CHECK constraint failed: role")
+        if user_id in self.users:
+            self.users[user_id]["role"] = role
+        user_cache.invalidate(user_id)
+
+    def _username(self, user_id):
+        user = self.users.get(user_id)
+        return user["username"] if user else None
+
+    # Rows as the SQLite queries return them: columns plus the joined username.
+
+    def _question_row(self, question: dict, **extra) -> dict:
+        return {**question, "username": self._username(question["user_id"]), **extra}
+
+    def _answer_row(self, answer: dict) -> dict:
+        return {**answer, "username": self._username(answer["user_id"])}
+
+    def _lookup(self, question_id: int, include_archived: bool):
+        question = self.questions.get(question_id)
+        if question is None and include_archived:
+            question = self.archived_questions.get(question_id)
+        return question
+
+    def _answers_of(self, question_id: int, include_archived: bool) -> list:
+        answers = self.answers_by_question.get(question_id, [])
+        if include_archived and question_id in self.archived_answers:
+            answers = sorted(answers + self.archived_answers[question_id], key=answer_order)
+        return answers
+
+    # Feed
+
+    def _feed_lists(self, statuses, include_archived: bool) -> list:
+        lists = [self.feed[status] for status in statuses]
+        if include_archived and "Answered" in statuses:
+            lists.append(self.archived_feed)
+        return lists
+
+    def _walk(self, statuses, include_archived: bool, before=None):
+        for _, question_id in newest_first(self._feed_lists(statuses, include_archived), before):
+            yield self._lookup(question_id, include_archived)
+
+    def get_all_questions(self):
+        return [
+            self._question_row(question)
+            for statuses in (("Escalated",), ("Pending", "Answered"))
+            for question in self._walk(statuses, False)
+        ]
+
+    def get_questions_page(self, limit: int, after: tuple | None = None, status: str | None = None, include_archived: bool = False):
+        before = (after[1], after[2]) if after else None
+        if status:
+            segments = [(0 if status == "Escalated" else 1, (status,), before)]
+        else:
+            start_rank = after[0] if after else 0
+            segments = [
+                (rank, statuses, before if rank == start_rank else None)
+                for rank, statuses in ((0, ("Escalated",)), (1, ("Pending", "Answered")))
+                if rank >= start_rank
+            ]
+        rows = []
+        for rank, statuses, segment_before in segments:
+            for question in itertools.islice(self._walk(statuses, include_archived, segment_before), limit + 1 - len(rows)):
+                rows.append(self._question_row(question, feed_rank=rank))
+            if len(rows) > limit:
+                break
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, (last["feed_rank"], last["timestamp"], last["question_id"])
+
+    def get_question_by_id(self, question_id: int):
+        question = self.questions.get(question_id)
+        return dict(question) if question else None
+
+    def get_answers_for_question(self, question_id: int):
+        return [self._answer_row(answer) for answer in self.answers_by_question.get(question_id, [])]
+
+    def get_answers_for_questions(self, question_ids, include_archived: bool = False):
+        return {
+            question_id: [self._answer_row(answer) for answer in self._answers_of(question_id, include_archived)]
+            for question_id in question_ids
+        }
+
+    def get_all_questions_with_answers(self, include_archived: bool = False):
+        questions = [
+            self._question_row(question)
+            for statuses in (("Escalated",), ("Pending", "Answered"))
+            for question in self._walk(statuses, include_archived)
+        ]
+        question_ids = set(self.answers_by_question) | (set(self.archived_answers) if include_archived else set())
+        answers = {
+            question_id: [self._answer_row(answer) for answer in self._answers_of(question_id, include_archived)]
+            for question_id in sorted(question_ids)
+        }
+        return questions, answers
+
+    # Change log, data version and outbox
+
+    def get_data_version(self) -> int:
+        return self.data_version
+
+    def _log_change(self, change_type: str, question_id, data) -> dict:
+        change = {"type": change_type, "seq": next(self.ids["changes"]), "data": data}
+        self.changes.append(change)
+        return change
+
+    def get_changes_since(self, since: int, limit: int):
+        start = bisect.bisect_right(self.changes, since, key=lambda change: change["seq"])
+        latest = self.changes[-1]["seq"] if self.changes else self.changes_floor
+        return self.changes[start:start + limit], self.changes_floor, latest
+
+    def compact_changes(self, keep: int):
+        latest = self.changes[-1]["seq"] if self.changes else self.changes_floor
+        cutoff = latest - keep
+        if cutoff <= 0:
+            return 0
+        end = bisect.bisect_right(self.changes, cutoff, key=lambda change: change["seq"])
+        del self.changes[:end]
+        self.changes_floor = max(self.changes_floor, cutoff)
+        return end
+
+    def _enqueue_webhook(self, event: str, data: dict):
+        if not WEBHOOK_URL:
+            return
+        outbox_id = next(self.ids["outbox"])
+        now = time.time()
+        self.outbox[outbox_id] = {
+            "outbox_id": outbox_id, "event": event, "payload": json.dumps(data), "created_at": now,
+            "attempts": 0, "next_attempt_at": now, "last_error": None, "status": "pending",
+        }
+
+    def claim_webhooks(self, limit: int, lease_seconds: float):
+        now = time.time()
+        due = heapq.nsmallest(
+            limit,
+            (row for row in self.outbox.values() if row["status"] == "pending" and row["next_attempt_at"] <= now),
+            key=lambda row: (row["next_attempt_at"], row["outbox_id"]),
+        )
+        for row in due:
+            row["next_attempt_at"] = now + lease_seconds
+        return [
+            {key: row[key] for key in ("outbox_id", "event", "payload", "attempts")}
+            for row in sorted(due, key=lambda row: row["outbox_id"])
+        ]
+
+    def complete_webhooks(self, outbox_ids):
+        for outbox_id in outbox_ids:
+            self.outbox.pop(outbox_id, None)
+
+    def fail_webhooks(self, outbox_ids, error: str, retry_at: float, max_attempts: int):
+        for outbox_id in outbox_ids:
+            row = self.outbox.get(outbox_id)
+            if row:
+                row["attempts"] += 1
+                row["last_error"] = error
+                row["next_attempt_at"] = retry_at
+                row["status"] = "dead" if row["attempts"] >= max_attempts else "pending"
+
+    def get_webhook_outbox_counts(self):
+        counts = {}
+        for row in self.outbox.values():
+            counts[row["status"]] = counts.get(row["status"], 0) + 1
+        return counts
+
+    # Writes. Each keeps the counters the SQLite triggers maintain.
+
+    def _count_user(self, user_id, field: str, delta: int = 1):
+        if user_id is not None:
+            stats = self.user_stats.setdefault(user_id, {"questions": 0, "answers": 0})
+            stats[field] += delta
+
+    def _add_question(self, question: dict):
+        question_id = question["question_id"]
+        question["answer_count"] = 0
+        self.questions[question_id] = question
+        self.last_ids["questions"] = max(self.last_ids["questions"], question_id)
+        self.feed[question["status"]].add((question["timestamp"], question_id))
+        if question["status"] == "Answered" and question["answered_at"] is not None:
+            self.answered.add((question["answered_at"], question_id))
+        self.search.add(("q", question_id), question["message"])
+        self.stats[f"questions:{question['status']}"] += 1
+        self._count_user(question["user_id"], "questions")
+
+    def _add_answer(self, answer: dict):
+        answer_id = answer["answer_id"]
+        self.answers[answer_id] = answer
+        self.last_ids["answers"] = max(self.last_ids["answers"], answer_id)
+        answers = self.answers_by_question.setdefault(answer["question_id"], [])
+        bisect.insort(answers, answer, key=answer_order)
+        self.search.add(("a", answer_id), answer["message"])
+        if answer["question_id"] in self.questions:
+            self.questions[answer["question_id"]]["answer_count"] += 1
+        self.stats["answers"] += 1
+        self._count_user(answer["user_id"], "answers")
+
+    def create_question(self, message: str, user_id: int | None = None, username: str | None = None):
+        timestamp = datetime.utcnow().isoformat()
+        question_id = self.last_ids["questions"] + 1
+        question = {"question_id": question_id, "user_id": user_id, "message": message, "timestamp": timestamp, "status": "Pending"}
+        self._add_question({**question, "answered_at": None})
+        self.data_version += 1
+        self._enqueue_webhook("new_question", {
+            "question_id": question_id,
+            "message": message,
+            "username": username,
+            "timestamp": timestamp
+        })
+        question["change"] = self._log_change("new_question", question_id, {**question, "username": username, "answers": []})
+        return question
+
+    def create_answer(self, question_id: int, message: str, user_id: int | None = None, username: str | None = None):
+        timestamp = datetime.utcnow().isoformat()
+        answer_id = self.last_ids["answers"] + 1
+        answer = {"answer_id": answer_id, "question_id": question_id, "user_id": user_id, "message": message, "timestamp": timestamp}
+        self._add_answer(dict(answer))
+        self.data_version += 1
+        self._enqueue_webhook("new_answer", {
+            "answer_id": answer_id,
+            "question_id": question_id,
+            "message": message,
+            "username": username,
+            "timestamp": timestamp
+        })
+        answer["change"] = self._log_change("new_answer", question_id, {"question_id": question_id, "answer": answer_dict(answer, username)})
+        return answer
+
+    def run_write_batch(self, ops):
+        # Nothing to group-commit in memory; each op applies on its own.
+        results = []
+        for name, args in ops:
+            try:
+                results.append(getattr(self, name)(*args))
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    def _set_status(self, question: dict, status: str, now: str):
+        old = question["status"]
+        question_id = question["question_id"]
+        if old == "Answered" and question["answered_at"] is not None:
+            self.answered.remove((question["answered_at"], question_id))
+        # answered_at keeps the first time a question was answered; any other
+        # status clears it so the question is no longer archivable.
+        question["answered_at"] = (question["answered_at"] or now) if status == "Answered" else None
+        if status == "Answered":
+            self.answered.add((question["answered_at"], question_id))
+        if old != status:
+            self.feed[old].remove((question["timestamp"], question_id))
+            self.feed[status].add((question["timestamp"], question_id))
+            self.stats[f"questions:{old}"] -= 1
+            self.stats[f"questions:{status}"] += 1
+        question["status"] = status
+
+    def _question_with_answers(self, question: dict) -> dict:
+        row = self._question_row(question)
+        row["answers"] = [answer_dict(self._answer_row(answer)) for answer in self.answers_by_question.get(question["question_id"], [])]
+        return row
+
+    def update_question_status(self, question_id: int, status: str):
+        question = self.questions.get(question_id)
+        if question is None:
+            return None
+        previous_status = question["status"]
+        self._set_status(question, status, datetime.utcnow().isoformat())
+        self.data_version += 1
+        updated = self._question_with_answers(question)
+        if status in STATUS_WEBHOOK_EVENTS:
+            self._enqueue_webhook(STATUS_WEBHOOK_EVENTS[status], {
+                "question_id": question_id,
+                "message": question["message"],
+                "timestamp": question["timestamp"]
+            })
+        updated["change"] = self._log_change("status_update", question_id, {**updated, "previous_status": previous_status})
+        return updated
+
+    def update_questions_status(self, question_ids, status: str):
+        ids = list(dict.fromkeys(question_ids))
+        now = datetime.utcnow().isoformat()
+        questions = []
+        previous = {}
+        for question_id in ids:
+            question = self.questions.get(question_id)
+            if question is not None:
+                previous[question_id] = question["status"]
+                self._set_status(question, status, now)
+                questions.append(self._question_with_answers(question))
+        not_found = [question_id for question_id in ids if question_id not in self.questions]
+        if not questions:
+            return {"questions": [], "not_found": not_found, "change": None}
+        self.data_version += 1
+        if status in STATUS_WEBHOOK_EVENTS:
+            # The same event, with the same payload, as the single-question routes.
+            for q in questions:
+                self._enqueue_webhook(STATUS_WEBHOOK_EVENTS[status], {
+                    "question_id": q["question_id"],
+                    "message": q["message"],
+                    "timestamp": q["timestamp"]
+                })
+        change = self._log_change("status_update", None, [
+            {**q, "previous_status": previous[q["question_id"]]} for q in questions
+        ])
+        return {"questions": questions, "not_found": not_found, "change": change}
+
+    # Archive, export and import
+
+    def archive_answered_batch(self, cutoff: str, limit: int) -> int:
+        due = []
+        for answered_at, question_id in self.answered.keys:
+            if answered_at >= cutoff or len(due) == limit:
+                break
+            due.append(question_id)
+        for question_id in due:
+            question = self.questions.pop(question_id)
+            self.answered.remove((question["answered_at"], question_id))
+            self.feed["Answered"].remove((question["timestamp"], question_id))
+            self.search.remove(("q", question_id), question["message"])
+            self.stats["questions:Answered"] -= 1
+            answers = self.answers_by_question.pop(question_id, [])
+            for answer in answers:
+                del self.answers[answer["answer_id"]]
+                self.search.remove(("a", answer["answer_id"]), answer["message"])
+            self.stats["answers"] -= len(answers)
+            self.archived_questions[question_id] = {key: question[key] for key in QUESTION_FIELDS}
+            self.archived_feed.add((question["timestamp"], question_id))
+            if answers:
+                self.archived_answers[question_id] = answers
+        if due:
+            self.stats["archived_questions"] += len(due)
+            self.data_version += 1
+        return len(due)
+
+    def get_archive_counts(self) -> dict:
+        return {"hot_questions": len(self.questions), "archived_questions": len(self.archived_questions)}
+
+    def iter_export(self, include_archived: bool = False, batch_size: int = EXPORT_BATCH_SIZE):
+        ids = sorted(set(self.questions) | set(self.archived_questions) if include_archived else self.questions)
+        for start in range(0, len(ids), batch_size):
+            batch = []
+            for question_id in ids[start:start + batch_size]:
+                question = self._lookup(question_id, include_archived)
+                if question is None:
+                    continue
+                row = {key: question[key] for key in QUESTION_FIELDS}
+                row["username"] = self._username(question["user_id"])
+                row["answers"] = [answer_dict(self._answer_row(answer)) for answer in self._answers_of(question_id, include_archived)]
+                batch.append(row)
+            yield batch
+
+    def import_questions(self, records) -> dict:
+        answers = 0
+        for record in records:
+            user = self.users_by_username.get(record.get("username"))
+            question_id = self.last_ids["questions"] + 1
+            self._add_question({
+                "question_id": question_id, "user_id": user["user_id"] if user else None, "message": record["message"],
+                "timestamp": record["timestamp"], "status": record["status"], "answered_at": record.get("answered_at"),
+            })
+            for answer in record.get("answers", ()):
+                author = self.users_by_username.get(answer.get("username"))
+                self._add_answer({
+                    "answer_id": self.last_ids["answers"] + 1, "question_id": question_id,
+                    "user_id": author["user_id"] if author else None, "message": answer["message"], "timestamp": answer["timestamp"],
+                })
+                answers += 1
+        if records:
+            self.data_version += 1
+        return {"questions": len(records), "answers": answers}
+
+    def log_resync(self) -> dict:
+        return self._log_change("resync", None, {})
+
+    # Stats
+
+    def get_stats(self, top_users: int = 10) -> dict:
+        top = heapq.nlargest(top_users, self.user_stats.items(), key=lambda item: item[1]["questions"] + item[1]["answers"])
+        by_status = {status: self.stats[f"questions:{status}"] for status in QUESTION_STATUSES}
+        return {
+            "by_status": by_status,
+            "total": sum(by_status.values()),
+            "unanswered": by_status["Pending"] + by_status["Escalated"],
+            "answers": self.stats["answers"],
+            "archived_questions": self.stats["archived_questions"],
+            "top_users": [
+                {"user_id": user_id, "username": self._username(user_id), **counts} for user_id, counts in top
+            ],
+        }
+
+    def get_user_stats(self, user_id: int) -> dict:
+        return dict(self.user_stats.get(user_id, {"questions": 0, "answers": 0}))
+
+    def rebuild_stats(self) -> dict:
+        totals = {f"questions:{status}": 0 for status in QUESTION_STATUSES}
+        users: dict[int, dict] = {}
+        for question in itertools.chain(self.questions.values(), self.archived_questions.values()):
+            if question["user_id"] is not None:
+                users.setdefault(question["user_id"], {"questions": 0, "answers": 0})["questions"] += 1
+        for question in self.questions.values():
+            totals[f"questions:{question['status']}"] += 1
+        totals["answers"] = len(self.answers)
+        totals["archived_questions"] = len(self.archived_questions)
+        for answer in itertools.chain(self.answers.values(), *self.archived_answers.values()):
+            if answer["user_id"] is not None:
+                users.setdefault(answer["user_id"], {"questions": 0, "answers": 0})["answers"] += 1
+        answer_counts = 0
+        for question_id, question in self.questions.items():
+            count = len(self.answers_by_question.get(question_id, ()))
+            if question["answer_count"] != count:
+                question["answer_count"] = count
+                answer_counts += 1
+        wrong_totals = sum(1 for key, value in totals.items() if self.stats[key] != value)
+        wrong_users = sum(1 for user_id, counts in users.items() if self.user_stats.get(user_id) != counts)
+        self.stats.update(totals)
+        self.user_stats.update(users)
+        return {"totals": wrong_totals, "answer_counts": answer_counts, "users": wrong_users}
+
+    # Search
+
+    def search_questions(self, match: str, limit: int, offset: int = 0, status: str | None = None):
+        scores, terms = self.search.match(match)
+        best = {}
+        for (kind, key), score in scores.items():
+            question_id = key if kind == "q" else self.answers[key]["question_id"]
+            question = self.questions.get(question_id)
+            if question is None or (status and question["status"] != status):
+                continue
+            # On a tie the question's own hit wins, then the lowest answer id,
+            # which is what the SQLite query returns.
+            hit = (score, kind == "a", key)
+            if question_id not in best or hit < best[question_id]:
+                best[question_id] = hit
+        ranked = heapq.nsmallest(offset + limit, best.items(), key=lambda item: (item[1][0], -item[0]))[offset:]
+        rows = []
+        for question_id, (score, is_answer, key) in ranked:
+            answer_id = key if is_answer else None
+            question = self.questions[question_id]
+            text = question["message"] if answer_id is None else self.answers[answer_id]["message"]
+            rows.append(self._question_row(question, score=score, hit_answer_id=answer_id, snippet=snippet(text, terms)))
+        return rows
@@ -0,0 +1,209 @@
+"""Prometheus metrics, rendered at ``GET /metrics``.
+
+No client library: a metric is a dict of label values to numbers, and an
+observation is a bisect plus two additions under a lock (DB timings arrive
+from executor threads). The text exposition format is only built when
+/metrics is scraped. Numbers other modules already keep, like connection
+counts or webhook totals, are read at scrape time through ``collect``
+callbacks rather than being counted twice.
+"""
+import asyncio
+import bisect
+import math
+import threading
+import time
+
+from .config import EVENT_LOOP_LAG_INTERVAL
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds. Route and webhook latency, DB queries, and in-process fan-out.
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.25)
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+
+registry: list = []
+
+def _format(value) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), collect=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        # collect() returns the current value, or {label values: value}.
+        self.collect = collect
+        self.values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def samples(self):
+        if self.collect is None:
+            values = dict(self.values)
+        else:
+            current = self.collect()
+            values = current if isinstance(current, dict) else {(): current}
+        for labels, value in values.items():
+            yield self.name, self.labelnames, labels, value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{_labels(names, labels)} {_format(value)}" for name, names, labels, value in self.samples()]
+        return lines
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        self.values[labels] = value
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = REQUEST_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: one count per bucket plus +Inf, not cumulative, then the sum.
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        names = self.labelnames + ("le",)
+        for labels, series in list(self.series.items()):
+            series = list(series)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series):
+                cumulative += count
+                yield f"{self.name}_bucket", names, labels + (_format(bound),), cumulative
+            yield f"{self.name}_sum", self.labelnames, labels, series[-1]
+            yield f"{self.name}_count", self.labelnames, labels, cumulative
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+http_request_seconds = Histogram(
+    "qa_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+)
+db_query_seconds = Histogram(
+    "qa_db_query_duration_seconds", "Time spent in each storage helper, by function name.", ("query",), QUERY_BUCKETS
+)
+db_query_errors = Counter("qa_db_query_errors_total", "Storage helper calls that raised, by function name.", ("query",))
+db_in_flight = Gauge("qa_db_calls_in_flight", "Storage calls queued or running on the db thread pool.")
+event_loop_lag_seconds = Histogram(
+    "qa_event_loop_lag_seconds", "How late the event loop woke a sleeping task.", buckets=LAG_BUCKETS
+)
+webhook_delivery_seconds = Histogram(
+    "qa_webhook_delivery_duration_seconds", "Webhook POST latency by outcome.", ("outcome",)
+)
+ws_broadcast_seconds = Histogram(
+    "qa_ws_broadcast_duration_seconds", "Time to hand one event to every local socket and stream.", buckets=FAST_BUCKETS
+)
+
+class MetricsMiddleware:
+    """Times every HTTP request, labelled by the matched route's path template.
+
+    Requests that match no route share the ``unmatched`` label so scanners
+    can't create unbounded series. ``skip`` paths (long-lived streams) are
+    not timed.
+    """
+
+    def __init__(self, app, skip=frozenset()):
+        self.app = app
+        self.skip = skip
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip:
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - started, scope["method"], getattr(route, "path", "unmatched"), status
+            )
+
+class EventLoopLagMonitor:
+    """Sleeps ``interval`` seconds at a time and records how late it wakes.
+
+    Anything that blocks the loop (a sync call in a route, a huge JSON
+    encode) shows up here, since every socket and request waits behind it.
+    """
+
+    def __init__(self, interval: float = EVENT_LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self.last = 0.0
+        self._task: asyncio.Task | None = None
+        Gauge("qa_event_loop_lag_last_seconds", "Lag measured on the latest wake-up.", collect=lambda: self.last)
+
+    async def start(self):
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.last = max(0.0, loop.time() - expected)
+            event_loop_lag_seconds.observe(self.last)
+
+loop_lag = EventLoopLagMonitor()
@@ -0,0 +1,445 @@
+"""Versioned schema migrations.
+
+The applied version is stored in ``PRAGMA user_version``. Each migration
+runs in its own short BEGIN IMMEDIATE transaction and bumps the version in
+that same transaction, so a failed step leaves the schema at the previous
+version and concurrent workers can't apply the same step twice.
+
+A migration that fills in data for existing rows does so in a backfill:
+after its schema step commits, in batches of ``BACKFILL_BATCH_SIZE`` rows,
+one transaction each, so other writers get the lock between batches. The
+version is only bumped once the backfill is done. Schema steps with a
+backfill are idempotent, so an interrupted migration simply runs again.
+
+    python -m backend.migrations status
+    python -m backend.migrations apply [--to N] [--no-analyze] [--db PATH]
+"""
+import argparse
+import sqlite3
+import time
+from contextlib import contextmanager
+
+MIGRATIONS = []
+BACKFILLS = {}
+
+# Rows per backfill transaction.
+BACKFILL_BATCH_SIZE = 5000
+
+def migration(version: int, name: str):
+    def register(func):
+        MIGRATIONS.append((version, name, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return register
+
+def backfill(version: int):
+    def register(func):
+        BACKFILLS[version] = func
+        return func
+    return register
+
+@contextmanager
+def immediate(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn.cursor()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+def in_batches(conn, table: str, key: str, sql: str):
+    """Run ``sql`` over ``table`` a key range at a time, one transaction each.
+
+    ``sql`` takes the range as two parameters, ``key > ? AND key <= ?``.
+    """
+    low = 0
+    while True:
+        with immediate(conn) as cursor:
+            cursor.execute(
+                f"SELECT MAX({key}) FROM (SELECT {key} FROM {table} WHERE {key} > ? ORDER BY {key} LIMIT ?)",
+                (low, BACKFILL_BATCH_SIZE)
+            )
+            high = cursor.fetchone()[0]
+            if high is None:
+                return
+            cursor.execute(sql, (low, high))
+        low = high
+
+def has_column(cursor, table: str, column: str) -> bool:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+@migration(1, "baseline schema")
+def _baseline(cursor):
+    # Everything init_db used to create. IF NOT EXISTS keeps this a no-op on
+    # databases created before migrations were tracked.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT DEFAULT 'user' CHECK(role IN ('guest', 'user', 'admin'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS questions (
+            question_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            message TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            status TEXT DEFAULT 'Pending' CHECK(status IN ('Pending', 'Escalated', 'Answered')),
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS answers (
+            answer_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question_id INTEGER NOT NULL,
+            user_id INTEGER,
+            message TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            FOREIGN KEY (question_id) REFERENCES questions(question_id),
+            FOREIGN KEY (user_id) REFERENCES users(user_id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    ''')
+    # Start from a random point so ETags from a previous database file
+    # can never match a new one.
+    cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('data_version', abs(random() % 1000000000000))")
+    cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('changes_floor', 0)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            type TEXT NOT NULL,
+            question_id INTEGER,
+            data TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS webhook_outbox (
+            outbox_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'dead'))
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_webhook_outbox_due
+        ON webhook_outbox (status, next_attempt_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_questions_feed
+        ON questions ((CASE WHEN status = 'Escalated' THEN 0 ELSE 1 END), timestamp DESC, question_id DESC)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_questions_status_feed
+        ON questions (status, timestamp DESC, question_id DESC)
+    ''')
+    _init_search(cursor)
+
+def _init_search(cursor):
+    """Create the FTS5 indexes over question and answer text, plus sync triggers.
+
+    Both are external-content tables, so the text is stored only once. An
+    index that did not exist yet is backfilled from its content table.
+    """
+    for table, key in (("questions", "question_id"), ("answers", "answer_id")):
+        fts = f"{table}_fts"
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+        exists = cursor.fetchone() is not None
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(message, content='{table}', content_rowid='{key}')")
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts} (rowid, message) VALUES (new.{key}, new.message);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, message) VALUES ('delete', old.{key}, old.message);
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE OF message ON {table} BEGIN
+                INSERT INTO {fts} ({fts}, rowid, message) VALUES ('delete', old.{key}, old.message);
+                INSERT INTO {fts} (rowid, message) VALUES (new.{key}, new.message);
+            END
+        ''')
+        if not exists:
+            cursor.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+@migration(2, "hot-path indexes")
+def _hot_path_indexes(cursor):
+    # Answers are always fetched per question in timestamp order; the
+    # user_id indexes back the foreign keys and per-user lookups.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_answers_question ON answers (question_id, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_answers_user ON answers (user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_questions_user ON questions (user_id)")
+
+@migration(3, "answered_at for archival")
+def _answered_at(cursor):
+    if not has_column(cursor, "questions", "answered_at"):
+        cursor.execute("ALTER TABLE questions ADD COLUMN answered_at TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_questions_answered ON questions (answered_at) WHERE status = 'Answered'")
+
+@backfill(3)
+def _answered_at_backfill(conn):
+    # Best guess for existing rows: the last answer, else the question itself.
+    in_batches(conn, "questions", "question_id", '''
+        UPDATE questions SET answered_at = COALESCE(
+            (SELECT MAX(a.timestamp) FROM answers a WHERE a.question_id = questions.question_id),
+            timestamp
+        )
+        WHERE status = 'Answered' AND answered_at IS NULL AND question_id > ? AND question_id <= ?
+    ''')
+
+@migration(4, "deferrable search indexing")
+def _deferrable_fts(cursor):
+    # Bulk imports set fts_deferred inside their own write transaction and
+    # index the new rows with one INSERT ... SELECT instead, which is several
+    # times faster than firing the trigger per row. The flag is reset before
+    # that transaction commits, so no other writer ever sees it set.
+    cursor.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('fts_deferred', 0)")
+    for table, key in (("questions", "question_id"), ("answers", "answer_id")):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {table}_fts_insert")
+        cursor.execute(f'''
+            CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table}
+            WHEN (SELECT value FROM meta WHERE key = 'fts_deferred') = 0
+            BEGIN
+                INSERT INTO {table}_fts (rowid, message) VALUES (new.{key}, new.message);
+            END
+        ''')
+
+# Lifetime per-user activity, counted from scratch. Used to backfill
+# user_stats and by the consistency check in db.rebuild_stats.
+USER_ACTIVITY = '''
+    SELECT user_id, SUM(questions) AS questions, SUM(answers) AS answers FROM (
+        SELECT user_id, 1 AS questions, 0 AS answers FROM main.questions WHERE user_id IS NOT NULL
+        UNION ALL SELECT user_id, 1, 0 FROM archive.questions WHERE user_id IS NOT NULL
+        UNION ALL SELECT user_id, 0, 1 FROM main.answers WHERE user_id IS NOT NULL
+        UNION ALL SELECT user_id, 0, 1 FROM archive.answers WHERE user_id IS NOT NULL
+    )
+    GROUP BY user_id
+'''
+
+# The value a stats row should hold, counted from scratch.
+STATS_RECOUNT = '''
+    CASE
+        WHEN stats.key LIKE 'questions:%' THEN (SELECT COUNT(*) FROM main.questions WHERE status = substr(stats.key, 11))
+        WHEN stats.key = 'answers' THEN (SELECT COUNT(*) FROM main.answers)
+        WHEN stats.key = 'archived_questions' THEN (SELECT COUNT(*) FROM archive.questions)
+        ELSE stats.value
+    END
+'''
+
+def recount_stats(cursor) -> int:
+    cursor.execute(f"UPDATE stats SET value = {STATS_RECOUNT} WHERE value != {STATS_RECOUNT}")
+    return cursor.rowcount
+
+@migration(5, "incremental dashboard stats")
+def _stats(cursor):
+    # Counters kept current by triggers so the dashboard never has to count
+    # rows. Status and answer totals cover the hot tables (archival moves
+    # rows out and counts them in archived_questions); per-user activity
+    # only ever grows.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stats (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.executemany(
+        "INSERT OR IGNORE INTO stats (key, value) VALUES (?, 0)",
+        [("questions:Pending",), ("questions:Escalated",), ("questions:Answered",), ("answers",), ("archived_questions",)]
+    )
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id INTEGER PRIMARY KEY,
+            questions INTEGER NOT NULL DEFAULT 0,
+            answers INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_stats_activity ON user_stats ((questions + answers) DESC)")
+    if not has_column(cursor, "questions", "answer_count"):
+        cursor.execute("ALTER TABLE questions ADD COLUMN answer_count INTEGER NOT NULL DEFAULT 0")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS questions_stats_insert AFTER INSERT ON questions BEGIN
+            UPDATE stats SET value = value + 1 WHERE key = 'questions:' || new.status;
+            INSERT INTO user_stats (user_id, questions) SELECT new.user_id, 1 WHERE new.user_id IS NOT NULL
+            ON CONFLICT (user_id) DO UPDATE SET questions = questions + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS questions_stats_delete AFTER DELETE ON questions BEGIN
+            UPDATE stats SET value = value - 1 WHERE key = 'questions:' || old.status;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS questions_stats_update AFTER UPDATE OF status ON questions
+        WHEN old.status IS NOT new.status
+        BEGIN
+            UPDATE stats SET value = value - 1 WHERE key = 'questions:' || old.status;
+            UPDATE stats SET value = value + 1 WHERE key = 'questions:' || new.status;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS answers_stats_insert AFTER INSERT ON answers BEGIN
+            UPDATE questions SET answer_count = answer_count + 1 WHERE question_id = new.question_id;
+            UPDATE stats SET value = value + 1 WHERE key = 'answers';
+            INSERT INTO user_stats (user_id, answers) SELECT new.user_id, 1 WHERE new.user_id IS NOT NULL
+            ON CONFLICT (user_id) DO UPDATE SET answers = answers + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS answers_stats_delete AFTER DELETE ON answers BEGIN
+            UPDATE questions SET answer_count = answer_count - 1 WHERE question_id = old.question_id;
+            UPDATE stats SET value = value - 1 WHERE key = 'answers';
+        END
+    ''')
+
+@backfill(5)
+def _stats_backfill(conn):
+    # The triggers are live from here on. Each batch writes absolute counts,
+    # so it overwrites whatever the triggers added for its rows meanwhile,
+    # and they keep the counts right from then on.
+    in_batches(conn, "questions", "question_id", '''
+        UPDATE questions SET answer_count = (SELECT COUNT(*) FROM answers a WHERE a.question_id = questions.question_id)
+        WHERE question_id > ? AND question_id <= ?
+    ''')
+    # Activity by ids with no users row is left to db.rebuild_stats.
+    in_batches(conn, "users", "user_id", f'''
+        INSERT OR REPLACE INTO user_stats (user_id, questions, answers)
+        SELECT * FROM ({USER_ACTIVITY}) WHERE user_id > ? AND user_id <= ?
+    ''')
+    with immediate(conn) as cursor:
+        recount_stats(cursor)
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# The archive is a separate file with its own version, attached to every
+# pooled connection as "archive". It has no AUTOINCREMENT: ids come from the hot
+# tables.
+ARCHIVE_SCHEMA_VERSION = 1
+
+def init_archive(conn):
+    if conn.execute("PRAGMA archive.user_version").fetchone()[0] >= ARCHIVE_SCHEMA_VERSION:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS archive.questions (
+                question_id INTEGER PRIMARY KEY,
+                user_id INTEGER,
+                message TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                status TEXT NOT NULL,
+                answered_at TEXT
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_archive_questions_feed ON questions (timestamp DESC, question_id DESC)")
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS archive.answers (
+                answer_id INTEGER PRIMARY KEY,
+                question_id INTEGER NOT NULL,
+                user_id INTEGER,
+                message TEXT NOT NULL,
+                timestamp TEXT NOT NULL
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS archive.idx_archive_answers_question ON answers (question_id, timestamp)")
+        conn.execute(f"PRAGMA archive.user_version = {ARCHIVE_SCHEMA_VERSION}")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+# Rows sampled per index by ANALYZE, so refreshing statistics stays fast
+# (and holds the write lock briefly) on large databases.
+ANALYSIS_LIMIT = 1000
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def pending(conn, target: int | None = None) -> list:
+    current = schema_version(conn)
+    target = SCHEMA_VERSION if target is None else target
+    return [m for m in MIGRATIONS if current < m[0] <= target]
+
+def analyze(conn):
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+    conn.commit()
+
+def migrate(conn, target: int | None = None, run_analyze: bool = True, on_step=None) -> list:
+    """Apply pending migrations up to ``target``; returns the versions applied."""
+    applied = []
+    for version, name, func in pending(conn, target):
+        started = time.perf_counter()
+        with immediate(conn) as cursor:
+            # Another process may have applied it while we waited for the lock.
+            if schema_version(conn) >= version:
+                continue
+            func(cursor)
+            if version not in BACKFILLS:
+                cursor.execute(f"PRAGMA user_version = {int(version)}")
+        if version in BACKFILLS:
+            BACKFILLS[version](conn)
+            with immediate(conn) as cursor:
+                if schema_version(conn) >= version:
+                    continue
+                cursor.execute(f"PRAGMA user_version = {int(version)}")
+        applied.append(version)
+        if on_step:
+            on_step(version, name, time.perf_counter() - started)
+    if applied and run_analyze:
+        analyze(conn)
+    return applied
+
+def main(argv=None):
+    from . import db
+
+    parser = argparse.ArgumentParser(prog="python -m backend.migrations", description="Inspect or apply schema migrations.")
+    parser.add_argument("--db", default=db.DATABASE_PATH, help="database file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="show the current version and pending migrations")
+    apply = sub.add_parser("apply", help="apply pending migrations, one transaction each")
+    apply.add_argument("--to", type=int, default=None, help="stop after this version")
+    apply.add_argument("--no-analyze", action="store_true", help="skip ANALYZE / PRAGMA optimize afterwards")
+    apply.add_argument("--archive", default=None, help="archive database to attach (default: the one the app uses for --db)")
+    sub.add_parser("analyze", help="refresh query planner statistics")
+    args = parser.parse_args(argv)
+
+    # Only migrations read the archive (stats recounts include archived rows).
+    conn = db.get_connection(args.db, (args.archive or db.archive_path(args.db)) if args.command == "apply" else None)
+    try:
+        if args.command == "status":
+            print(f"{args.db}: version {schema_version(conn)} of {SCHEMA_VERSION}")
+            for version, name, _ in pending(conn):
+                print(f"  pending {version}: {name}")
+        elif args.command == "apply":
+            def report(version, name, seconds):
+                print(f"applied {version}: {name} ({seconds:.2f}s)")
+            applied = migrate(conn, args.to, not args.no_analyze, report)
+            print(f"{args.db}: version {schema_version(conn)}" + ("" if applied else " (nothing to do)"))
+        else:
+            analyze(conn)
+            print(f"{args.db}: statistics refreshed")
+    except sqlite3.Error as exc:
+        parser.exit(1, f"error: {exc}\n")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""bcrypt hashing on a bounded process pool.
+
+bcrypt is deliberately slow, so running it inside ``async def`` handlers
+freezes the event loop for every other request. Hashes are computed in a
+small pool of worker processes instead. Admission is capped: once
+``max_concurrency`` jobs are running and ``max_queue`` more are waiting,
+new requests fail fast with :class:`PasswordHasherBusy` rather than piling
+up behind a login storm.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+from .config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_CONCURRENCY, PASSWORD_HASH_MAX_QUEUE
+
+class PasswordHasherBusy(Exception):
+    pass
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def verify_password(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+def hash_rounds(hashed: str) -> int:
+    # bcrypt hashes look like $2b$<cost>$<salt+digest>
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+def needs_rehash(hashed: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    return hash_rounds(hashed) != rounds
+
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_concurrency: int = PASSWORD_HASH_MAX_CONCURRENCY,
+                 max_queue: int = PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor: ProcessPoolExecutor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self.in_flight >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight += 1
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+        return await self._run(hash_password, password, rounds)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(verify_password, password, hashed)
+
+    def warm_up(self):
+        # Start the worker processes ahead of the first login, and before the
+        # DB executor threads exist, so they fork from a quiet parent.
+        executor = self._get_executor()
+        for _ in range(self.workers):
+            executor.submit(hash_rounds, "")
+
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight, "rejected": self.rejected, "workers": self.workers,
+                "max_concurrency": self.max_concurrency, "max_queue": self.max_queue}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._semaphore = None
+
+hasher = PasswordHasher()
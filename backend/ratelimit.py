@@ -0,0 +1,151 @@
+"""Per-client rate limiting and load shedding for the HTTP API.
+
+Written as plain ASGI middleware so the check costs a dict lookup and a
+little arithmetic per request, with no extra task or body buffering.
+"""
+import math
+import re
+import time
+from collections import OrderedDict
+
+from fastapi.responses import JSONResponse
+
+from .config import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_LOGIN, RATE_LIMIT_REGISTER, RATE_LIMIT_QUESTIONS, RATE_LIMIT_ANSWERS,
+    RATE_LIMIT_ADMIN, RATE_LIMIT_MAX_KEYS, RATE_LIMIT_TRUST_PROXY, MAX_IN_FLIGHT_REQUESTS,
+)
+from .metrics import Counter, Gauge
+from .routers.auth import decode_user_id
+
+def parse_rate(spec: str) -> tuple[float, float]:
+    """Parse "<requests>/<seconds>" into (tokens per second, burst)."""
+    count, _, seconds = spec.partition("/")
+    count, seconds = float(count), float(seconds or 1)
+    return count / seconds, count
+
+# (method, path pattern, policy). The first match wins; unmatched routes are
+# not limited.
+ROUTE_POLICIES = [
+    ("POST", re.compile(r"^/auth/login$"), "login"),
+    ("POST", re.compile(r"^/auth/register$"), "register"),
+    ("POST", re.compile(r"^/questions$"), "questions"),
+    ("POST", re.compile(r"^/questions/\d+/answer$"), "answers"),
+    ("POST", re.compile(r"^/questions/\d+/(mark-answered|escalate)$"), "admin"),
+    ("POST", re.compile(r"^/questions/bulk-status$"), "admin"),
+]
+
+POLICIES = {
+    "login": parse_rate(RATE_LIMIT_LOGIN),
+    "register": parse_rate(RATE_LIMIT_REGISTER),
+    "questions": parse_rate(RATE_LIMIT_QUESTIONS),
+    "answers": parse_rate(RATE_LIMIT_ANSWERS),
+    "admin": parse_rate(RATE_LIMIT_ADMIN),
+}
+
+SHED_EXEMPT = {"/health", "/metrics"}
+# Open for as long as the client listens; capped by the connection manager
+# instead, so they must not use up the in-flight budget.
+LONG_LIVED = {"/questions/events"}
+
+class RateLimiter:
+    """Token buckets kept in a bounded LRU.
+
+    A bucket is just (tokens, last refill). When ``max_keys`` is reached the
+    least recently seen key is dropped; it would have refilled to a full
+    bucket anyway unless it is actively sending, in which case it is not the
+    least recent.
+    """
+
+    def __init__(self, policies: dict, max_keys: int = RATE_LIMIT_MAX_KEYS,
+                 max_in_flight: int = MAX_IN_FLIGHT_REQUESTS, enabled: bool = RATE_LIMIT_ENABLED):
+        self.policies = policies
+        self.max_keys = max_keys
+        self.max_in_flight = max_in_flight
+        self.enabled = enabled
+        self.in_flight = 0
+        self.shed = 0
+        self.allowed = 0
+        self.limited = 0
+        self.evictions = 0
+        self._buckets: OrderedDict = OrderedDict()
+
+    def hit(self, policy: str, identity) -> float:
+        """Take a token; returns 0 if allowed, else seconds until one is available."""
+        rate, burst = self.policies[policy]
+        key = (policy, identity)
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = burst
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+        else:
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            self._buckets.move_to_end(key)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            self.allowed += 1
+            return 0
+        self._buckets[key] = (tokens, now)
+        self.limited += 1
+        return (1 - tokens) / rate
+
+    def stats(self) -> dict:
+        return {"enabled": self.enabled, "in_flight": self.in_flight, "max_in_flight": self.max_in_flight,
+                "shed": self.shed, "keys": len(self._buckets), "max_keys": self.max_keys,
+                "allowed": self.allowed, "limited": self.limited, "evictions": self.evictions}
+
+def client_identity(scope) -> str:
+    headers = dict(scope["headers"])
+    auth = headers.get(b"authorization", b"")
+    if auth[:7].lower() == b"bearer ":
+        user_id = decode_user_id(auth[7:].decode("latin-1"))
+        if user_id:
+            return f"user:{user_id}"
+    if RATE_LIMIT_TRUST_PROXY and b"x-forwarded-for" in headers:
+        return "ip:" + headers[b"x-forwarded-for"].decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+class RateLimitMiddleware:
+    def __init__(self, app, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        limiter = self.limiter
+        path = scope["path"]
+        if path in LONG_LIVED:
+            return await self.app(scope, receive, send)
+        if limiter.max_in_flight and limiter.in_flight >= limiter.max_in_flight and path not in SHED_EXEMPT:
+            # Reject before doing any work so the requests already admitted
+            # can finish instead of every request slowing down.
+            limiter.shed += 1
+            response = JSONResponse(status_code=503, content={"detail": "Server busy, please retry"}, headers={"Retry-After": "1"})
+            return await response(scope, receive, send)
+        if limiter.enabled:
+            method = scope["method"]
+            for route_method, pattern, policy in ROUTE_POLICIES:
+                if method == route_method and pattern.match(path):
+                    retry_after = limiter.hit(policy, client_identity(scope))
+                    if retry_after:
+                        response = JSONResponse(
+                            status_code=429,
+                            content={"detail": "Too many requests"},
+                            headers={"Retry-After": str(math.ceil(retry_after))},
+                        )
+                        return await response(scope, receive, send)
+                    break
+        limiter.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.in_flight -= 1
+
+limiter = RateLimiter(POLICIES)
+Gauge("qa_http_in_flight", "HTTP requests being handled.", collect=lambda: limiter.in_flight)
+Counter("qa_http_shed_total", "Requests refused with 503 at the in-flight cap.", collect=lambda: limiter.shed)
+Counter("qa_http_rate_limited_total", "Requests refused with 429 by a rate limit.", collect=lambda: limiter.limited)
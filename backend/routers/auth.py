@@ -1,12 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
+import time
 from typing import Optional
 
 from ..schemas import UserRegister, UserLogin, UserResponse, TokenResponse
-from ..db import get_user_by_email, get_user_by_username, create_user, get_user_by_id, verify_password
-from ..config import JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRATION_HOURS
+from ..async_db import get_user_by_email, get_user_by_username, create_user, get_user_by_id, update_user_password
+from ..config import JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRATION_HOURS, ADMIN_DEFAULT_EMAIL, ADMIN_DEFAULT_PASSWORD, BCRYPT_ROUNDS
+from ..passwords import hasher, needs_rehash
+from ..cache import user_cache, token_cache
+from ..storage import IntegrityError
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 security = HTTPBearer(auto_error=False)
@@ -15,17 +19,50 @@ def create_access_token(user_id: int) -> str:
     expire = datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
     return jwt.encode({"user_id": user_id, "exp": expire}, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def decode_user_id(token: str) -> int | None:
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        return None
+    user_id = payload.get("user_id")
+    if user_id:
+        # Never cache a token past its own expiry.
+        token_cache.set(token, user_id, ttl=payload.get("exp", 0) - time.time())
+    return user_id
+
+async def load_user(user_id: int) -> dict | None:
+    user = user_cache.get(user_id)
+    if user is None:
+        row = await get_user_by_id(user_id)
+        if not row:
+            return None
+        user = dict(row)
+        user_cache.set(user_id, user)
+    return dict(user)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     if not credentials:
         return None
+    user_id = decode_user_id(credentials.credentials)
+    if user_id:
+        return await load_user(user_id)
+    return None
+
+async def seed_default_admin():
+    # Runs in the background after startup so the admin hash never delays boot.
+    if await get_user_by_email(ADMIN_DEFAULT_EMAIL):
+        return
+    password_hash = await hasher.hash(ADMIN_DEFAULT_PASSWORD)
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get("user_id")
-        if user_id:
-            user = get_user_by_id(user_id)
-            return dict(user) if user else None
-    except JWTError:
-        return None
+        await create_user("admin", ADMIN_DEFAULT_EMAIL, password_hash, "admin")
+    except IntegrityError:
+        pass  # another worker seeded it first
+
+async def rehash_password(user_id: int, password: str):
+    await update_user_password(user_id, await hasher.hash(password, BCRYPT_ROUNDS))
 
 async def require_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     user = await get_current_user(credentials)
@@ -40,19 +77,20 @@ async def require_admin(user: dict = Depends(require_user)):
 
 @router.post("/register", response_model=TokenResponse)
 async def register(user_data: UserRegister):
-    existing_email = get_user_by_email(user_data.email)
+    existing_email = await get_user_by_email(user_data.email)
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    existing_username = get_user_by_username(user_data.username)
+    existing_username = await get_user_by_username(user_data.username)
     if existing_username:
         raise HTTPException(status_code=400, detail="Username already taken")
     
-    user_id = create_user(user_data.username, user_data.email, user_data.password)
+    password_hash = await hasher.hash(user_data.password)
+    user_id = await create_user(user_data.username, user_data.email, password_hash)
     if not user_id:
         raise HTTPException(status_code=500, detail="Failed to create user")
     
-    user = get_user_by_id(user_id)
+    user = await get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=500, detail="User not found after creation")
     
@@ -70,14 +108,18 @@ async def register(user_data: UserRegister):
     )
 
 @router.post("/login", response_model=TokenResponse)
-async def login(user_data: UserLogin):
-    user = get_user_by_email(user_data.email)
+async def login(user_data: UserLogin, background_tasks: BackgroundTasks):
+    user = await get_user_by_email(user_data.email)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    if not verify_password(user_data.password, user["password"]):
+    if not await hasher.verify(user_data.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
+    user_cache.set(user["user_id"], dict(user))
+    if needs_rehash(user["password"], BCRYPT_ROUNDS):
+        background_tasks.add_task(rehash_password, user["user_id"], user_data.password)
+    
     token = create_access_token(user["user_id"])
     
     return TokenResponse(
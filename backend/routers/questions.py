@@ -1,120 +1,312 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Optional
-import httpx
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+import base64
+import binascii
+import hashlib
+import html
+import json
+import re
 
-from ..schemas import QuestionCreate, QuestionResponse, AnswerCreate, AnswerResponse
-from ..db import get_all_questions, get_question_by_id, create_question, update_question_status, get_answers_for_question, create_answer
+from ..schemas import QuestionCreate, QuestionResponse, QuestionSearchResult, AnswerCreate, AnswerResponse, BulkStatusUpdate, BulkStatusResponse
+from ..async_db import get_all_questions_with_answers, get_questions_page, get_answers_for_questions, get_question_by_id, create_question, update_question_status, update_questions_status, create_answer, search_questions, get_data_version, get_changes_since, stream_db, import_questions, log_resync, get_stats, get_user_stats
 from .auth import get_current_user, require_admin
 from ..websocket_manager import manager
-from ..config import WEBHOOK_URL
+from ..webhooks import dispatcher
+from ..cache import feed_cache
+from ..ratelimit import client_identity
+from ..config import IMPORT_BATCH_SIZE, STATS_TOP_USERS
+from ..serialization import FastJSONResponse, dumps, loads, question_to_dict
+from ..storage import engine
 
 router = APIRouter(prefix="/questions", tags=["Questions"])
 
-async def trigger_webhook(event: str, data: dict):
-    if WEBHOOK_URL:
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        rank, timestamp, question_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if rank not in (0, 1) or not isinstance(timestamp, str) or not isinstance(question_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return rank, timestamp, question_id
+
+SEARCH_TERM = re.compile(r"\w+")
+
+def to_match_query(q: str) -> str | None:
+    # Quote every term so user input can never be parsed as FTS5 syntax, and
+    # prefix-match the last one for search-as-you-type.
+    terms = SEARCH_TERM.findall(q)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+def highlight(snippet: str | None) -> str | None:
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace("\x02", "<mark>").replace("\x03", "</mark>")
+
+async def build_feed(limit: int | None, cursor: str | None, status: str | None, include_archived: bool = False):
+    # Without paging parameters the full feed is returned, as before. The
+    # next page's cursor is sent in the X-Next-Cursor header so the body
+    # stays a plain list for existing clients.
+    next_cursor = None
+    if limit is None and cursor is None and status is None:
+        questions, answers = await get_all_questions_with_answers(include_archived)
+    else:
+        after = decode_cursor(cursor) if cursor else None
+        questions, next_key = await get_questions_page(limit or MAX_PAGE_SIZE, after, status, include_archived)
+        answers = await get_answers_for_questions([q["question_id"] for q in questions], include_archived)
+        if next_key:
+            next_cursor = encode_cursor(next_key)
+    # Rows go straight to dicts and are encoded once; response_model is only
+    # documentation here, since the data comes from our own tables.
+    return dumps([question_to_dict(q, answers.get(q["question_id"], [])) for q in questions]), next_cursor
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+@router.get("", response_model=List[QuestionResponse])
+async def list_questions(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[Literal["Pending", "Escalated", "Answered"]] = None,
+    include_archived: bool = False,
+):
+    # The serialized body only changes when data_version does, so it is
+    # cached per (version, params) and the same key doubles as a strong ETag.
+    key = (await get_data_version(), limit, cursor, status, include_archived)
+    etag = '"%s"' % hashlib.blake2b(repr(key).encode('utf-8'), digest_size=12).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    cached = feed_cache.get(key)
+    if cached is None:
+        cached = await build_feed(limit, cursor, status, include_archived)
+        feed_cache.set(key, cached)
+    body, next_cursor = cached
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/search", response_model=List[QuestionSearchResult])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[Literal["Pending", "Escalated", "Answered"]] = None,
+):
+    match = to_match_query(q)
+    if not match:
+        return FastJSONResponse([])
+    offset = 0
+    if cursor:
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                payload = {"event": event, **data}
-                await client.post(WEBHOOK_URL, json=payload)
-        except:
-            pass
-
-def question_to_response(question, username: str | None = None, include_answers: bool = True) -> QuestionResponse:
-    answers = []
-    if include_answers:
-        answers = [
-            AnswerResponse(
-                answer_id=a["answer_id"],
-                question_id=a["question_id"],
-                user_id=a["user_id"],
-                username=a["username"] if "username" in a.keys() else None,
-                message=a["message"],
-                timestamp=a["timestamp"]
-            )
-            for a in get_answers_for_question(question["question_id"])
-        ]
-    
-    return QuestionResponse(
-        question_id=question["question_id"],
-        user_id=question["user_id"],
-        username=username or (question["username"] if "username" in question.keys() else None),
-        message=question["message"],
-        timestamp=question["timestamp"],
-        status=question["status"],
-        answers=answers
+            offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))["offset"])
+        except (ValueError, TypeError, KeyError, binascii.Error):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    rows = await search_questions(match, limit + 1, offset, status)
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor({"offset": offset + limit})
+    answers = await get_answers_for_questions([row["question_id"] for row in rows])
+    return FastJSONResponse([
+        {**question_to_dict(row, answers.get(row["question_id"], [])), "snippet": highlight(row["snippet"]), "score": row["score"]}
+        for row in rows
+    ], headers=headers)
+
+@router.get("/stats")
+async def question_stats(user: Optional[dict] = Depends(get_current_user)):
+    # Read from trigger-maintained counters, so this is constant time
+    # however many questions there are.
+    stats = await get_stats(STATS_TOP_USERS)
+    if user:
+        stats["me"] = await get_user_stats(user["user_id"])
+    return stats
+
+@router.get("/export")
+async def export_questions(include_archived: bool = False, admin: dict = Depends(require_admin)):
+    # One NDJSON line per question with its answers nested, streamed a
+    # fetchmany() batch at a time.
+    async def lines():
+        async for batch in stream_db(engine.iter_export, include_archived):
+            yield b"".join(dumps(question) + b"\n" for question in batch)
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="questions.ndjson"'}
     )
 
-@router.get("", response_model=List[QuestionResponse])
-async def list_questions():
-    questions = get_all_questions()
-    return [question_to_response(q) for q in questions]
+IMPORT_STATUSES = {"Pending", "Escalated", "Answered"}
+MAX_IMPORT_ERRORS = 100
+
+def optional_string(record: dict, key: str) -> bool:
+    return record.get(key) is None or isinstance(record[key], str)
+
+def parse_import_line(line: bytes) -> dict:
+    record = loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("expected an object")
+    if not isinstance(record.get("message"), str) or not record["message"].strip():
+        raise ValueError("message is required")
+    if not isinstance(record.get("timestamp"), str):
+        raise ValueError("timestamp is required")
+    # Both are used as lookup keys and bound as SQL parameters, where any
+    # other type fails only once the batch is written.
+    for key in ("username", "answered_at"):
+        if not optional_string(record, key):
+            raise ValueError(f"{key} must be a string")
+    record.setdefault("status", "Pending")
+    if record["status"] not in IMPORT_STATUSES:
+        raise ValueError(f"invalid status {record['status']!r}")
+    answers = record.get("answers") or []
+    if not isinstance(answers, list) or not all(
+        isinstance(a, dict) and isinstance(a.get("message"), str) and isinstance(a.get("timestamp"), str) for a in answers
+    ):
+        raise ValueError("answers must be objects with message and timestamp")
+    if not all(optional_string(a, "username") for a in answers):
+        raise ValueError("answer username must be a string")
+    record["answers"] = answers
+    return record
+
+@router.post("/import")
+async def import_ndjson(request: Request, admin: dict = Depends(require_admin)):
+    # Accepts the export format. The body is read as a stream and written in
+    # IMPORT_BATCH_SIZE-question transactions, so file size doesn't matter;
+    # invalid lines are skipped and reported by line number.
+    totals = {"questions": 0, "answers": 0}
+    errors = []
+    error_count = 0
+    batch = []
+    buffer = b""
+    line_number = 0
+
+    async def add(line: bytes):
+        nonlocal error_count, line_number
+        line_number += 1
+        if not line.strip():
+            return
+        try:
+            batch.append(parse_import_line(line))
+        except ValueError as exc:
+            error_count += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                errors.append({"line": line_number, "error": str(exc)})
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush()
+
+    async def flush():
+        result = await import_questions(batch)
+        totals["questions"] += result["questions"]
+        totals["answers"] += result["answers"]
+        batch.clear()
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            await add(line)
+    await add(buffer)
+    if batch:
+        await flush()
+    if totals["questions"]:
+        # Imported rows are not replayed one by one; clients reload instead.
+        await manager.broadcast(await log_resync())
+    return {"imported_questions": totals["questions"], "imported_answers": totals["answers"], "error_count": error_count, "errors": errors}
+
+@router.get("/events")
+async def question_events(request: Request, since: Optional[int] = Query(None, ge=0)):
+    # Read-only Server-Sent Events feed carrying the same messages as
+    # /ws/questions. EventSource sends Last-Event-ID on reconnect; ?since=
+    # covers the first connection.
+    last_event_id = request.headers.get("last-event-id", "")
+    if last_event_id.isdigit():
+        since = int(last_event_id)
+    key = client_identity(request.scope)
+    reason = manager.check_capacity(key)
+    if reason:
+        raise HTTPException(status_code=503, detail=reason, headers={"Retry-After": "5"})
+    return StreamingResponse(
+        manager.event_stream(since, key),
+        media_type="text/event-stream",
+        # X-Accel-Buffering stops nginx from holding events back.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/changes")
+async def list_changes(since: int = Query(..., ge=0), limit: int = Query(500, ge=1, le=MAX_PAGE_SIZE * 5)):
+    # Replays missed deltas for reconnecting clients. resync means the log
+    # was compacted past `since` and the client must reload GET /questions.
+    changes, floor, latest = await get_changes_since(since, limit)
+    if since < floor:
+        return {"changes": [], "latest_seq": latest, "resync": True, "has_more": False}
+    has_more = bool(changes) and changes[-1]["seq"] < latest
+    return {"changes": changes, "latest_seq": latest, "resync": False, "has_more": has_more}
 
 @router.post("", response_model=QuestionResponse)
 async def submit_question(question_data: QuestionCreate, user: Optional[dict] = Depends(get_current_user)):
-    question = create_question(question_data.message, user["user_id"] if user else None)
-    response = question_to_response(question, username=user["username"] if user else None)
-    await manager.broadcast({"type": "new_question", "data": response.model_dump()})
-    await trigger_webhook("new_question", {
-        "question_id": question["question_id"],
-        "message": question["message"],
-        "username": user["username"] if user else None,
-        "timestamp": question["timestamp"]
+    question = await create_question(question_data.message, user["user_id"] if user else None, user["username"] if user else None)
+    # The broadcast payload is exactly the response body.
+    await manager.broadcast(question["change"])
+    dispatcher.notify()
+    return FastJSONResponse(question["change"]["data"])
+
+@router.post("/bulk-status", response_model=BulkStatusResponse)
+async def bulk_status(update: BulkStatusUpdate, admin: dict = Depends(require_admin)):
+    # One transaction and one status_update broadcast carrying every
+    # updated question; webhooks still go out per question.
+    result = await update_questions_status(update.question_ids, update.status)
+    updated = {q["question_id"]: question_to_dict(q, q["answers"]) for q in result["questions"]}
+    if result["change"]:
+        await manager.broadcast(result["change"])
+        dispatcher.notify()
+    return FastJSONResponse({
+        "status": update.status,
+        "updated": len(updated),
+        "not_found": len(result["not_found"]),
+        "results": [
+            {"question_id": question_id, "result": "updated", "question": updated[question_id]}
+            if question_id in updated else {"question_id": question_id, "result": "not_found", "question": None}
+            for question_id in dict.fromkeys(update.question_ids)
+        ]
     })
-    return response
 
 @router.post("/{question_id}/answer", response_model=AnswerResponse)
 async def add_answer(question_id: int, answer_data: AnswerCreate, user: Optional[dict] = Depends(get_current_user)):
-    if not get_question_by_id(question_id):
+    if not await get_question_by_id(question_id):
         raise HTTPException(status_code=404, detail="Question not found")
     
-    answer = create_answer(question_id, answer_data.message, user["user_id"] if user else None)
-    response = AnswerResponse(
-        answer_id=answer["answer_id"],
-        question_id=answer["question_id"],
-        user_id=answer["user_id"],
-        username=user["username"] if user else None,
-        message=answer["message"],
-        timestamp=answer["timestamp"]
-    )
-    
-    await manager.broadcast({"type": "new_answer", "data": {"question_id": question_id, "answer": response.model_dump()}})
-    await trigger_webhook("new_answer", {
-        "answer_id": answer["answer_id"],
-        "question_id": question_id,
-        "message": answer["message"],
-        "username": user["username"] if user else None,
-        "timestamp": answer["timestamp"]
-    })
-    return response
+    answer = await create_answer(question_id, answer_data.message, user["user_id"] if user else None, user["username"] if user else None)
+    await manager.broadcast(answer["change"])
+    dispatcher.notify()
+    return FastJSONResponse(answer["change"]["data"]["answer"])
 
 @router.post("/{question_id}/mark-answered", response_model=QuestionResponse)
 async def mark_answered(question_id: int, admin: dict = Depends(require_admin)):
-    if not get_question_by_id(question_id):
+    updated = await update_question_status(question_id, "Answered")
+    if not updated:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    updated = update_question_status(question_id, "Answered")
-    response = question_to_response(updated, include_answers=False)
-    await manager.broadcast({"type": "status_update", "data": response.model_dump()})
-    
-    await trigger_webhook("question_answered", {
-        "question_id": question_id,
-        "message": updated["message"],
-        "timestamp": updated["timestamp"]
-    })
-    
-    return question_to_response(updated)
+    await manager.broadcast(updated["change"])
+    dispatcher.notify()
+    return FastJSONResponse(question_to_dict(updated, updated["answers"]))
 
 @router.post("/{question_id}/escalate", response_model=QuestionResponse)
 async def escalate_question(question_id: int, admin: dict = Depends(require_admin)):
-    if not get_question_by_id(question_id):
+    updated = await update_question_status(question_id, "Escalated")
+    if not updated:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    updated = update_question_status(question_id, "Escalated")
-    response = question_to_response(updated, include_answers=False)
-    await manager.broadcast({"type": "status_update", "data": response.model_dump()})
-    await trigger_webhook("question_escalated", {
-        "question_id": question_id,
-        "message": updated["message"],
-        "timestamp": updated["timestamp"]
-    })
-    return question_to_response(updated)
+    await manager.broadcast(updated["change"])
+    dispatcher.notify()
+    return FastJSONResponse(question_to_dict(updated, updated["answers"]))
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Optional, List, Literal
 from datetime import datetime
 import re
 
@@ -75,6 +75,25 @@ class QuestionResponse(BaseModel):
     status: str
     answers: List['AnswerResponse'] = []
 
+class QuestionSearchResult(QuestionResponse):
+    snippet: Optional[str]
+    score: float
+
+class BulkStatusUpdate(BaseModel):
+    question_ids: List[int] = Field(..., min_length=1, max_length=500)
+    status: Literal["Answered", "Escalated"]
+
+class BulkStatusItem(BaseModel):
+    question_id: int
+    result: Literal["updated", "not_found"]
+    question: Optional[QuestionResponse] = None
+
+class BulkStatusResponse(BaseModel):
+    status: str
+    updated: int
+    not_found: int
+    results: List[BulkStatusItem]
+
 class AnswerCreate(BaseModel):
     message: str
 
@@ -99,3 +118,6 @@ class TokenResponse(BaseModel):
     user: UserResponse
 
 QuestionResponse.model_rebuild()
+QuestionSearchResult.model_rebuild()
+BulkStatusItem.model_rebuild()
+BulkStatusResponse.model_rebuild()
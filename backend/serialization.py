@@ -0,0 +1,57 @@
+"""JSON encoding for API responses and broadcasts.
+
+Uses orjson when it is installed and the standard library otherwise; both
+produce compact UTF-8. Responses built here skip FastAPI's response_model
+validation, so callers pass plain dicts projected straight from rows.
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    loads = orjson.loads
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    loads = json.loads
+
+def dumps_text(obj: Any) -> str:
+    return dumps(obj).decode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with ``dumps``; content must be plain JSON types."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def answer_to_dict(answer) -> dict:
+    return {
+        "answer_id": answer["answer_id"],
+        "question_id": answer["question_id"],
+        "user_id": answer["user_id"],
+        "username": answer["username"],
+        "message": answer["message"],
+        "timestamp": answer["timestamp"],
+    }
+
+def question_to_dict(question, answers=()) -> dict:
+    """The QuestionResponse shape from a question row joined with its username."""
+    return {
+        "question_id": question["question_id"],
+        "user_id": question["user_id"],
+        "username": question["username"],
+        "message": question["message"],
+        "timestamp": question["timestamp"],
+        "status": question["status"],
+        "answers": [answer_to_dict(answer) for answer in answers],
+    }
@@ -0,0 +1,66 @@
+"""Pushes dashboard stats to WebSocket clients and keeps the counters honest.
+
+The counters themselves are maintained by triggers (migration 5). This
+publisher checks data_version every ``STATS_PUSH_INTERVAL`` seconds while
+clients are connected and, if anything changed, sends one ``stats_update``
+message, so a write storm costs clients at most one update per interval.
+A second loop runs db.rebuild_stats every ``STATS_REBUILD_INTERVAL``.
+"""
+import asyncio
+
+from .async_db import get_data_version, get_stats, rebuild_stats
+from .config import STATS_PUSH_INTERVAL, STATS_REBUILD_INTERVAL, STATS_TOP_USERS
+from .websocket_manager import manager
+
+class StatsPublisher:
+    def __init__(self, push_interval: float = STATS_PUSH_INTERVAL, rebuild_interval: float = STATS_REBUILD_INTERVAL):
+        self.push_interval = push_interval
+        self.rebuild_interval = rebuild_interval
+        self.pushes = 0
+        self.rebuilds = 0
+        self.last_drift = None
+        self.last_error = None
+        self._version = None
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._push_loop()), asyncio.create_task(self._rebuild_loop())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def _push_loop(self):
+        while True:
+            await asyncio.sleep(self.push_interval)
+            if not (manager.active_connections or manager.event_streams):
+                continue
+            try:
+                version = await get_data_version()
+                if version == self._version:
+                    continue
+                self._version = version
+                await manager.broadcast_local({"type": "stats_update", "data": await get_stats(STATS_TOP_USERS)})
+                self.pushes += 1
+            except Exception as exc:
+                self.last_error = repr(exc)
+
+    async def _rebuild_loop(self):
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                self.last_drift = await rebuild_stats()
+                self.rebuilds += 1
+            except Exception as exc:
+                self.last_error = repr(exc)
+
+    def stats(self) -> dict:
+        return {"pushes": self.pushes, "rebuilds": self.rebuilds, "last_drift": self.last_drift, "last_error": self.last_error}
+
+publisher = StatsPublisher()
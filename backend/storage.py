@@ -0,0 +1,79 @@
+"""Storage engine selection.
+
+Routers and background jobs reach storage through async_db, which binds to
+the engine named by ``DATABASE_URL``:
+
+- ``sqlite:///./qa_dashboard.db`` (default) is db.py. Its calls block, so
+  they run on the db thread pool.
+- ``memory://`` is memory_db.MemoryEngine. It keeps everything in process
+  and runs its calls on the event loop.
+
+Both implement Repository with the same semantics, so callers never need to
+know which engine is in use.
+"""
+import sqlite3
+from typing import Iterator, Protocol
+
+from .config import DATABASE_URL
+
+# Raised by create_user for a taken username or email, whichever the engine.
+IntegrityError = sqlite3.IntegrityError
+
+class Repository(Protocol):
+    """The blocking API every engine provides; see db.py for the semantics."""
+
+    def init_db(self) -> None: ...
+    def close_pool(self) -> None: ...
+
+    def get_user_by_email(self, email: str): ...
+    def get_user_by_username(self, username: str): ...
+    def get_user_by_id(self, user_id: int): ...
+    def create_user(self, username: str, email: str, password_hash: str, role: str = "user") -> int: ...
+    def update_user_password(self, user_id: int, password_hash: str) -> None: ...
+    def update_user_role(self, user_id: int, role: str) -> None: ...
+
+    def get_all_questions(self) -> list: ...
+    def get_questions_page(self, limit: int, after: tuple | None = None, status: str | None = None, include_archived: bool = False) -> tuple: ...
+    def get_question_by_id(self, question_id: int): ...
+    def get_answers_for_question(self, question_id: int) -> list: ...
+    def get_answers_for_questions(self, question_ids, include_archived: bool = False) -> dict: ...
+    def get_all_questions_with_answers(self, include_archived: bool = False) -> tuple: ...
+    def search_questions(self, match: str, limit: int, offset: int = 0, status: str | None = None) -> list: ...
+
+    def create_question(self, message: str, user_id: int | None = None, username: str | None = None) -> dict: ...
+    def create_answer(self, question_id: int, message: str, user_id: int | None = None, username: str | None = None) -> dict: ...
+    def run_write_batch(self, ops) -> list: ...
+    def update_question_status(self, question_id: int, status: str) -> dict | None: ...
+    def update_questions_status(self, question_ids, status: str) -> dict: ...
+
+    def get_data_version(self) -> int: ...
+    def get_changes_since(self, since: int, limit: int) -> tuple: ...
+    def compact_changes(self, keep: int) -> int: ...
+    def log_resync(self) -> dict: ...
+
+    def claim_webhooks(self, limit: int, lease_seconds: float) -> list: ...
+    def complete_webhooks(self, outbox_ids) -> None: ...
+    def fail_webhooks(self, outbox_ids, error: str, retry_at: float, max_attempts: int) -> None: ...
+    def get_webhook_outbox_counts(self) -> dict: ...
+
+    def archive_answered_batch(self, cutoff: str, limit: int) -> int: ...
+    def get_archive_counts(self) -> dict: ...
+    def iter_export(self, include_archived: bool = False, batch_size: int = ...) -> Iterator[list]: ...
+    def import_questions(self, records) -> dict: ...
+
+    def get_stats(self, top_users: int = 10) -> dict: ...
+    def get_user_stats(self, user_id: int) -> dict: ...
+    def rebuild_stats(self) -> dict: ...
+
+def create_engine(url: str) -> Repository:
+    scheme = url.partition("://")[0]
+    if scheme == "sqlite":
+        from . import db
+        return db
+    if scheme == "memory":
+        from .memory_db import MemoryEngine
+        return MemoryEngine()
+    raise ValueError(f"Unsupported DATABASE_URL: {url!r}")
+
+engine = create_engine(DATABASE_URL)
+engine_name = DATABASE_URL.partition("://")[0]
@@ -0,0 +1,141 @@
+"""Background delivery of webhook events from the outbox table.
+
+db.py writes each event into ``webhook_outbox`` in the same transaction as
+the change it describes. This dispatcher leases due rows, POSTs them over a
+single keep-alive client with bounded concurrency, deletes them on 2xx and
+otherwise reschedules them with exponential backoff until
+``WEBHOOK_MAX_ATTEMPTS``, after which they are kept as ``dead``.
+
+With ``WEBHOOK_BATCH_SIZE`` > 1, several events go out in one POST as
+``{"events": [...]}``; a single event keeps the original
+``{"event": ..., **data}`` body.
+"""
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from .async_db import claim_webhooks, complete_webhooks, fail_webhooks, get_webhook_outbox_counts
+from .metrics import Counter, webhook_delivery_seconds
+from .config import (
+    WEBHOOK_URL, WEBHOOK_CONCURRENCY, WEBHOOK_BATCH_SIZE, WEBHOOK_MAX_ATTEMPTS, WEBHOOK_BACKOFF_BASE,
+    WEBHOOK_BACKOFF_MAX, WEBHOOK_TIMEOUT, WEBHOOK_POLL_INTERVAL,
+)
+
+class WebhookDispatcher:
+    def __init__(self, url: str = WEBHOOK_URL, concurrency: int = WEBHOOK_CONCURRENCY, batch_size: int = WEBHOOK_BATCH_SIZE,
+                 max_attempts: int = WEBHOOK_MAX_ATTEMPTS, backoff_base: float = WEBHOOK_BACKOFF_BASE,
+                 backoff_max: float = WEBHOOK_BACKOFF_MAX, timeout: float = WEBHOOK_TIMEOUT,
+                 poll_interval: float = WEBHOOK_POLL_INTERVAL):
+        self.url = url
+        self.concurrency = concurrency
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.delivered = 0
+        self.failed_attempts = 0
+        self.dead = 0
+        self.requests = 0
+        self.last_latency_ms = None
+        self.last_error = None
+        self._client: httpx.AsyncClient | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        if not self.url:
+            return
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        self._client = httpx.AsyncClient(timeout=self.timeout, limits=limits)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client:
+            await self._client.aclose()
+            self._client = None
+
+    def notify(self):
+        # Called after a write so fresh events go out without waiting for the poll.
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                while await self._dispatch_due():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.last_error = repr(exc)
+
+    async def _dispatch_due(self) -> int:
+        # The lease outlives one full attempt, so a crashed worker's rows come back.
+        rows = await claim_webhooks(self.concurrency * self.batch_size, self.timeout * 2 + 1)
+        batches = [rows[i:i + self.batch_size] for i in range(0, len(rows), self.batch_size)]
+        await asyncio.gather(*(self._deliver(batch) for batch in batches))
+        return len(rows)
+
+    def _body(self, batch) -> dict:
+        events = [{"event": row["event"], **json.loads(row["payload"])} for row in batch]
+        return events[0] if len(events) == 1 else {"events": events}
+
+    async def _deliver(self, batch):
+        ids = [row["outbox_id"] for row in batch]
+        started = time.perf_counter()
+        outcome = "failure"
+        try:
+            response = await self._client.post(self.url, json=self._body(batch))
+            response.raise_for_status()
+            outcome = "success"
+        except (httpx.HTTPError, OSError) as exc:
+            attempts = max(row["attempts"] for row in batch) + 1
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+            await fail_webhooks(ids, repr(exc), time.time() + delay, self.max_attempts)
+            self.failed_attempts += len(ids)
+            if attempts >= self.max_attempts:
+                self.dead += len(ids)
+            self.last_error = repr(exc)
+            return
+        finally:
+            elapsed = time.perf_counter() - started
+            self.requests += 1
+            self.last_latency_ms = round(elapsed * 1000, 2)
+            webhook_delivery_seconds.observe(elapsed, outcome)
+        await complete_webhooks(ids)
+        self.delivered += len(ids)
+
+    async def stats(self) -> dict:
+        return {
+            "enabled": bool(self.url),
+            "delivered": self.delivered,
+            "failed_attempts": self.failed_attempts,
+            "dead": self.dead,
+            "requests": self.requests,
+            "last_latency_ms": self.last_latency_ms,
+            "last_error": self.last_error,
+            "outbox": await get_webhook_outbox_counts(),
+        }
+
+dispatcher = WebhookDispatcher()
+Counter("qa_webhook_events_delivered_total", "Outbox events delivered.", collect=lambda: dispatcher.delivered)
+Counter("qa_webhook_events_failed_total", "Outbox event delivery attempts that failed.", collect=lambda: dispatcher.failed_attempts)
+Counter("qa_webhook_events_dead_total", "Outbox events that ran out of attempts.", collect=lambda: dispatcher.dead)
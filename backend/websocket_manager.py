@@ -1,31 +1,519 @@
 from fastapi import WebSocket
-from typing import List
-import json
+from typing import AsyncIterator, Dict
+import asyncio
+import time
+
+from .async_db import get_changes_since
+from .config import (
+    WS_SEND_QUEUE_SIZE, WS_SLOW_CONSUMER_POLICY, CHANGES_MAX_REPLAY, WS_HEARTBEAT_INTERVAL, WS_IDLE_TIMEOUT,
+    WS_MAX_CONNECTIONS, WS_MAX_CONNECTIONS_PER_USER, WS_MAX_CONNECTIONS_PER_IP, SSE_BUFFER_SIZE,
+    SSE_KEEPALIVE_INTERVAL, SSE_RETRY_MS, WS_COALESCE_WINDOW_MS, WS_MAX_SUBSCRIBED_QUESTIONS,
+)
+from .event_bus import EventBus, create_event_bus
+from .metrics import Counter, Gauge, ws_broadcast_seconds
+from .serialization import dumps_text, loads
+
+class ClientConnection:
+    """A socket plus its bounded outgoing queue and dedicated sender task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int, key: str):
+        self.websocket = websocket
+        # "user:<id>" or "ip:<address>"; what the per-client caps count.
+        self.key = key
+        self.last_seen = time.monotonic()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: asyncio.Task | None = None
+        # Live messages up to this seq were already sent by the resume replay.
+        self.replayed_through = 0
+        self.sent = 0
+        self.dropped = 0
+        # Subscription filters; None means "any". Set by a subscribe message.
+        self.types: frozenset | None = None
+        self.statuses: frozenset | None = None
+        self.question_ids: frozenset | None = None
+        self.coalesce = False
+
+    @property
+    def filtered(self) -> bool:
+        return self.types is not None or self.statuses is not None or self.question_ids is not None
+
+    def matches(self, kind: str, question_ids: set, statuses: set) -> bool:
+        return ((self.types is None or kind in self.types)
+                and (self.question_ids is None or not self.question_ids.isdisjoint(question_ids))
+                and (self.statuses is None or kind not in STATUS_EVENTS or not self.statuses.isdisjoint(statuses)))
+
+    def stats(self) -> dict:
+        return {"queue_depth": self.queue.qsize(), "queue_size": self.queue.maxsize, "sent": self.sent, "dropped": self.dropped,
+                "idle_seconds": round(time.monotonic() - self.last_seen, 1)}
+
+EVENT_TYPES = {"new_question", "new_answer", "status_update", "stats_update"}
+# The events a statuses filter applies to; the rest are matched by type alone.
+STATUS_EVENTS = {"new_question", "status_update"}
+STATUSES = {"Pending", "Escalated", "Answered"}
+
+def parse_subscription(message: dict) -> dict:
+    """Validate a subscribe message into filter sets (None = no filter)."""
+    def optional_set(name, allowed=None):
+        values = message.get(name)
+        if values is None:
+            return None
+        if not isinstance(values, list):
+            raise ValueError(f"{name} must be a list")
+        values = frozenset(values)
+        if allowed is not None and not values <= allowed:
+            raise ValueError(f"unknown {name}: {sorted(map(str, values - allowed))}")
+        return values
+
+    question_ids = optional_set("question_ids")
+    if question_ids is not None:
+        if not all(isinstance(q, int) and not isinstance(q, bool) for q in question_ids):
+            raise ValueError("question_ids must be integers")
+        if len(question_ids) > WS_MAX_SUBSCRIBED_QUESTIONS:
+            raise ValueError(f"at most {WS_MAX_SUBSCRIBED_QUESTIONS} question_ids")
+    return {
+        "types": optional_set("types", EVENT_TYPES),
+        "statuses": optional_set("statuses", STATUSES),
+        "question_ids": question_ids,
+        "coalesce": bool(message.get("coalesce", False)),
+    }
+
+def routing_keys(text: str) -> tuple[str, set, set]:
+    """The (type, question ids, statuses) an event is routed by.
+
+    A status change is routed by both its new and its previous status, so a
+    socket watching Escalated also sees questions leave it.
+    """
+    message = loads(text)
+    data = message.get("data")
+    items = [item for item in (data if isinstance(data, list) else [data]) if isinstance(item, dict)]
+    question_ids = {item["question_id"] for item in items if "question_id" in item}
+    statuses = {item[key] for item in items for key in ("status", "previous_status") if key in item}
+    return message.get("type"), question_ids, statuses
+
+def auth_token(text: str) -> str | None:
+    """The token in an ``{"type": "auth", "token": ...}`` message, else None."""
+    try:
+        message = loads(text)
+    except ValueError:
+        return None
+    if not isinstance(message, dict) or message.get("type") != "auth":
+        return None
+    token = message.get("token")
+    return token if isinstance(token, str) else ""
+
+class EventStreamClient:
+    """A Server-Sent Events subscriber: a bounded queue of ready-made frames.
+
+    There is no sender task; the response generator drains the queue itself.
+    """
+
+    def __init__(self, queue_size: int, key: str):
+        self.key = key
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.replayed_through = 0
+        self.sent = 0
+
+def sse_frame(text: str, seq: int | None) -> str:
+    # The change seq doubles as the event id, so a browser reconnecting with
+    # Last-Event-ID resumes from the change log like ?since= does for sockets.
+    if seq is None:
+        return f"data: {text}\n\n"
+    return f"id: {seq}\ndata: {text}\n\n"
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, queue_size: int = WS_SEND_QUEUE_SIZE, slow_consumer_policy: str = WS_SLOW_CONSUMER_POLICY,
+                 bus: EventBus | None = None, heartbeat_interval: float = WS_HEARTBEAT_INTERVAL,
+                 idle_timeout: float = WS_IDLE_TIMEOUT, max_connections: int = WS_MAX_CONNECTIONS,
+                 max_per_user: int = WS_MAX_CONNECTIONS_PER_USER, max_per_ip: int = WS_MAX_CONNECTIONS_PER_IP,
+                 stream_queue_size: int = SSE_BUFFER_SIZE, keepalive_interval: float = SSE_KEEPALIVE_INTERVAL):
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        # Subscribed sockets are indexed under their most selective filter:
+        # question ids, else statuses, else types. Unfiltered sockets get
+        # everything and stay out of the index.
+        self._by_question: Dict[int, set] = {}
+        self._by_status: Dict[str, set] = {}
+        self._by_type: Dict[str, set] = {}
+        self._filtered = 0
+        self.coalesce_window = WS_COALESCE_WINDOW_MS / 1000
+        self.routed = 0
+        self.event_streams: set[EventStreamClient] = set()
+        self.stream_queue_size = stream_queue_size
+        self.keepalive_interval = keepalive_interval
+        self.stream_overflows = 0
+        self.queue_size = queue_size
+        self.slow_consumer_policy = slow_consumer_policy
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self.max_per_user = max_per_user
+        self.max_per_ip = max_per_ip
+        self.slow_disconnects = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.reaped = 0
+        self.peak = 0
+        self._per_key: Dict[str, int] = {}
+        self._heartbeat: asyncio.Task | None = None
+        self._keepalive: asyncio.Task | None = None
+        self.bus = bus or create_event_bus()
+
+    async def start(self):
+        await self.bus.start(self._deliver)
+        if self.heartbeat_interval > 0:
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+        if self.keepalive_interval > 0:
+            self._keepalive = asyncio.create_task(self._keepalive_loop())
 
-    async def connect(self, websocket: WebSocket):
+    async def stop(self):
+        for task in (self._heartbeat, self._keepalive):
+            if task:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._heartbeat = self._keepalive = None
+        await self.bus.stop()
+
+    def _over_capacity(self, key: str) -> str | None:
+        if self.max_connections and len(self.active_connections) + len(self.event_streams) >= self.max_connections:
+            return "Server at connection capacity"
+        return self._over_client_limit(key)
+
+    def _over_client_limit(self, key: str) -> str | None:
+        limit = self.max_per_user if key.startswith("user:") else self.max_per_ip
+        if limit and self._per_key.get(key, 0) >= limit:
+            return "Too many connections for this client"
+        return None
+
+    async def connect(self, websocket: WebSocket, since: int | None = None, key: str = "ip:unknown") -> bool:
         await websocket.accept()
-        self.active_connections.append(websocket)
+        reason = self._over_capacity(key)
+        if reason:
+            # Accept first so the client gets a real close code and reason
+            # (1013: try again later) instead of a failed handshake.
+            self.rejected += 1
+            await websocket.close(code=1013, reason=reason)
+            return False
+        client = ClientConnection(websocket, self.queue_size, key)
+        # Register before replaying so nothing published meanwhile is missed;
+        # the sender skips live copies of anything the replay covered.
+        self.active_connections[websocket] = client
+        self._register(key)
+        if since is not None:
+            messages, client.replayed_through = await self._replay(since)
+            for _, text in messages:
+                await websocket.send_text(text)
+        client.sender = asyncio.create_task(self._send_loop(client))
+        return True
+
+    async def _replay(self, since: int) -> tuple[list, int]:
+        """Return ([(seq, text)], replayed_through) for a client resuming after ``since``."""
+        changes, floor, latest = await get_changes_since(since, CHANGES_MAX_REPLAY + 1)
+        if since < floor or len(changes) > CHANGES_MAX_REPLAY:
+            return [(latest, dumps_text({"type": "resync", "seq": latest}))], latest
+        return [(change["seq"], dumps_text(change)) for change in changes], changes[-1]["seq"] if changes else since
+
+    def _register(self, key: str):
+        self._per_key[key] = self._per_key.get(key, 0) + 1
+        self.accepted += 1
+        self.peak = max(self.peak, len(self.active_connections) + len(self.event_streams))
+
+    def _unregister(self, key: str):
+        remaining = self._per_key[key] - 1
+        if remaining:
+            self._per_key[key] = remaining
+        else:
+            del self._per_key[key]
+
+    def check_capacity(self, key: str) -> str | None:
+        """Reason an event stream for ``key`` would be refused, counted as a rejection."""
+        reason = self._over_capacity(key)
+        if reason:
+            self.rejected += 1
+        return reason
+
+    async def event_stream(self, since: int | None, key: str) -> AsyncIterator[str]:
+        """Yield SSE frames: the replay after ``since``, then live events.
+
+        Registered only once iteration starts, so a response that is never
+        sent cannot leak a subscriber.
+        """
+        client = EventStreamClient(self.stream_queue_size, key)
+        self.event_streams.add(client)
+        self._register(key)
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            if since is not None:
+                messages, client.replayed_through = await self._replay(since)
+                for seq, text in messages:
+                    yield sse_frame(text, seq)
+            while True:
+                item = await client.queue.get()
+                if item is None:
+                    return
+                seq, frame = item
+                if seq is not None and seq <= client.replayed_through:
+                    continue
+                yield frame
+                client.sent += 1
+        finally:
+            self.event_streams.discard(client)
+            self._unregister(key)
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        client = self.active_connections.pop(websocket, None)
+        if client is None:
+            return
+        self._unregister(client.key)
+        self._unindex(client)
+        if client.sender and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+
+    async def authenticate(self, websocket: WebSocket, user_id: int | None) -> bool:
+        """Count a connected socket as ``user_id`` after an auth message.
+
+        The socket was accepted under its IP, so the per-user cap is checked
+        now; over it, the socket is closed with 1013 and False is returned.
+        An invalid token gets an error and leaves the socket anonymous.
+        """
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return False
+        client.last_seen = time.monotonic()
+        if not user_id:
+            self._enqueue(client, (None, dumps_text({"type": "error", "detail": "invalid token"})))
+            return True
+        key = f"user:{user_id}"
+        if key == client.key:
+            return True
+        reason = self._over_client_limit(key)
+        if reason:
+            self.rejected += 1
+            self.disconnect(websocket)
+            await websocket.close(code=1013, reason=reason)
+            return False
+        self._unregister(client.key)
+        client.key = key
+        self._per_key[key] = self._per_key.get(key, 0) + 1
+        return True
+
+    def _index_for(self, client: ClientConnection) -> list:
+        if client.question_ids is not None:
+            return [(self._by_question, client.question_ids)]
+        if client.statuses is not None:
+            # Events without a status reach these sockets by type.
+            return [(self._by_status, client.statuses), (self._by_type, (client.types or EVENT_TYPES) - STATUS_EVENTS)]
+        return [(self._by_type, client.types)]
+
+    def _index(self, client: ClientConnection):
+        if not client.filtered:
+            return
+        self._filtered += 1
+        for index, keys in self._index_for(client):
+            for key in keys:
+                index.setdefault(key, set()).add(client)
+
+    def _unindex(self, client: ClientConnection):
+        if not client.filtered:
+            return
+        self._filtered -= 1
+        for index, keys in self._index_for(client):
+            for key in keys:
+                clients = index[key]
+                clients.discard(client)
+                if not clients:
+                    del index[key]
+
+    def subscribe(self, websocket: WebSocket, subscription: dict):
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        self._unindex(client)
+        client.types = subscription["types"]
+        client.statuses = subscription["statuses"]
+        client.question_ids = subscription["question_ids"]
+        client.coalesce = subscription["coalesce"]
+        self._index(client)
+
+    def handle_message(self, websocket: WebSocket, text: str):
+        # Any message from the client, normally a pong, proves it is alive.
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        client.last_seen = time.monotonic()
+        try:
+            message = loads(text)
+        except ValueError:
+            return
+        if not isinstance(message, dict) or message.get("type") != "subscribe":
+            return
+        try:
+            subscription = parse_subscription(message)
+        except ValueError as exc:
+            self._enqueue(client, (None, dumps_text({"type": "error", "detail": str(exc)})))
+            return
+        self.subscribe(websocket, subscription)
+        self._enqueue(client, (None, dumps_text({"type": "subscribed", "data": {
+            name: sorted(value) if isinstance(value, frozenset) else value for name, value in subscription.items()
+        }})))
+
+    def _route(self, text: str) -> list:
+        """Sockets that should receive an event, found through the index."""
+        kind, question_ids, statuses = routing_keys(text)
+        self.routed += 1
+        if not question_ids and not statuses:
+            # Not about particular questions (stats_update, resync): only the
+            # type filter applies, and resync always goes out.
+            return [client for client in self.active_connections.values()
+                    if client.types is None or kind in client.types or kind == "resync"]
+        candidates = set(self._by_type.get(kind, ()))
+        for question_id in question_ids:
+            candidates.update(self._by_question.get(question_id, ()))
+        if kind in STATUS_EVENTS:
+            for status in statuses:
+                candidates.update(self._by_status.get(status, ()))
+        targets = [client for client in candidates if client.matches(kind, question_ids, statuses)]
+        if self._filtered < len(self.active_connections):
+            targets.extend(client for client in self.active_connections.values() if not client.filtered)
+        return targets
+
+    async def _heartbeat_loop(self):
+        ping = dumps_text({"type": "ping"})
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            cutoff = time.monotonic() - self.idle_timeout
+            for websocket, client in list(self.active_connections.items()):
+                if client.last_seen < cutoff:
+                    self.reaped += 1
+                    self.disconnect(websocket)
+                    asyncio.create_task(self._close(websocket, 1001))
+                else:
+                    self._enqueue(client, (None, ping))
+
+    async def _keepalive_loop(self):
+        # One timer for every stream rather than a timeout per client. The
+        # comment line keeps proxies from closing an idle stream and makes a
+        # vanished client show up as a failed write.
+        item = (None, ": keep-alive\n\n")
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            for stream in list(self.event_streams):
+                if stream.queue.empty():
+                    self._enqueue_stream(stream, item)
+
+    async def _send_loop(self, client: ClientConnection):
+        try:
+            while True:
+                seq, text = await client.queue.get()
+                if client.coalesce and self.coalesce_window > 0:
+                    # Let a burst accumulate, then send it as a single frame.
+                    await asyncio.sleep(self.coalesce_window)
+                    texts = [] if seq is not None and seq <= client.replayed_through else [text]
+                    while not client.queue.empty():
+                        seq, text = client.queue.get_nowait()
+                        if seq is None or seq > client.replayed_through:
+                            texts.append(text)
+                    if not texts:
+                        continue
+                    # The messages are already JSON; splice them rather than re-encode.
+                    text = texts[0] if len(texts) == 1 else '{"type": "batch", "data": [' + ", ".join(texts) + "]}"
+                elif seq is not None and seq <= client.replayed_through:
+                    continue
+                await client.websocket.send_text(text)
+                client.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(client.websocket)
+
+    def _enqueue(self, client: ClientConnection, item: tuple):
+        try:
+            client.queue.put_nowait(item)
+            return
+        except asyncio.QueueFull:
+            pass
+        if self.slow_consumer_policy == "disconnect":
+            self.slow_disconnects += 1
+            self.disconnect(client.websocket)
+            asyncio.create_task(self._close(client.websocket, 1013))
+            return
+        # drop_oldest: the client falls behind but always gets the newest state
+        client.queue.get_nowait()
+        client.dropped += 1
+        client.queue.put_nowait(item)
+
+    def _enqueue_stream(self, client: EventStreamClient, item: tuple):
+        try:
+            client.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # End the stream rather than drop events: the browser reconnects
+            # with Last-Event-ID and catches up from the change log.
+            self.stream_overflows += 1
+            self.event_streams.discard(client)
+            while not client.queue.empty():
+                client.queue.get_nowait()
+            client.queue.put_nowait(None)
+
+    async def _close(self, websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
 
     async def broadcast(self, message: dict):
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.append(connection)
-        
-        for conn in disconnected:
-            self.disconnect(conn)
+        # Serialize once; the bus hands the text to every worker's _deliver.
+        await self.bus.publish(dumps_text(message), message.get("seq"))
+
+    async def broadcast_local(self, message: dict):
+        # For state every worker reads from the database itself (like stats),
+        # so relaying it through the bus would only duplicate it.
+        await self._deliver(dumps_text(message))
+
+    async def _deliver(self, text: str, seq: int | None = None):
+        # Hand off to each sender task; never waits on a socket.
+        started = time.perf_counter()
+        item = (seq, text)
+        # Without subscriptions everyone gets everything; skip decoding.
+        targets = self._route(text) if self._filtered else list(self.active_connections.values())
+        for client in targets:
+            self._enqueue(client, item)
+        if self.event_streams:
+            # Framed once for every stream, like the JSON for every socket.
+            item = (seq, sse_frame(text, seq))
+            for stream in list(self.event_streams):
+                self._enqueue_stream(stream, item)
+        ws_broadcast_seconds.observe(time.perf_counter() - started)
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         await websocket.send_json(message)
 
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.active_connections),
+            "subscribed_connections": self._filtered,
+            "routed_events": self.routed,
+            "coalesce_window_ms": self.coalesce_window * 1000,
+            "event_streams": len(self.event_streams),
+            "stream_overflows": self.stream_overflows,
+            "peak_connections": self.peak,
+            "distinct_clients": len(self._per_key),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "reaped": self.reaped,
+            "max_connections": self.max_connections,
+            "slow_consumer_policy": self.slow_consumer_policy,
+            "slow_disconnects": self.slow_disconnects,
+            "event_bus": type(self.bus).__name__,
+            "clients": [client.stats() for client in self.active_connections.values()],
+        }
+
 manager = ConnectionManager()
+Gauge("qa_ws_connections", "Open WebSocket connections.", collect=lambda: len(manager.active_connections))
+Gauge("qa_ws_subscribed_connections", "WebSocket connections with a subscription filter.", collect=lambda: manager._filtered)
+Gauge("qa_sse_streams", "Open Server-Sent Events streams.", collect=lambda: len(manager.event_streams))
+Counter("qa_ws_accepted_total", "WebSocket and SSE connections accepted.", collect=lambda: manager.accepted)
+Counter("qa_ws_rejected_total", "WebSocket and SSE connections refused at capacity.", collect=lambda: manager.rejected)
+Counter("qa_ws_reaped_total", "WebSocket connections closed for missing heartbeats.", collect=lambda: manager.reaped)
+Counter("qa_ws_slow_disconnects_total", "WebSocket connections dropped as slow consumers.", collect=lambda: manager.slow_disconnects)
+Counter("qa_sse_overflows_total", "SSE streams that overflowed their buffer.", collect=lambda: manager.stream_overflows)
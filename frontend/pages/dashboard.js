@@ -10,6 +10,7 @@ import wsManager from '../utils/websocket';
 export default function Dashboard() {
   const router = useRouter();
   const [questions, setQuestions] = useState([]);
+  const [stats, setStats] = useState(null);
   const [loading, setLoading] = useState(true);
   const [connected, setConnected] = useState(false);
   const [filter, setFilter] = useState('all');
@@ -34,6 +35,19 @@ export default function Dashboard() {
     }
   };
 
+  const fetchStats = async () => {
+    try {
+      setStats(await xhrRequest('GET', '/questions/stats'));
+    } catch (error) {
+      console.error('Failed to fetch stats:', error);
+    }
+  };
+
+  const reload = () => {
+    fetchQuestions();
+    fetchStats();
+  };
+
   useEffect(() => {
     const auth = getAuth();
     if (!auth || !auth.token) {
@@ -42,10 +56,12 @@ export default function Dashboard() {
     }
 
     setIsAuthenticated(true);
-    fetchQuestions();
+    reload();
 
     if (wsManager) {
       wsManager.connect();
+      // Everything, including stats_update, which other pages filter out.
+      wsManager.subscribe({});
 
       const handleConnected = () => setConnected(true);
       const handleDisconnected = () => setConnected(false);
@@ -70,9 +86,11 @@ export default function Dashboard() {
       };
 
       const handleStatusUpdate = (data) => {
+        // Bulk moderation sends every updated question in one message.
+        const changed = new Map((Array.isArray(data) ? data : [data]).map(q => [q.question_id, q]));
         setQuestions(prev => {
           const updated = prev.map(q => 
-            q.question_id === data.question_id ? { ...q, ...data } : q
+            changed.has(q.question_id) ? { ...q, ...changed.get(q.question_id) } : q
           );
           return sortQuestions(updated);
         });
@@ -83,6 +101,8 @@ export default function Dashboard() {
       wsManager.on('new_question', handleNewQuestion);
       wsManager.on('new_answer', handleNewAnswer);
       wsManager.on('status_update', handleStatusUpdate);
+      wsManager.on('stats_update', setStats);
+      wsManager.on('resync', reload);
 
       return () => {
         wsManager.off('connected', handleConnected);
@@ -90,6 +110,8 @@ export default function Dashboard() {
         wsManager.off('new_question', handleNewQuestion);
         wsManager.off('new_answer', handleNewAnswer);
         wsManager.off('status_update', handleStatusUpdate);
+        wsManager.off('stats_update', setStats);
+        wsManager.off('resync', reload);
       };
     }
   }, []);
@@ -99,7 +121,14 @@ export default function Dashboard() {
     return q.status.toLowerCase() === filter;
   });
 
-  const counts = {
+  // Server-side counters, pushed as stats_update; fall back to counting the
+  // loaded list until the first stats arrive.
+  const counts = stats ? {
+    all: stats.total,
+    pending: stats.by_status.Pending,
+    escalated: stats.by_status.Escalated,
+    answered: stats.by_status.Answered,
+  } : {
     all: questions.length,
     pending: questions.filter(q => q.status === 'Pending').length,
     escalated: questions.filter(q => q.status === 'Escalated').length,
@@ -46,6 +46,8 @@ export default function Forum() {
 
     if (wsManager) {
       wsManager.connect();
+      // This page has no use for stats pushes.
+      wsManager.subscribe({ types: ['new_question', 'new_answer', 'status_update'] });
 
       const handleConnected = () => setConnected(true);
       const handleDisconnected = () => setConnected(false);
@@ -70,9 +72,11 @@ export default function Forum() {
       };
 
       const handleStatusUpdate = (data) => {
+        // Bulk moderation sends every updated question in one message.
+        const changed = new Map((Array.isArray(data) ? data : [data]).map(q => [q.question_id, q]));
         setQuestions(prev => {
           const updated = prev.map(q => 
-            q.question_id === data.question_id ? { ...q, ...data } : q
+            changed.has(q.question_id) ? { ...q, ...changed.get(q.question_id) } : q
           );
           return sortQuestions(updated);
         });
@@ -83,6 +87,7 @@ export default function Forum() {
       wsManager.on('new_question', handleNewQuestion);
       wsManager.on('new_answer', handleNewAnswer);
       wsManager.on('status_update', handleStatusUpdate);
+      wsManager.on('resync', fetchQuestions);
 
       return () => {
         wsManager.off('connected', handleConnected);
@@ -90,6 +95,7 @@ export default function Forum() {
         wsManager.off('new_question', handleNewQuestion);
         wsManager.off('new_answer', handleNewAnswer);
         wsManager.off('status_update', handleStatusUpdate);
+        wsManager.off('resync', fetchQuestions);
       };
     }
   }, []);
@@ -56,6 +56,8 @@ export default function Home() {
 
     if (wsManager) {
       wsManager.connect();
+      // This page has no use for stats pushes.
+      wsManager.subscribe({ types: ['new_question', 'new_answer', 'status_update'] });
 
       const handleConnected = () => setConnected(true);
       const handleDisconnected = () => setConnected(false);
@@ -80,9 +82,11 @@ export default function Home() {
       };
 
       const handleStatusUpdate = (data) => {
+        // Bulk moderation sends every updated question in one message.
+        const changed = new Map((Array.isArray(data) ? data : [data]).map(q => [q.question_id, q]));
         setQuestions(prev => {
           const updated = prev.map(q => 
-            q.question_id === data.question_id ? { ...q, ...data } : q
+            changed.has(q.question_id) ? { ...q, ...changed.get(q.question_id) } : q
           );
           return sortQuestions(updated);
         });
@@ -93,6 +97,7 @@ export default function Home() {
       wsManager.on('new_question', handleNewQuestion);
       wsManager.on('new_answer', handleNewAnswer);
       wsManager.on('status_update', handleStatusUpdate);
+      wsManager.on('resync', fetchQuestions);
 
       return () => {
         wsManager.off('connected', handleConnected);
@@ -100,6 +105,7 @@ export default function Home() {
         wsManager.off('new_question', handleNewQuestion);
         wsManager.off('new_answer', handleNewAnswer);
         wsManager.off('status_update', handleStatusUpdate);
+        wsManager.off('resync', fetchQuestions);
       };
     }
   }, []);
@@ -1,9 +1,52 @@
+import { getToken } from './auth';
+
 class WebSocketManager {
   constructor() {
     this.socket = null;
     this.listeners = new Map();
     this.reconnectAttempts = 0;
     this.maxReconnects = 10;
+    // Highest change-log seq seen; sent back on reconnect so the server can
+    // replay what we missed (or tell us to resync).
+    this.lastSeq = null;
+    // Filters sent to the server on every (re)connect; see subscribe().
+    this.subscription = {};
+  }
+
+  // Only receive the listed event types, statuses or question_ids. Bursts
+  // arrive batched, which handleMessage unpacks.
+  subscribe(filters = {}) {
+    this.subscription = filters;
+    this.sendSubscription();
+  }
+
+  sendSubscription() {
+    if (this.socket?.readyState === WebSocket.OPEN) {
+      this.socket.send(JSON.stringify({ type: 'subscribe', coalesce: true, ...this.subscription }));
+    }
+  }
+
+  handleMessage(data) {
+    if (data.type === 'batch') {
+      data.data.forEach(message => this.handleMessage(message));
+      return;
+    }
+    if (data.type === 'ping') {
+      // The server closes sockets that stay silent past its idle timeout.
+      this.socket.send('{"type":"pong"}');
+      return;
+    }
+    if (typeof data.seq === 'number' && (this.lastSeq === null || data.seq > this.lastSeq)) {
+      this.lastSeq = data.seq;
+    }
+    this.emit(data.type, data.data || data);
+  }
+
+  withParams(url) {
+    const params = new URLSearchParams();
+    if (this.lastSeq !== null) params.set('since', this.lastSeq);
+    const query = params.toString();
+    return query ? `${url}?${query}` : url;
   }
 
   getWsUrl() {
@@ -27,16 +70,18 @@ class WebSocketManager {
   connect() {
     if (this.socket?.readyState === WebSocket.OPEN) return;
 
-    this.socket = new WebSocket(this.getWsUrl());
+    this.socket = new WebSocket(this.withParams(this.getWsUrl()));
     this.socket.onopen = () => {
       console.log('WebSocket connected');
       this.reconnectAttempts = 0;
+      // Lets the server count our sockets against our account rather than
+      // our IP. Sent as a message so the token stays out of URLs and logs.
+      const token = getToken();
+      if (token) this.socket.send(JSON.stringify({ type: 'auth', token }));
+      this.sendSubscription();
       this.emit('connected', {});
     };
-    this.socket.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      this.emit(data.type, data.data || data);
-    };
+    this.socket.onmessage = (event) => this.handleMessage(JSON.parse(event.data));
     this.socket.onclose = () => {
       console.log('WebSocket disconnected');
       this.emit('disconnected', {});
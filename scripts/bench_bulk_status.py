@@ -0,0 +1,61 @@
+"""Bulk status change: POST /questions/bulk-status vs. one call per question.
+
+    python scripts/bench_bulk_status.py [--questions 300]
+
+Both paths go through the full app in TestClient, started so broadcasts
+and the webhook outbox run as in production, with an admin bearer token.
+Each run flips every question between Escalated and Answered, so every
+row really changes. The per-question path calls /escalate or
+/mark-answered once per question. The bulk path sends all the ids in one
+request.
+"""
+import argparse
+import itertools
+import os
+
+import benchutil
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=300)
+    args = parser.parse_args()
+    if not 1 <= args.questions <= 500:
+        parser.error("--questions must be between 1 and 500, the bulk endpoint's limit")
+
+    benchutil.temp_database()
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["WEBHOOK_URL"] = ""
+    # The seeded Answered questions are old enough to be archived at startup.
+    os.environ["ARCHIVE_AFTER_DAYS"] = "0"
+    from fastapi.testclient import TestClient
+    from backend import db
+    from backend.main import app
+    from backend.routers.auth import create_access_token
+    benchutil.seed(args.questions)
+    admin_id = db.create_user("bench-admin", "bench-admin@example.com", "unused", "admin")
+    headers = {"Authorization": f"Bearer {create_access_token(admin_id)}"}
+    ids = [q["question_id"] for q in db.get_all_questions()]
+
+    with TestClient(app) as client:
+        statuses = itertools.cycle(["Escalated", "Answered"])
+
+        def per_question():
+            action = "escalate" if next(statuses) == "Escalated" else "mark-answered"
+            for question_id in ids:
+                client.post(f"/questions/{question_id}/{action}", headers=headers).raise_for_status()
+
+        def bulk():
+            body = {"question_ids": ids, "status": next(statuses)}
+            response = client.post("/questions/bulk-status", json=body, headers=headers)
+            response.raise_for_status()
+            assert response.json()["updated"] == len(ids)
+
+        print(f"{len(ids)} questions")
+        loop = benchutil.timed(per_question, repeat=3)
+        batched = benchutil.timed(bulk, repeat=5)
+        benchutil.report("one call per question", loop)
+        benchutil.report("one bulk-status call", batched)
+        print(f"{len(ids) / loop:,.0f} vs. {len(ids) / batched:,.0f} questions/s, {loop / batched:.0f}x")
+
+if __name__ == "__main__":
+    main()
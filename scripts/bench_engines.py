@@ -0,0 +1,71 @@
+"""Storage engine calls: SQLite vs. the in-memory engine.
+
+    python scripts/bench_engines.py [--questions 20000]
+
+Each row runs the same calls with the same arguments against db.py on a
+temporary file and against a fresh MemoryEngine, and reports the time
+per call. Writes come first, so the reads see ``--questions`` questions
+plus the answers and status changes made along the way. This measures
+the engines only. Over HTTP the web stack dominates, so the gap in
+requests per second is much smaller.
+"""
+import argparse
+import random
+import time
+
+import benchutil
+
+WORDS = "cache index query latency socket thread pool shard replica vacuum btree lock wal page".split()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=20000)
+    args = parser.parse_args()
+    n = args.questions
+
+    benchutil.temp_database()
+    from backend import db
+    from backend.memory_db import MemoryEngine
+    db.init_db()
+    engines = (("sqlite", db), ("memory", MemoryEngine()))
+    rng = random.Random(0)
+    texts = [" ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(n)]
+
+    def row(label, func, calls):
+        per_call = {}
+        for name, engine in engines:
+            # Same random arguments for both engines.
+            rng.seed(1)
+            started = time.perf_counter()
+            func(engine)
+            per_call[name] = (time.perf_counter() - started) / calls
+        print(f"{label:<36} sqlite {per_call['sqlite'] * 1e6:9.1f} us   memory {per_call['memory'] * 1e6:8.1f} us"
+              f"   {per_call['sqlite'] / per_call['memory']:5.1f}x")
+
+    def walk(engine):
+        after = None
+        for _ in range(200):
+            _, after = engine.get_questions_page(50, after)
+
+    print(f"{n} questions")
+    row("create_question (batches of 64)", lambda e: [
+        e.run_write_batch([("create_question", (text, None, None)) for text in texts[i:i + 64]]) for i in range(0, n, 64)
+    ], n)
+    row("create_answer", lambda e: [e.create_answer(rng.randrange(1, n), texts[i], None, None) for i in range(2000)], 2000)
+    row("update_question_status", lambda e: [
+        e.update_question_status(rng.randrange(1, n), rng.choice(["Escalated", "Answered", "Pending"])) for _ in range(2000)
+    ], 2000)
+    row("feed first page (50)", lambda e: [e.get_questions_page(50) for _ in range(500)], 500)
+    row("feed cursor walk, per page (50)", walk, 200)
+    row("escalated page (50)", lambda e: [e.get_questions_page(50, None, "Escalated") for _ in range(500)], 500)
+    row("answers for 50 questions", lambda e: [
+        e.get_answers_for_questions(list(range(i, i + 50))) for i in range(1, min(n, 10000) + 1, 50)
+    ], len(range(1, min(n, 10000) + 1, 50)))
+    row("search, two terms and a prefix (20)", lambda e: [
+        e.search_questions(f'"{rng.choice(WORDS)}" "{rng.choice(WORDS)[:3]}"*', 20) for _ in range(50)
+    ], 50)
+    row("get_stats", lambda e: [e.get_stats() for _ in range(1000)], 1000)
+    row("get_changes_since (100)", lambda e: [e.get_changes_since(rng.randrange(1, n), 100) for _ in range(500)], 500)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""NDJSON export and chunked import: throughput and anonymous RSS.
+
+    python scripts/bench_export_import.py [--questions 100000] [--answers 1] [--per-row-fts]
+
+Runs the same code paths as GET /questions/export and POST
+/questions/import, in process and without HTTP. The export streams
+db.iter_export to a file. The import reads that file back line by line
+into a fresh database in IMPORT_BATCH_SIZE chunks. "peak" is the highest
+RssAnon above the baseline taken just before each step. It is sampled
+from /proc/self/status after a malloc_trim, so this only runs on Linux
+with glibc. The full-feed load that GET /questions does runs last.
+--per-row-fts also times the import with the FTS insert triggers firing
+per row, as it did before migration 4.
+"""
+import argparse
+import ctypes
+import gc
+import os
+import threading
+import time
+
+import benchutil
+
+def rss_anon_kb() -> int:
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    raise RuntimeError("RssAnon not in /proc/self/status")
+
+def measure(func):
+    """Run ``func`` and return (its result, seconds, peak RSS growth in MB)."""
+    # Hand memory freed by earlier steps back to the OS so it can't hide this one's.
+    gc.collect()
+    ctypes.CDLL("libc.so.6").malloc_trim(0)
+    baseline = peak = rss_anon_kb()
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.wait(0.005):
+            peak = max(peak, rss_anon_kb())
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        result = func()
+    finally:
+        elapsed = time.perf_counter() - started
+        done.set()
+        sampler.join()
+    return result, elapsed, (max(peak, rss_anon_kb()) - baseline) / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--answers", type=int, default=1, help="answers per question")
+    parser.add_argument("--per-row-fts", action="store_true", help="also import with per-row FTS triggers")
+    args = parser.parse_args()
+
+    source = benchutil.temp_database("source.db")
+    from backend import db
+    from backend.config import IMPORT_BATCH_SIZE
+    from backend.routers.questions import parse_import_line
+    from backend.serialization import dumps, question_to_dict
+    benchutil.seed(args.questions, args.answers)
+    export_path = os.path.join(os.path.dirname(source), "questions.ndjson")
+    rows = args.questions * (1 + args.answers)
+
+    def export():
+        with open(export_path, "wb") as out:
+            for batch in db.iter_export():
+                out.write(b"".join(dumps(question) + b"\n" for question in batch))
+
+    def import_file(load):
+        db.DATABASE_PATH = os.path.join(os.path.dirname(source), f"import-{time.monotonic_ns()}.db")
+        db.init_db()
+        batch = []
+        with open(export_path, "rb") as lines:
+            for line in lines:
+                batch.append(parse_import_line(line))
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    load(batch)
+                    batch.clear()
+        if batch:
+            load(batch)
+
+    def per_row_fts(records):
+        # db.import_questions without the fts_deferred flag and the two
+        # INSERT ... SELECT statements, so every insert runs its FTS trigger.
+        with db.get_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            for record in records:
+                cursor.execute(
+                    "INSERT INTO questions (message, timestamp, status, answered_at) VALUES (?, ?, ?, ?)",
+                    (record["message"], record["timestamp"], record["status"], record.get("answered_at")),
+                )
+                question_id = cursor.lastrowid
+                cursor.executemany(
+                    "INSERT INTO answers (question_id, message, timestamp) VALUES (?, ?, ?)",
+                    [(question_id, a["message"], a["timestamp"]) for a in record["answers"]],
+                )
+
+    def full_feed():
+        questions, answers = db.get_all_questions_with_answers()
+        return dumps([question_to_dict(q, answers.get(q["question_id"], ())) for q in questions])
+
+    print(f"{args.questions} questions, {args.questions * args.answers} answers, IMPORT_BATCH_SIZE={IMPORT_BATCH_SIZE}")
+    steps = [("export", export), ("import", lambda: import_file(db.import_questions))]
+    if args.per_row_fts:
+        steps.append(("import, per-row FTS triggers", lambda: import_file(per_row_fts)))
+    for label, func in steps:
+        _, seconds, peak = measure(func)
+        print(f"{label:<32} {seconds:8.2f} s {rows / seconds:>10,.0f} rows/s   peak +{peak:7.1f} MB")
+    db.DATABASE_PATH = source
+    _, seconds, peak = measure(full_feed)
+    print(f"{'full feed (GET /questions)':<32} {seconds:8.2f} s {'':>17}   peak +{peak:7.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Full-feed load: one answers query per question vs. the batched load.
+
+    python scripts/bench_feed.py [--questions 3000] [--answers 2]
+
+"per question" replays how GET /questions read answers before the batched
+load: one get_answers_for_question call per row. The pooled variant
+reuses a connection. The "new connection" variant opens one per query, as
+the original get_db did. Every path serializes the whole feed, as the
+endpoint does.
+"""
+import argparse
+import sqlite3
+
+import benchutil
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=3000)
+    parser.add_argument("--answers", type=int, default=2, help="answers per question")
+    args = parser.parse_args()
+
+    path = benchutil.temp_database()
+    from backend import db
+    from backend.serialization import dumps, question_to_dict
+    benchutil.seed(args.questions, args.answers)
+
+    def per_question():
+        feed = [question_to_dict(q, db.get_answers_for_question(q["question_id"])) for q in db.get_all_questions()]
+        return dumps(feed)
+
+    def per_question_connect():
+        def answers_for(question_id):
+            conn = sqlite3.connect(path)
+            conn.row_factory = sqlite3.Row
+            try:
+                return conn.execute('''
+                    SELECT a.*, u.username FROM answers a LEFT JOIN users u ON a.user_id = u.user_id
+                    WHERE a.question_id = ? ORDER BY a.timestamp ASC
+                ''', (question_id,)).fetchall()
+            finally:
+                conn.close()
+        return dumps([question_to_dict(q, answers_for(q["question_id"])) for q in db.get_all_questions()])
+
+    def batched():
+        questions, answers = db.get_all_questions_with_answers()
+        return dumps([question_to_dict(q, answers.get(q["question_id"], ())) for q in questions])
+
+    assert per_question() == per_question_connect() == batched()
+    print(f"{args.questions} questions, {args.questions * args.answers} answers")
+    benchutil.report("per question, new connection each", benchutil.timed(per_question_connect, repeat=3))
+    benchutil.report("per question, pooled connection", benchutil.timed(per_question))
+    benchutil.report("batched (2 queries)", benchutil.timed(batched))
+    db.close_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""GET /questions: rebuilding the feed vs. the version cache vs. a 304.
+
+    python scripts/bench_feed_cache.py [--questions 3000] [--answers 2]
+
+Requests go through TestClient, so the web stack is included. The
+rebuild row clears feed_cache before each request, which is what the
+first request after any write pays. The cached row repeats the same
+request at the same data_version, and the last row sends the ETag back
+in If-None-Match.
+"""
+import argparse
+import os
+
+import benchutil
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=3000)
+    parser.add_argument("--answers", type=int, default=2, help="answers per question")
+    args = parser.parse_args()
+
+    benchutil.temp_database()
+    # 200 requests in a row would otherwise hit the questions rate limit.
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    from fastapi.testclient import TestClient
+    from backend.cache import feed_cache
+    from backend.main import app
+    benchutil.seed(args.questions, args.answers)
+    client = TestClient(app)
+
+    def get(headers=None, status=200):
+        response = client.get("/questions", headers=headers)
+        assert response.status_code == status
+        return response
+
+    def rebuild():
+        feed_cache.clear()
+        get()
+
+    etag = get().headers["ETag"]
+    print(f"{args.questions} questions, {args.questions * args.answers} answers")
+    benchutil.report("rebuild (cache cleared)", benchutil.timed(rebuild, repeat=3, number=5))
+    benchutil.report("cached 200", benchutil.timed(get, number=50))
+    benchutil.report("304 Not Modified", benchutil.timed(lambda: get({"If-None-Match": etag}, 304), number=200))
+
+if __name__ == "__main__":
+    main()
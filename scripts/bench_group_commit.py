@@ -0,0 +1,44 @@
+"""Concurrent question inserts with and without group commit.
+
+    python scripts/bench_group_commit.py [--ops 2000] [--max-batch 64]
+
+Submits ``--ops`` create_question calls at once through a WriteCoalescer.
+With a max batch of 1 every insert commits on its own, which is what
+WRITE_COALESCE_MAX_BATCH=1 does.
+"""
+import argparse
+import asyncio
+import time
+
+import benchutil
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--max-batch", type=int, default=64)
+    args = parser.parse_args()
+
+    benchutil.temp_database()
+    from backend import async_db, db
+    from backend.config import WRITE_COALESCE_MAX_DELAY_MS
+    db.init_db()
+
+    async def run(max_batch: int):
+        coalescer = async_db.WriteCoalescer(max_batch, WRITE_COALESCE_MAX_DELAY_MS)
+        started = time.perf_counter()
+        await asyncio.gather(*(coalescer.submit("create_question", f"question {i}") for i in range(args.ops)))
+        elapsed = time.perf_counter() - started
+        await coalescer.stop()
+        return elapsed, coalescer.stats()
+
+    for label, max_batch in ((f"coalesced ({args.max_batch})", args.max_batch), ("per insert (1)", 1)):
+        elapsed, stats = asyncio.run(run(max_batch))
+        line = f"{label:<16} {elapsed:6.2f} s  {args.ops / elapsed:8.0f} ops/s"
+        if stats["flushes"]:
+            line += f"  avg flush {stats['avg_flush_size']} ops / {stats['avg_flush_ms']} ms"
+        print(line)
+    async_db.shutdown_executor()
+    db.close_pool()
+
+if __name__ == "__main__":
+    main()
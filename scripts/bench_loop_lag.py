@@ -0,0 +1,83 @@
+"""Event-loop lag while feed readers and question writers run concurrently.
+
+    python scripts/bench_loop_lag.py [--questions 3000] [--readers 4] [--writers 4]
+
+A probe task sleeps 5 ms at a time and records how late it wakes. "on the
+loop" calls the blocking db.py helpers straight from coroutines, as the
+handlers did before async_db. "async_db" awaits the executor-backed
+wrappers the handlers use now.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import benchutil
+
+PROBE_INTERVAL = 0.005
+
+async def run(readers: int, writers: int, read, write) -> tuple[float, list]:
+    lags = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+    async def reader():
+        for _ in range(5):
+            await read()
+
+    async def writer():
+        for _ in range(20):
+            await write()
+
+    task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(*[reader() for _ in range(readers)], *[writer() for _ in range(writers)])
+    elapsed = time.perf_counter() - started
+    done.set()
+    await task
+    return elapsed, sorted(lags)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=3000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=4)
+    args = parser.parse_args()
+
+    benchutil.temp_database()
+    from backend import async_db, db
+    benchutil.seed(args.questions, 1)
+
+    async def read_blocking():
+        rows, _ = db.get_questions_page(50)
+        db.get_answers_for_questions([row["question_id"] for row in rows])
+
+    async def write_blocking():
+        db.create_question("load")
+
+    async def read_async():
+        rows, _ = await async_db.get_questions_page(50)
+        await async_db.get_answers_for_questions([row["question_id"] for row in rows])
+
+    async def write_async():
+        await async_db.create_question("load")
+
+    for label, read, write in (("on the loop", read_blocking, write_blocking), ("async_db", read_async, write_async)):
+        elapsed, lags = asyncio.run(run(args.readers, args.writers, read, write))
+        if not lags:
+            print(f"{label:<12} wall {elapsed * 1e3:7.1f} ms  probe never woke: loop blocked for the whole run")
+            continue
+        print(
+            f"{label:<12} wall {elapsed * 1e3:7.1f} ms  lag p50 {statistics.median(lags) * 1e3:5.1f} ms"
+            f"  max {lags[-1] * 1e3:5.1f} ms  ({len(lags)} wake-ups)"
+        )
+    async_db.shutdown_executor()
+    db.close_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Cost of the /metrics instrumentation, against a whole request.
+
+    python scripts/bench_metrics.py [--questions 200]
+
+The middleware row wraps a stub ASGI app that answers at once, so the
+difference from the bare stub is the middleware's own cost. The timed
+storage call wraps a function that returns immediately. The last row
+sends GET /questions?limit=20 through the full app with
+httpx.ASGITransport, without a network, for scale.
+"""
+import argparse
+import asyncio
+
+import benchutil
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=200)
+    args = parser.parse_args()
+
+    benchutil.temp_database()
+    import httpx
+    from backend.async_db import timed
+    from backend.main import app
+    from backend.metrics import MetricsMiddleware, db_query_seconds, render
+    benchutil.seed(args.questions, 1)
+
+    class Route:
+        path = "/questions/{question_id}/answer"
+
+    async def stub(scope, receive, send):
+        scope["route"] = Route
+        await send({"type": "http.response.start", "status": 200})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def discard(message):
+        pass
+
+    def per_request(asgi, number=20000) -> float:
+        async def run():
+            for _ in range(number):
+                await asgi({"type": "http", "path": "/questions/1/answer", "method": "POST"}, None, discard)
+        return benchutil.timed(lambda: asyncio.run(run())) / number
+
+    benchutil.report("bare ASGI stub, per request", per_request(stub))
+    benchutil.report("stub behind MetricsMiddleware, per request", per_request(MetricsMiddleware(stub)))
+
+    def noop():
+        return None
+    instrumented = timed(noop)
+    benchutil.report("plain function call", benchutil.timed(noop, number=100000))
+    benchutil.report("timed() storage call", benchutil.timed(instrumented, number=100000))
+    benchutil.report("histogram observation", benchutil.timed(lambda: db_query_seconds.observe(0.0003, "bench"), number=100000))
+    benchutil.report("render /metrics", benchutil.timed(render, number=200))
+
+    async def feed_requests(number=500):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for _ in range(number):
+                response = await client.get("/questions", params={"limit": 20})
+                response.raise_for_status()
+    benchutil.report("GET /questions?limit=20, full app", benchutil.timed(lambda: asyncio.run(feed_requests()), repeat=3) / 500)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Pooled connections vs. opening a connection per call.
+
+    python scripts/bench_pool.py [--ops 2000] [--threads 4]
+
+"connect per call" replays the original get_db: sqlite3.connect, run one
+statement, commit and close. "pooled" goes through db.get_db and the
+ConnectionPool.
+"""
+import argparse
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import benchutil
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    path = benchutil.temp_database()
+    from backend import db
+    benchutil.seed(100)
+    user_id = db.create_user("bench", "bench@example.com", "x")
+
+    def connect_per_call(sql, params):
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            row = conn.execute(sql, params).fetchone()
+            conn.commit()
+            return row
+        finally:
+            conn.close()
+
+    def pooled(sql, params):
+        with db.get_db() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    read = ("SELECT * FROM users WHERE user_id = ?", (user_id,))
+    insert = ("INSERT INTO answers (question_id, user_id, message, timestamp) VALUES (1, ?, 'bench', ?)",
+              (user_id, datetime.utcnow().isoformat()))
+
+    def threaded(run, sql, params):
+        def work(_):
+            for _ in range(args.ops // args.threads):
+                run(sql, params)
+        with ThreadPoolExecutor(args.threads) as pool:
+            list(pool.map(work, range(args.threads)))
+
+    for label, run in (("connect per call", connect_per_call), ("pooled", pooled)):
+        benchutil.report(f"{label}: read by id", benchutil.timed(lambda: run(*read), number=args.ops))
+        benchutil.report(f"{label}: single-row insert", benchutil.timed(lambda: run(*insert), number=args.ops // 4))
+        benchutil.report(
+            f"{label}: read, {args.threads} threads",
+            benchutil.timed(lambda: threaded(run, *read), repeat=3) / args.ops,
+        )
+    db.close_pool()
+
+if __name__ == "__main__":
+    main()
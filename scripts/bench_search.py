@@ -0,0 +1,76 @@
+"""Full-text search latency over a Zipf-distributed corpus.
+
+    python scripts/bench_search.py [--questions 100000] [--answers 100000]
+
+Rows are bulk-loaded with the FTS triggers deferred, and both indexes are
+then rebuilt the way init_db backfills an existing database; that rebuild
+is timed too. Each query runs through to_match_query and
+db.search_questions, as GET /questions/search does, for one 20-result
+page. Word ``wN`` is the N-th most frequent; the last term of a query is
+prefix-matched, so "w12" also matches w120, w1200 and so on.
+"""
+import argparse
+import itertools
+import random
+import statistics
+import time
+
+import benchutil
+
+VOCABULARY = 20000
+QUERIES = ["w5000", "w500", "w50", "w5", "w50 w500", "w12"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--answers", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    benchutil.temp_database()
+    from backend import db
+    from backend.routers.questions import to_match_query
+    db.init_db()
+
+    rng = random.Random(2)
+    words = [f"w{i}" for i in range(VOCABULARY)]
+    weights = list(itertools.accumulate(1 / (i + 1) for i in range(VOCABULARY)))
+
+    def text(length):
+        return " ".join(rng.choices(words, cum_weights=weights, k=length))
+
+    with db.get_db() as conn:
+        conn.execute("UPDATE meta SET value = 1 WHERE key = 'fts_deferred'")
+        conn.executemany(
+            "INSERT INTO questions (user_id, message, timestamp, status) VALUES (NULL, ?, ?, ?)",
+            ((text(12), f"2024-01-01T{i:09d}", rng.choice(("Pending", "Escalated", "Answered"))) for i in range(args.questions)),
+        )
+        conn.executemany(
+            "INSERT INTO answers (question_id, user_id, message, timestamp) VALUES (?, NULL, ?, ?)",
+            ((rng.randint(1, args.questions), text(15), f"2024-02-01T{i:09d}") for i in range(args.answers)),
+        )
+        conn.execute("UPDATE meta SET value = 0 WHERE key = 'fts_deferred'")
+    started = time.perf_counter()
+    with db.get_db() as conn:
+        conn.execute("INSERT INTO questions_fts (questions_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO answers_fts (answers_fts) VALUES ('rebuild')")
+    benchutil.report(f"backfill {args.questions + args.answers} rows", time.perf_counter() - started)
+
+    total = args.questions + args.answers
+    for query in QUERIES:
+        match = to_match_query(query)
+        with db.get_db() as conn:
+            hits = sum(
+                conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {table} MATCH ?", (match,)).fetchone()[0]
+                for table in ("questions_fts", "answers_fts")
+            )
+        runs = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            results = db.search_questions(match, 21)
+            runs.append(time.perf_counter() - started)
+        benchutil.report(f"{query!r}: {hits / total:6.2%} of rows, {len(results)} results, p50", statistics.median(runs))
+    db.close_pool()
+
+if __name__ == "__main__":
+    main()
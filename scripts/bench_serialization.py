@@ -0,0 +1,73 @@
+"""Feed serialization: pydantic models vs. plain dicts with orjson.
+
+    python scripts/bench_serialization.py [--questions 5000] [--answers 3]
+
+The rows are loaded once; only the encoding is timed, per feed item. The
+pydantic row replays the path before serialization.py: a QuestionResponse
+with nested AnswerResponse models per row, dumped with a TypeAdapter. The
+other rows project the same rows with question_to_dict and encode them
+with orjson (if installed) and with the stdlib fallback. All three bodies
+are checked to decode to the same data.
+"""
+import argparse
+import json
+from typing import List
+
+import benchutil
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=5000)
+    parser.add_argument("--answers", type=int, default=3, help="answers per question")
+    args = parser.parse_args()
+
+    benchutil.temp_database()
+    from pydantic import TypeAdapter
+    from backend import db
+    from backend.schemas import AnswerResponse, QuestionResponse
+    from backend.serialization import dumps, orjson, question_to_dict
+    benchutil.seed(args.questions, args.answers)
+    questions, answers = db.get_all_questions_with_answers()
+    adapter = TypeAdapter(List[QuestionResponse])
+
+    def question_to_response(question, answers=()) -> QuestionResponse:
+        return QuestionResponse(
+            question_id=question["question_id"],
+            user_id=question["user_id"],
+            username=question["username"],
+            message=question["message"],
+            timestamp=question["timestamp"],
+            status=question["status"],
+            answers=[
+                AnswerResponse(
+                    answer_id=a["answer_id"], question_id=a["question_id"], user_id=a["user_id"],
+                    username=a["username"], message=a["message"], timestamp=a["timestamp"],
+                )
+                for a in answers
+            ],
+        )
+
+    def pydantic_models():
+        return adapter.dump_json([question_to_response(q, answers.get(q["question_id"], ())) for q in questions])
+
+    def plain_dicts(encode):
+        return lambda: encode([question_to_dict(q, answers.get(q["question_id"], ())) for q in questions])
+
+    def stdlib(obj):
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    rows = [("pydantic models + TypeAdapter", pydantic_models), ("question_to_dict + stdlib json", plain_dicts(stdlib))]
+    if orjson is not None:
+        rows.append(("question_to_dict + orjson", plain_dicts(dumps)))
+    bodies = [json.loads(func()) for _, func in rows]
+    assert all(body == bodies[0] for body in bodies)
+
+    print(f"{len(questions)} questions, {args.answers} answers each, per feed item")
+    for label, func in rows:
+        benchutil.report(label, benchutil.timed(func) / len(questions))
+    if orjson is None:
+        print("orjson is not installed; install it for the fast path")
+    db.close_pool()
+
+if __name__ == "__main__":
+    main()
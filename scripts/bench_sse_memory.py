@@ -0,0 +1,85 @@
+"""Server memory per idle client: SSE streams vs. WebSockets.
+
+    python scripts/bench_sse_memory.py [--clients 2000] [--port 8770]
+
+Starts uvicorn on the app once per transport with the connection caps
+and rate limits off. It opens one client, takes the server's anonymous
+RSS as the baseline, opens ``--clients`` more, and reports the growth per
+client. Each SSE client is a plain HTTP GET of /questions/events held
+open after the retry frame. Each WebSocket is a websockets client with
+its own pings disabled. Linux only (reads /proc/<pid>/status). Raise
+``ulimit -n`` above twice the client count.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+import benchutil
+import websockets
+
+def rss_anon_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1])
+    raise RuntimeError("RssAnon not in /proc/<pid>/status")
+
+async def open_sse(port: int):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /questions/events HTTP/1.1\r\nHost: bench\r\nAccept: text/event-stream\r\n\r\n")
+    await reader.readuntil(b"retry: ")
+    return writer
+
+async def open_ws(port: int):
+    return await websockets.connect(f"ws://127.0.0.1:{port}/ws/questions", ping_interval=None)
+
+async def measure(pid: int, connect, clients: int) -> float:
+    held = [await connect()]
+    await asyncio.sleep(1)
+    baseline = rss_anon_kb(pid)
+    for start in range(0, clients, 250):
+        held += await asyncio.gather(*(connect() for _ in range(min(250, clients - start))))
+    await asyncio.sleep(2)
+    return (rss_anon_kb(pid) - baseline) / clients
+
+def run(label: str, open_client, args) -> float:
+    directory = os.path.dirname(benchutil.temp_database())
+    env = dict(
+        os.environ, WS_MAX_CONNECTIONS="0", WS_MAX_CONNECTIONS_PER_IP="0", RATE_LIMIT_ENABLED="false",
+        EVENT_BUS_PATH=os.path.join(directory, "events.db"), WEBHOOK_URL="",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(args.port), "--log-level", "warning",
+         "--backlog", "4096"],
+        cwd=benchutil.ROOT, env=env,
+    )
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{args.port}/health").read()
+                break
+            except OSError:
+                time.sleep(0.1)
+        kb = asyncio.run(measure(server.pid, lambda: open_client(args.port), args.clients))
+    finally:
+        server.terminate()
+        server.wait()
+    print(f"{label:<12} {kb:8.1f} KB per idle client")
+    return kb
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8770)
+    args = parser.parse_args()
+    print(f"{args.clients} clients, server anonymous RSS growth")
+    websocket = run("WebSocket", open_ws, args)
+    sse = run("SSE", open_sse, args)
+    print(f"SSE / WebSocket: {sse / websocket:.2f}")
+
+if __name__ == "__main__":
+    main()
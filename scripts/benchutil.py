@@ -0,0 +1,67 @@
+"""Shared setup for the benchmark scripts in this directory.
+
+Import this before anything from ``backend``: settings are read at import
+time, so ``temp_database`` has to set DATABASE_URL first.
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+def temp_database(name: str = "bench.db") -> str:
+    """Point DATABASE_URL at a fresh file in a temp directory and return its path."""
+    path = os.path.join(tempfile.mkdtemp(prefix="qa-bench-"), name)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return path
+
+def records(questions: int, answers_per_question: int, seed: int = 1) -> list:
+    """Questions in the export/import format, oldest first."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    out = []
+    for i in range(questions):
+        timestamp = start + timedelta(seconds=i)
+        status = rng.choice(("Pending", "Pending", "Answered", "Escalated"))
+        out.append({
+            "message": f"question {i} about topic {rng.randrange(500)}",
+            "timestamp": timestamp.isoformat(),
+            "status": status,
+            "answered_at": timestamp.isoformat() if status == "Answered" else None,
+            "answers": [
+                {"message": f"answer {j} to question {i}", "timestamp": (timestamp + timedelta(milliseconds=j)).isoformat()}
+                for j in range(answers_per_question)
+            ],
+        })
+    return out
+
+def seed(questions: int, answers_per_question: int = 0, chunk: int = 5000):
+    """Create the schema and bulk-load rows through db.import_questions."""
+    from backend import db
+    db.init_db()
+    rows = records(questions, answers_per_question)
+    for start in range(0, len(rows), chunk):
+        db.import_questions(rows[start:start + chunk])
+
+def timed(func, repeat: int = 5, number: int = 1) -> float:
+    """Median seconds per call of ``func`` over ``repeat`` runs of ``number`` calls."""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        runs.append((time.perf_counter() - started) / number)
+    return statistics.median(runs)
+
+def report(label: str, seconds: float):
+    if seconds >= 1:
+        print(f"{label:<50} {seconds:9.2f} s")
+    elif seconds >= 1e-3:
+        print(f"{label:<50} {seconds * 1e3:9.2f} ms")
+    else:
+        print(f"{label:<50} {seconds * 1e6:9.1f} us")
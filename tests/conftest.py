@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are read when backend modules are imported, so point them at a
+# scratch directory before any test module imports the app.
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='qa-tests-')}/qa.db"
+os.environ["WEBHOOK_URL"] = ""
+os.environ["ARCHIVE_DATABASE_PATH"] = ""
+
+from backend import db
+from backend.cache import feed_cache, token_cache, user_cache
+from backend.ratelimit import limiter
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A freshly migrated SQLite database, used by every db.py helper."""
+    monkeypatch.setattr(db, "DATABASE_PATH", str(tmp_path / "qa.db"))
+    for cache in (user_cache, token_cache, feed_cache):
+        cache.clear()
+    db.init_db()
+    yield db
+    db.close_pool()
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limits():
+    # The limiter is process-wide; one test's requests must not use up another's budget.
+    limiter._buckets.clear()
@@ -0,0 +1,23 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.routers.auth import require_user
+
+# Operational endpoints expose per-client and delivery details.
+ADMIN_ONLY = ["/ws/stats", "/ratelimit/stats", "/db/stats", "/archive/stats", "/webhooks/stats"]
+
+@pytest.fixture
+def client():
+    # No startup: these requests must be refused before touching storage.
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+@pytest.mark.parametrize("path", ADMIN_ONLY)
+def test_anonymous_is_rejected(client, path):
+    assert client.get(path).status_code == 401
+
+@pytest.mark.parametrize("path", ADMIN_ONLY)
+def test_non_admin_is_rejected(client, path):
+    app.dependency_overrides[require_user] = lambda: {"user_id": 2, "role": "user"}
+    assert client.get(path).status_code == 403
@@ -0,0 +1,70 @@
+from contextlib import contextmanager
+
+import pytest
+
+from backend import db
+
+CUTOFF = "2024-06-01T00:00:00"
+
+@pytest.fixture
+def answered(database):
+    database.import_questions([
+        {"message": f"question {i}", "timestamp": f"2024-01-0{i}T00:00:00", "status": "Answered",
+         "answered_at": f"2024-01-0{i}T12:00:00", "answers": [{"message": f"answer {i}", "timestamp": f"2024-01-0{i}T12:00:00"}]}
+        for i in range(1, 4)
+    ])
+    return [q["question_id"] for q in database.get_all_questions()][::-1]
+
+def during_archive_copy(monkeypatch, action):
+    """Run ``action`` once, right after archive_answered_batch commits its copy."""
+    get_db = db.get_db
+
+    class Connection:
+        def __init__(self, conn):
+            self.conn = conn
+
+        def cursor(self):
+            return self.conn.cursor()
+
+        def commit(self):
+            self.conn.commit()
+            monkeypatch.setattr(db, "get_db", get_db)
+            action()
+
+    @contextmanager
+    def hooked():
+        with get_db() as conn:
+            yield Connection(conn)
+    monkeypatch.setattr(db, "get_db", hooked)
+
+def archived(database):
+    with database.get_db() as conn:
+        questions = [row[0] for row in conn.execute("SELECT question_id FROM archive.questions ORDER BY question_id")]
+        answers = [row[0] for row in conn.execute("SELECT question_id FROM archive.answers ORDER BY question_id")]
+    return questions, answers
+
+def test_archive_moves_answered_questions(database, answered):
+    assert database.archive_answered_batch(CUTOFF, 10) == 3
+    assert archived(database) == (answered, answered)
+    assert database.get_all_questions() == []
+    assert database.get_stats()["archived_questions"] == 3
+
+@pytest.mark.parametrize("answer_again", [False, True])
+def test_question_reopened_during_the_copy_stays_live(database, answered, monkeypatch, answer_again):
+    first, second, third = answered
+
+    def reopen():
+        database.update_question_status(second, "Pending")
+        if answer_again:
+            database.update_question_status(second, "Answered")
+    during_archive_copy(monkeypatch, reopen)
+
+    assert database.archive_answered_batch(CUTOFF, 10) == 2
+    assert archived(database) == ([first, third], [first, third])
+    (live,) = database.get_all_questions()
+    assert live["question_id"] == second
+    assert live["status"] == ("Answered" if answer_again else "Pending")
+    assert [a["message"] for a in database.get_answers_for_question(second)] == ["answer 2"]
+    stats = database.get_stats()
+    assert stats["archived_questions"] == database.get_archive_counts()["archived_questions"] == 2
+    assert database.rebuild_stats()["totals"] == 0
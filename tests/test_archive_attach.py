@@ -0,0 +1,43 @@
+import asyncio
+import sqlite3
+
+from backend import db, migrations
+from backend.event_bus import SQLiteEventBus
+
+def test_pooled_connections_attach_the_archive(database, tmp_path):
+    with database.get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM archive.questions").fetchone()[0] == 0
+    assert (tmp_path / "qa_archive.db").exists()
+
+def test_other_connections_do_not_create_an_archive(tmp_path):
+    conn = db.get_connection(str(tmp_path / "other.db"))
+    conn.close()
+    assert sorted(p.name for p in tmp_path.iterdir() if p.suffix == ".db") == ["other.db"]
+
+def test_event_bus_leaves_no_archive_file(tmp_path):
+    async def scenario():
+        bus = SQLiteEventBus(str(tmp_path / "bus.db"), poll_interval=0.01)
+        delivered = []
+
+        async def deliver(text, seq):
+            delivered.append(text)
+        await bus.start(deliver)
+        await bus.publish("hello", None)
+        await asyncio.sleep(0.1)
+        await bus.stop()
+        return delivered
+    assert asyncio.run(scenario()) == ["hello"]
+    assert not list(tmp_path.glob("*_archive.db"))
+
+def test_migrations_cli_attaches_archive_only_to_apply(tmp_path, capsys):
+    path = str(tmp_path / "app.db")
+    migrations.main(["--db", path, "status"])
+    assert not list(tmp_path.glob("*_archive.db"))
+
+    archive = tmp_path / "elsewhere.db"
+    migrations.main(["--db", path, "apply", "--no-analyze", "--archive", str(archive)])
+    assert archive.exists()
+    assert not list(tmp_path.glob("*_archive.db"))
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == migrations.SCHEMA_VERSION
+    conn.close()
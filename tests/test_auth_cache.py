@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from backend.cache import token_cache, user_cache
+from backend.config import JWT_ALGORITHM, JWT_SECRET
+from backend.main import app
+from backend.routers.auth import create_access_token, decode_user_id, load_user
+
+def test_role_change_takes_effect_on_the_next_request(database):
+    client = TestClient(app)
+    user_id = database.create_user("alice", "alice@example.com", "x")
+    headers = {"Authorization": f"Bearer {create_access_token(user_id)}"}
+    assert client.get("/auth/me", headers=headers).json()["role"] == "user"
+    assert client.get("/ws/stats", headers=headers).status_code == 403
+
+    database.update_user_role(user_id, "admin")
+    assert client.get("/auth/me", headers=headers).json()["role"] == "admin"
+    assert client.get("/ws/stats", headers=headers).status_code == 200
+
+def test_password_change_drops_the_cached_user(database):
+    user_id = database.create_user("alice", "alice@example.com", "old-hash")
+    assert asyncio.run(load_user(user_id))["password"] == "old-hash"
+    assert user_cache.get(user_id) is not None
+
+    database.update_user_password(user_id, "new-hash")
+    assert user_cache.get(user_id) is None
+    assert asyncio.run(load_user(user_id))["password"] == "new-hash"
+
+def test_token_is_not_cached_past_its_expiry():
+    expires = int(time.time()) + 1
+    token = jwt.encode({"user_id": 5, "exp": expires}, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    assert decode_user_id(token) == 5
+    assert token_cache.get(token) == 5
+    # jose compares whole seconds, so wait until the expiry second is over.
+    time.sleep(expires + 1.05 - time.time())
+    assert token_cache.get(token) is None
+    assert decode_user_id(token) is None
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import memory_db
+from backend.main import app
+from backend.memory_db import MemoryEngine
+from backend.routers import questions
+from backend.routers.auth import require_admin
+
+URL = "http://receiver.test/hook"
+
+@pytest.fixture(params=["sqlite", "memory"])
+def engine(request, monkeypatch):
+    monkeypatch.setattr(memory_db, "WEBHOOK_URL", URL)
+    if request.param == "memory":
+        return MemoryEngine()
+    database = request.getfixturevalue("database")
+    monkeypatch.setattr(database, "WEBHOOK_URL", URL)
+    return database
+
+def outbox(engine):
+    rows = engine.claim_webhooks(1000, 60)
+    return [(row["event"], json.loads(row["payload"])) for row in rows]
+
+def test_mixed_found_missing_and_duplicate_ids(engine):
+    first = engine.create_question("first")
+    second = engine.create_question("second")
+    engine.claim_webhooks(1000, 60)  # drop the new_question events
+    ids = [second["question_id"], 999, first["question_id"], second["question_id"], 999]
+
+    result = engine.update_questions_status(ids, "Escalated")
+
+    assert [q["question_id"] for q in result["questions"]] == [second["question_id"], first["question_id"]]
+    assert all(q["status"] == "Escalated" for q in result["questions"])
+    assert result["not_found"] == [999]
+    change = result["change"]
+    assert change["type"] == "status_update"
+    assert [q["question_id"] for q in change["data"]] == [second["question_id"], first["question_id"]]
+    # One legacy event per updated question, never one per duplicate id.
+    assert outbox(engine) == [
+        ("question_escalated", {"question_id": q["question_id"], "message": q["message"], "timestamp": q["timestamp"]})
+        for q in (second, first)
+    ]
+
+def test_nothing_found_changes_nothing(engine):
+    version = engine.get_data_version()
+    result = engine.update_questions_status([998, 999, 998], "Answered")
+    assert result == {"questions": [], "not_found": [998, 999], "change": None}
+    assert engine.get_data_version() == version
+    assert outbox(engine) == []
+
+def test_endpoint_reports_each_distinct_id_once(database, monkeypatch):
+    question = database.create_question("only one")
+    broadcasts = []
+
+    async def broadcast(message):
+        broadcasts.append(message)
+    monkeypatch.setattr(questions.manager, "broadcast", broadcast)
+    app.dependency_overrides[require_admin] = lambda: {"user_id": 1, "role": "admin"}
+    try:
+        response = TestClient(app).post(
+            "/questions/bulk-status",
+            json={"question_ids": [question["question_id"], 404, question["question_id"]], "status": "Answered"},
+        )
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["updated"], body["not_found"]) == (1, 1)
+    assert [(r["question_id"], r["result"]) for r in body["results"]] == [
+        (question["question_id"], "updated"), (404, "not_found"),
+    ]
+    assert body["results"][0]["question"]["status"] == "Answered"
+    assert [[q["question_id"] for q in message["data"]] for message in broadcasts] == [[question["question_id"]]]
@@ -0,0 +1,26 @@
+from backend.cache import VersionedCache
+
+def test_newer_version_drops_older_entries():
+    cache = VersionedCache(maxsize=256, ttl=60)
+    for params in range(10):
+        cache.set((1, params), f"body {params}")
+    assert cache.get((1, 3)) == "body 3"
+    assert cache.get((2, 3)) is None
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["evictions"] == 10
+
+def test_store_for_stale_version_is_ignored():
+    cache = VersionedCache(maxsize=256, ttl=60)
+    cache.set((5, "feed"), "current")
+    cache.set((4, "feed"), "stale")
+    assert cache.get((4, "feed")) is None
+    assert cache.get((5, "feed")) == "current"
+    assert cache.stats()["size"] == 1
+
+def test_clear_forgets_the_version():
+    cache = VersionedCache(maxsize=256, ttl=60)
+    cache.set((9, "feed"), "body")
+    cache.clear()
+    # A fresh database starts its data_version again from zero.
+    cache.set((0, "feed"), "body")
+    assert cache.get((0, "feed")) == "body"
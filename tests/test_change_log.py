@@ -0,0 +1,107 @@
+import asyncio
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import compaction, websocket_manager
+from backend.compaction import ChangeLogCompactor
+from backend.main import app
+from backend.memory_db import MemoryEngine
+from backend.routers.auth import require_admin
+
+@pytest.fixture(params=["sqlite", "memory"])
+def engine(request):
+    if request.param == "memory":
+        return MemoryEngine()
+    return request.getfixturevalue("database")
+
+@pytest.fixture
+def client(database):
+    for i in range(5):
+        database.create_question(f"question {i}")
+    return TestClient(app)
+
+def test_compact_changes_keeps_the_newest(engine):
+    seqs = [engine.create_question(f"question {i}")["change"]["seq"] for i in range(10)]
+    assert engine.compact_changes(20) == 0
+    assert engine.compact_changes(4) == 6
+    changes, floor, latest = engine.get_changes_since(0, 100)
+    assert [c["seq"] for c in changes] == seqs[-4:]
+    assert (floor, latest) == (seqs[5], seqs[-1])
+    # Already compacted: nothing more to delete, and the floor never goes back.
+    assert engine.compact_changes(4) == 0
+    assert engine.compact_changes(8) == 0
+    assert engine.get_changes_since(0, 100)[1] == seqs[5]
+
+def test_changes_pages_after_since(client):
+    body = client.get("/questions/changes", params={"since": 0, "limit": 3}).json()
+    assert [c["data"]["message"] for c in body["changes"]] == ["question 0", "question 1", "question 2"]
+    assert body["has_more"] and not body["resync"]
+    rest = client.get("/questions/changes", params={"since": body["changes"][-1]["seq"]}).json()
+    assert [c["data"]["message"] for c in rest["changes"]] == ["question 3", "question 4"]
+    assert rest["latest_seq"] == rest["changes"][-1]["seq"] and not rest["has_more"]
+
+def test_resync_below_the_floor_after_compaction(client, database):
+    latest = client.get("/questions/changes", params={"since": 0}).json()["latest_seq"]
+    database.compact_changes(2)
+    floor = latest - 2
+    assert client.get("/questions/changes", params={"since": floor - 1}).json() == {
+        "changes": [], "latest_seq": latest, "resync": True, "has_more": False,
+    }
+    body = client.get("/questions/changes", params={"since": floor}).json()
+    assert [c["seq"] for c in body["changes"]] == [latest - 1, latest] and not body["resync"]
+
+def test_websocket_since_replays_missed_changes(client):
+    seqs = [c["seq"] for c in client.get("/questions/changes", params={"since": 0}).json()["changes"]]
+    with client.websocket_connect(f"/ws/questions?since={seqs[2]}") as ws:
+        replayed = [ws.receive_json(), ws.receive_json()]
+    assert [(m["type"], m["seq"], m["data"]["message"]) for m in replayed] == [
+        ("new_question", seqs[3], "question 3"), ("new_question", seqs[4], "question 4"),
+    ]
+
+def test_websocket_since_below_the_floor_gets_resync(client, database, monkeypatch):
+    latest = client.get("/questions/changes", params={"since": 0}).json()["latest_seq"]
+    database.compact_changes(2)
+    with client.websocket_connect("/ws/questions?since=0") as ws:
+        assert ws.receive_json() == {"type": "resync", "seq": latest}
+    # Too far behind for one replay counts the same.
+    monkeypatch.setattr(websocket_manager, "CHANGES_MAX_REPLAY", 1)
+    with client.websocket_connect(f"/ws/questions?since={latest - 2}") as ws:
+        assert ws.receive_json() == {"type": "resync", "seq": latest}
+
+def test_compactor_records_and_logs_failures(monkeypatch, caplog):
+    calls = []
+
+    async def compact_changes(keep):
+        calls.append(keep)
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return 3
+
+    monkeypatch.setattr(compaction, "compact_changes", compact_changes)
+
+    async def scenario():
+        compactor = ChangeLogCompactor(keep=7, interval=0.01)
+        await compactor.start()
+        while len(calls) < 2:
+            await asyncio.sleep(0.01)
+        await compactor.stop()
+        return compactor.stats()
+
+    with caplog.at_level(logging.ERROR, logger="backend.compaction"):
+        stats = asyncio.run(scenario())
+    # The loop keeps going after a failure.
+    assert calls[:2] == [7, 7]
+    assert stats["failures"] == 1
+    assert stats["last_error"] == "RuntimeError('database is locked')"
+    assert stats["runs"] >= 1 and stats["compacted"] == 3 * stats["runs"]
+    assert "change log compaction failed" in caplog.text
+
+def test_compactor_stats_are_on_db_stats(database):
+    app.dependency_overrides[require_admin] = lambda: {"user_id": 1, "role": "admin"}
+    try:
+        stats = TestClient(app).get("/db/stats").json()
+    finally:
+        app.dependency_overrides.clear()
+    assert stats["change_log"]["last_error"] is None
@@ -0,0 +1,196 @@
+import json
+
+import pytest
+
+from backend.memory_db import MemoryEngine
+
+FIELDS = ("question_id", "user_id", "username", "message", "timestamp", "status", "answered_at")
+WORDS = ["cache", "pool", "replica", "vacuum", "socket", "index"]
+STATUSES = ["Pending", "Escalated", "Answered"]
+
+def records():
+    # Pairs share a timestamp, so question_id has to break ties.
+    out = []
+    for i in range(30):
+        timestamp = f"2024-01-01T00:{i // 2:02d}:00"
+        status = STATUSES[i % 3]
+        out.append({
+            "message": f"{WORDS[i % 6]} {WORDS[(i * 5) % 6]} question {i}",
+            "timestamp": timestamp,
+            "status": status,
+            "answered_at": f"2024-02-01T00:{i:02d}:00" if status == "Answered" else None,
+            "username": ["alice", "bob", None][i % 3],
+            "answers": [
+                {"message": f"try the {WORDS[(i + j) % 6]} settings", "timestamp": f"2024-01-02T00:{i:02d}:{j:02d}",
+                 "username": "bob" if j else None}
+                for j in range(i % 4)
+            ],
+        })
+    return out
+
+def seed(engine):
+    engine.create_user("alice", "alice@example.com", "x")
+    engine.create_user("bob", "bob@example.com", "x", "admin")
+    engine.import_questions(records())
+    return engine
+
+@pytest.fixture(params=["sqlite", "memory"])
+def engine(request):
+    if request.param == "memory":
+        return seed(MemoryEngine())
+    return seed(request.getfixturevalue("database"))
+
+@pytest.fixture
+def engines(database):
+    return seed(database), seed(MemoryEngine())
+
+def plain(row) -> dict:
+    return {key: dict(row)[key] for key in FIELDS}
+
+def walk(engine, limit, status=None, include_archived=False) -> list:
+    ids, after = [], None
+    while True:
+        page, after = engine.get_questions_page(limit, after, status, include_archived)
+        ids += [q["question_id"] for q in page]
+        if after is None:
+            return ids
+
+def feed_order(engine, include_archived=False) -> list:
+    questions = engine.get_all_questions_with_answers(include_archived)[0]
+    return [q["question_id"] for q in questions]
+
+def test_feed_puts_escalated_first_then_newest(engine):
+    questions = [plain(q) for q in engine.get_all_questions()]
+    newest = sorted(questions, key=lambda q: (q["timestamp"], q["question_id"]), reverse=True)
+    assert questions == sorted(newest, key=lambda q: q["status"] != "Escalated")
+    assert [q["question_id"] for q in questions] == feed_order(engine)
+    assert {q["username"] for q in questions} == {"alice", "bob", None}
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 30, 200])
+def test_cursor_walk_matches_the_full_feed(engine, limit):
+    assert walk(engine, limit) == feed_order(engine)
+
+@pytest.mark.parametrize("status", STATUSES)
+def test_status_pages_hold_only_that_status(engine, status):
+    ids = walk(engine, 3, status)
+    assert len(ids) == 10
+    assert ids == [q for q in feed_order(engine) if engine.get_question_by_id(q)["status"] == status]
+
+def test_answers_come_in_timestamp_order(engine):
+    question_ids = feed_order(engine)
+    batched = engine.get_answers_for_questions(question_ids)
+    for question_id in question_ids:
+        answers = [dict(a) for a in engine.get_answers_for_question(question_id)]
+        assert [a["answer_id"] for a in answers] == [a["answer_id"] for a in batched.get(question_id, [])]
+        assert [a["timestamp"] for a in answers] == sorted(a["timestamp"] for a in answers)
+
+def search(engine, match, limit=50, offset=0, status=None):
+    return [(r["question_id"], r["snippet"]) for r in engine.search_questions(match, limit, offset, status)]
+
+def test_search_hits_questions_and_answers(engine):
+    hits = dict(search(engine, '"vacuum"'))
+    questions = {q["question_id"]: q["message"] for q in engine.get_all_questions()}
+    answered = {a["question_id"] for answers in engine.get_answers_for_questions(list(questions)).values()
+                for a in answers if "vacuum" in a["message"]}
+    assert set(hits) == {q for q, m in questions.items() if "vacuum" in m} | answered
+    assert all("\x02vacuum\x03" in snippet for snippet in hits.values())
+
+def test_search_prefix_status_and_offset(engine):
+    everything = search(engine, '"repl"*')
+    assert everything and all("\x02replica\x03" in snippet for _, snippet in everything)
+    assert search(engine, '"repl"') == []
+    paged = search(engine, '"repl"*', 3) + search(engine, '"repl"*', 3, 3) + search(engine, '"repl"*', 50, 6)
+    assert paged == everything
+    escalated = {q for q, _ in search(engine, '"repl"*', status="Escalated")}
+    assert escalated and all(engine.get_question_by_id(q)["status"] == "Escalated" for q in escalated)
+
+def test_archive_moves_old_answered_questions(engine):
+    before = engine.get_stats()
+    # Answered questions are i % 3 == 2, answered 2024-02-01T00:<i>:00.
+    assert engine.archive_answered_batch("2024-02-01T00:10:00", 2) == 2
+    assert engine.archive_answered_batch("2024-02-01T00:10:00", 100) == 1
+    assert engine.archive_answered_batch("2024-02-01T00:10:00", 100) == 0
+    assert engine.get_archive_counts() == {"hot_questions": 27, "archived_questions": 3}
+    stats = engine.get_stats()
+    assert stats["by_status"]["Answered"] == before["by_status"]["Answered"] - 3
+    assert stats["archived_questions"] == 3
+    archived = set(feed_order(engine, True)) - set(feed_order(engine))
+    assert len(archived) == 3 and all(engine.get_question_by_id(q) is None for q in archived)
+    assert walk(engine, 4, include_archived=True) == feed_order(engine, True)
+    assert engine.rebuild_stats() == {"totals": 0, "answer_counts": 0, "users": 0}
+
+def export(engine, include_archived=False) -> list:
+    return [json.loads(json.dumps(q)) for batch in engine.iter_export(include_archived, 7) for q in batch]
+
+def without_ids(question: dict) -> dict:
+    question = {key: value for key, value in question.items() if key != "question_id"}
+    question["answers"] = [{k: v for k, v in a.items() if k not in ("answer_id", "question_id")} for a in question["answers"]]
+    return question
+
+def test_export_then_import_round_trips(engine):
+    engine.archive_answered_batch("2024-02-01T00:10:00", 100)
+    exported = export(engine, include_archived=True)
+    assert len(exported) == 30 and len(export(engine)) == 27
+    assert [q["question_id"] for q in exported] == sorted(q["question_id"] for q in exported)
+
+    assert engine.import_questions(exported) == {"questions": 30, "answers": sum(i % 4 for i in range(30))}
+    # New ids past the existing ones, same content and authors.
+    copies = export(engine)[27:]
+    assert min(q["question_id"] for q in copies) > max(q["question_id"] for q in exported)
+    assert [without_ids(q) for q in copies] == [without_ids(q) for q in exported]
+    assert engine.get_stats()["total"] == 57
+    assert engine.rebuild_stats() == {"totals": 0, "answer_counts": 0, "users": 0}
+
+def test_changes_follow_writes_and_compaction(engine):
+    question = engine.create_question("new", 1, "alice")
+    answer = engine.create_answer(question["question_id"], "reply", 2, "bob")
+    status = engine.update_question_status(question["question_id"], "Escalated")
+    bulk = engine.update_questions_status([question["question_id"], 999], "Answered")
+    seqs = [c["change"]["seq"] for c in (question, answer, status, bulk)]
+    assert seqs == list(range(seqs[0], seqs[0] + 4))
+
+    changes, floor, latest = engine.get_changes_since(seqs[0] - 1, 100)
+    assert [c["type"] for c in changes] == ["new_question", "new_answer", "status_update", "status_update"]
+    assert latest == seqs[-1] and floor == 0
+    assert engine.get_changes_since(seqs[0], 2)[0] == changes[1:3]
+    assert changes[2]["data"]["previous_status"] == "Pending"
+    assert [q["previous_status"] for q in changes[3]["data"]] == ["Escalated"]
+
+    logged = len(engine.get_changes_since(0, 1000)[0])
+    assert engine.compact_changes(1) == logged - 1
+    changes, floor, latest = engine.get_changes_since(0, 100)
+    assert [c["seq"] for c in changes] == [latest] and floor == latest - 1
+
+def test_stats_track_writes_and_rebuild_finds_no_drift(engine):
+    alice = engine.get_user_by_username("alice")["user_id"]
+    bob = engine.get_user_by_username("bob")["user_id"]
+    before = engine.get_stats()
+    question_id = engine.create_question("more", alice, "alice")["question_id"]
+    engine.create_answer(question_id, "reply", bob, "bob")
+    engine.update_question_status(question_id, "Escalated")
+
+    stats = engine.get_stats()
+    assert stats["by_status"]["Escalated"] == before["by_status"]["Escalated"] + 1
+    assert stats["total"] == before["total"] + 1 == 31
+    assert stats["unanswered"] == stats["by_status"]["Pending"] + stats["by_status"]["Escalated"]
+    assert stats["answers"] == before["answers"] + 1
+    assert engine.get_user_stats(alice) == {"questions": 11, "answers": 0}
+    assert engine.get_user_stats(bob) == {"questions": 10, "answers": sum(max(i % 4 - 1, 0) for i in range(30)) + 1}
+    assert [u["username"] for u in stats["top_users"]] == ["bob", "alice"]
+    assert engine.rebuild_stats() == {"totals": 0, "answer_counts": 0, "users": 0}
+
+def test_engines_agree(engines):
+    sqlite, memory = engines
+    for engine in engines:
+        engine.archive_answered_batch("2024-02-01T00:10:00", 100)
+    assert [plain(q) for q in sqlite.get_all_questions()] == [plain(q) for q in memory.get_all_questions()]
+    for status in [None] + STATUSES:
+        assert walk(sqlite, 4, status) == walk(memory, 4, status)
+    assert walk(sqlite, 4, include_archived=True) == walk(memory, 4, include_archived=True)
+    for match in ['"cache"', '"pool" "que"*', '"settings"', '"i"*']:
+        expected = sqlite.search_questions(match, 50)
+        got = memory.search_questions(match, 50)
+        assert [(r["question_id"], r["snippet"]) for r in got] == [(r["question_id"], r["snippet"]) for r in expected]
+        assert [r["score"] for r in got] == pytest.approx([r["score"] for r in expected])
+    assert export(sqlite, True) == export(memory, True)
+    assert sqlite.get_stats() == memory.get_stats()
@@ -0,0 +1,156 @@
+import asyncio
+import itertools
+import random
+
+import pytest
+
+from backend.event_bus import EventBus, LocalEventBus, SQLiteEventBus
+from backend.serialization import dumps_text, loads
+from backend.websocket_manager import ConnectionManager
+
+WORKERS = 3
+CLIENTS_PER_WORKER = 2
+
+class FakeSocket:
+    def __init__(self):
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.received.append(loads(text))
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+async def start_workers(bus_path):
+    """One manager per simulated worker process, all sharing one bus file."""
+    managers, sockets = [], []
+    for _ in range(WORKERS):
+        manager = ConnectionManager(
+            bus=SQLiteEventBus(bus_path, poll_interval=0.01), heartbeat_interval=0, keepalive_interval=0,
+        )
+        await manager.start()
+        for _ in range(CLIENTS_PER_WORKER):
+            socket = FakeSocket()
+            assert await manager.connect(socket)
+            sockets.append(socket)
+        managers.append(manager)
+    return managers, sockets
+
+async def wait_for(sockets, count, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while any(len(socket.received) < count for socket in sockets):
+        assert asyncio.get_running_loop().time() < deadline, [len(socket.received) for socket in sockets]
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+
+async def stop_workers(managers):
+    for manager in managers:
+        for socket in list(manager.active_connections):
+            manager.disconnect(socket)
+        await manager.stop()
+
+def event(seq, worker):
+    return {"type": "new_question", "seq": seq, "data": {"question_id": seq, "worker": worker}}
+
+def test_interleaved_publishes_reach_every_client_once_in_order(tmp_path):
+    async def scenario():
+        managers, sockets = await start_workers(str(tmp_path / "bus.db"))
+        try:
+            total = 60
+            for seq in range(1, total + 1):
+                # Round-robin the publisher, like requests landing on different workers.
+                await managers[seq % WORKERS].broadcast(event(seq, seq % WORKERS))
+            await wait_for(sockets, total)
+            for socket in sockets:
+                assert [message["seq"] for message in socket.received] == list(range(1, total + 1))
+        finally:
+            await stop_workers(managers)
+    asyncio.run(scenario())
+
+def test_concurrent_publishes_arrive_in_seq_order(tmp_path):
+    async def scenario():
+        managers, sockets = await start_workers(str(tmp_path / "bus.db"))
+        try:
+            # The first seq a worker sees is its starting point; a running
+            # server set that long ago.
+            await managers[0].broadcast(event(1, 0))
+            await wait_for(sockets, 1)
+            seqs = itertools.count(2)
+            total = 121
+
+            async def publish(worker):
+                # Take a seq, then yield before publishing, the way a request
+                # commits its change and then awaits the broadcast. Other
+                # workers' later seqs routinely reach the bus first.
+                for _ in range((total - 1) // WORKERS):
+                    seq = next(seqs)
+                    await asyncio.sleep(random.random() * 0.005)
+                    await managers[worker].broadcast(event(seq, worker))
+            await asyncio.gather(*(publish(worker) for worker in range(WORKERS)))
+            await wait_for(sockets, total)
+            for socket in sockets:
+                assert [message["seq"] for message in socket.received] == list(range(1, total + 1))
+        finally:
+            await stop_workers(managers)
+    asyncio.run(scenario())
+
+def test_a_seq_published_late_is_delivered_before_later_ones(tmp_path):
+    async def scenario():
+        managers, sockets = await start_workers(str(tmp_path / "bus.db"))
+        try:
+            await managers[0].broadcast(event(10, 0))
+            await wait_for(sockets, 1)
+            await managers[1].broadcast(event(12, 1))
+            await managers[2].broadcast(event(13, 2))
+            await asyncio.sleep(0.05)
+            await managers[0].broadcast(event(11, 0))
+            await wait_for(sockets, 4)
+            for socket in sockets:
+                assert [message["seq"] for message in socket.received] == [10, 11, 12, 13]
+        finally:
+            await stop_workers(managers)
+    asyncio.run(scenario())
+
+def test_a_gap_that_never_fills_is_released_after_the_window():
+    async def scenario():
+        delivered = []
+
+        async def deliver(text, seq):
+            delivered.append(seq)
+        bus = LocalEventBus()
+        bus.reorder_window = 0.05
+        await bus.start(deliver)
+        await bus.publish("a", 1)
+        await bus.publish("c", 3)
+        await bus.publish("stats", None)
+        assert delivered == [1, None]
+        await asyncio.sleep(0.1)
+        await bus.publish("d", 4)
+        await bus.stop()
+        return delivered
+    assert asyncio.run(scenario()) == [1, None, 3, 4]
+
+def test_event_bus_is_abstract():
+    with pytest.raises(TypeError):
+        EventBus()
+
+def test_late_worker_starts_after_existing_events(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "bus.db")
+        managers, sockets = await start_workers(path)
+        try:
+            await managers[0].broadcast(event(1, 0))
+            await wait_for(sockets, 1)
+            late, late_sockets = await start_workers(path)
+            managers += late
+            await managers[1].broadcast(event(2, 1))
+            await wait_for(sockets + late_sockets, 1)
+            await wait_for(sockets, 2)
+            # A worker that joins later does not replay the bus history.
+            assert all([m["seq"] for m in s.received] == [2] for s in late_sockets)
+        finally:
+            await stop_workers(managers)
+    asyncio.run(scenario())
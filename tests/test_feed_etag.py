@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.cache import feed_cache
+from backend.main import app
+
+@pytest.fixture
+def client(database):
+    database.create_question("first")
+    return TestClient(app)
+
+def test_if_none_match_returns_304(client):
+    response = client.get("/questions")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    again = client.get("/questions", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert again.content == b""
+    assert client.get("/questions", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+    assert client.get("/questions", headers={"If-None-Match": '"other"'}).status_code == 200
+
+def test_etag_depends_on_the_query(client):
+    assert client.get("/questions").headers["ETag"] != client.get("/questions", params={"limit": 5}).headers["ETag"]
+
+@pytest.mark.parametrize("write", ["question", "answer", "status"])
+def test_a_write_changes_the_etag(client, database, write):
+    question_id = database.create_question("second")["question_id"]
+    response = client.get("/questions")
+    etag = response.headers["ETag"]
+    if write == "question":
+        database.create_question("third")
+    elif write == "answer":
+        database.create_answer(question_id, "an answer")
+    else:
+        database.update_question_status(question_id, "Escalated")
+
+    response = client.get("/questions", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    if write == "question":
+        assert [q["message"] for q in response.json()] == ["third", "second", "first"]
+
+def test_entries_from_older_versions_are_dropped(client, database):
+    for params in ({}, {"limit": 1}, {"status": "Pending"}):
+        client.get("/questions", params=params)
+    assert feed_cache.stats()["size"] == 3
+
+    database.create_question("second")
+    evictions = feed_cache.stats()["evictions"]
+    assert len(client.get("/questions").json()) == 2
+    stats = feed_cache.stats()
+    assert stats["size"] == 1
+    assert stats["evictions"] == evictions + 3
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+STATUSES = ("Pending", "Escalated", "Answered")
+
+@pytest.fixture
+def feed(database):
+    # Pairs of questions share a timestamp so question_id has to break ties.
+    start = datetime(2024, 1, 1)
+    database.import_questions([
+        {
+            "message": f"question {i}",
+            "timestamp": (start + timedelta(minutes=i // 2)).isoformat(),
+            "status": STATUSES[i % 3],
+            "answered_at": None,
+        }
+        for i in range(300)
+    ])
+    return database
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params):
+        self.statements.append((sql, params))
+
+    def fetchall(self):
+        return []
+
+def query_plan(db, where, params, after=None):
+    cursor = RecordingCursor()
+    db._feed_segment(cursor, where, params, after, 21)
+    (sql, bound), = cursor.statements
+    with db.get_db() as conn:
+        return " | ".join(row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", bound))
+
+@pytest.mark.parametrize("after", [None, (1, "2024-01-01T01:00:00", 120)])
+@pytest.mark.parametrize("rank", [0, 1])
+def test_unfiltered_segments_walk_feed_index(feed, rank, after):
+    plan = query_plan(feed, f"{feed.FEED_RANK} = ?", [rank], after)
+    assert "idx_questions_feed" in plan
+    assert "USE TEMP B-TREE" not in plan
+
+@pytest.mark.parametrize("after", [None, (1, "2024-01-01T01:00:00", 120)])
+def test_status_segment_walks_status_index(feed, after):
+    plan = query_plan(feed, "q.status = ?", ["Answered"], after)
+    assert "idx_questions_status_feed" in plan
+    assert "USE TEMP B-TREE" not in plan
+
+def walk(db, limit, status=None, between_pages=None):
+    ids, after = [], None
+    while True:
+        rows, after = db.get_questions_page(limit, after, status)
+        ids += [row["question_id"] for row in rows]
+        if after is None:
+            return ids
+        if between_pages:
+            between_pages()
+
+@pytest.mark.parametrize("status", [None, *STATUSES])
+@pytest.mark.parametrize("limit", [1, 7, 50, 1000])
+def test_pages_concatenate_to_full_feed(feed, status, limit):
+    expected = [
+        row["question_id"] for row in feed.get_all_questions()
+        if status is None or row["status"] == status
+    ]
+    assert walk(feed, limit, status) == expected
+
+@pytest.mark.parametrize("status", [None, "Pending"])
+def test_inserts_between_pages_cause_no_duplicates_or_gaps(feed, status):
+    expected = [
+        row["question_id"] for row in feed.get_all_questions()
+        if status is None or row["status"] == status
+    ]
+    inserted = []
+    ids = walk(feed, 13, status, between_pages=lambda: inserted.append(feed.create_question("posted mid-walk")["question_id"]))
+    assert len(set(ids)) == len(ids)
+    # Every row that existed when the walk began comes back once, in order.
+    # A new row only shows up if it sorts after the cursor it was posted
+    # behind (a Pending question while the walk is still in the escalated
+    # segment).
+    assert [question_id for question_id in ids if question_id not in inserted] == expected
+    assert set(ids) - set(expected) <= set(inserted)
+    if status == "Pending":
+        assert not set(ids) & set(inserted)
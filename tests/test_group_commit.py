@@ -0,0 +1,51 @@
+import asyncio
+import sqlite3
+
+from backend.async_db import WriteCoalescer
+
+def test_failing_op_rolls_back_alone(database):
+    question_id = database.create_question("existing")["question_id"]
+    version = database.get_data_version()
+
+    results = database.run_write_batch([
+        ("create_question", ("first",)),
+        ("create_answer", (question_id, "an answer")),
+        # Fails after its question row and version bump, on logging the change.
+        ("create_question", ("broken", None, object())),
+        ("create_question", ("second",)),
+    ])
+
+    first, answer, failed, second = results
+    assert isinstance(failed, TypeError)
+    assert first["question_id"] != second["question_id"]
+    assert answer["question_id"] == question_id
+    # The failed op left no row, change or version bump behind.
+    assert [q["message"] for q in database.get_all_questions()] == ["second", "first", "existing"]
+    assert database.get_data_version() == version + 3
+    changes, _, _ = database.get_changes_since(0, 100)
+    assert [c["type"] for c in changes] == ["new_question", "new_question", "new_answer", "new_question"]
+    assert [c["seq"] for c in changes[1:]] == [first["change"]["seq"], answer["change"]["seq"], second["change"]["seq"]]
+
+def test_concurrent_callers_each_get_their_own_row(database):
+    coalescer = WriteCoalescer(max_batch=8, max_delay_ms=5)
+
+    async def submit(i):
+        try:
+            return await coalescer.submit("create_question", None if i == 13 else f"question {i}")
+        except sqlite3.IntegrityError as exc:
+            return exc
+
+    async def scenario():
+        results = await asyncio.gather(*(submit(i) for i in range(40)))
+        await coalescer.stop()
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert isinstance(results.pop(13), sqlite3.IntegrityError)
+    assert [r["message"] for r in results] == [f"question {i}" for i in range(40) if i != 13]
+    assert len({r["question_id"] for r in results}) == 39
+    stored = {q["question_id"]: q["message"] for q in database.get_all_questions()}
+    assert stored == {r["question_id"]: r["message"] for r in results}
+    assert coalescer.ops == 40 and coalescer.flushes < 40
+    assert coalescer.max_flush_size <= 8
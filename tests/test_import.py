@@ -0,0 +1,55 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.routers import questions
+from backend.routers.auth import require_admin
+from backend.routers.questions import parse_import_line
+
+VALID = {"message": "hello", "timestamp": "2024-01-01T00:00:00"}
+
+@pytest.mark.parametrize("record, error", [
+    ({**VALID, "username": ["alice"]}, "username must be a string"),
+    ({**VALID, "username": 7}, "username must be a string"),
+    ({**VALID, "status": "Answered", "answered_at": {"at": 1}}, "answered_at must be a string"),
+    ({**VALID, "answers": [{**VALID, "username": {"name": "bob"}}]}, "answer username must be a string"),
+    ({**VALID, "answers": [{"message": "no timestamp"}]}, "answers must be objects with message and timestamp"),
+    ({**VALID, "status": "Closed"}, "invalid status 'Closed'"),
+])
+def test_invalid_fields_are_rejected(record, error):
+    with pytest.raises(ValueError, match=error):
+        parse_import_line(json.dumps(record).encode())
+
+def test_null_username_and_answered_at_are_accepted():
+    record = parse_import_line(json.dumps({**VALID, "username": None, "answered_at": None}).encode())
+    assert record["status"] == "Pending" and record["answers"] == []
+
+def test_bad_lines_are_reported_and_the_rest_imported(database, monkeypatch):
+    async def broadcast(message):
+        pass
+    monkeypatch.setattr(questions.manager, "broadcast", broadcast)
+    app.dependency_overrides[require_admin] = lambda: {"user_id": 1, "role": "admin"}
+    lines = [
+        {**VALID, "message": "first", "username": "nobody"},
+        {**VALID, "username": ["alice"]},
+        {**VALID, "message": "second", "answers": [{**VALID, "message": "an answer"}]},
+        {**VALID, "status": "Answered", "answered_at": 1704067200},
+        {**VALID, "answers": [{**VALID, "username": 3}]},
+    ]
+    try:
+        response = TestClient(app).post("/questions/import", content="\n".join(json.dumps(line) for line in lines))
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "imported_questions": 2, "imported_answers": 1, "error_count": 3,
+        "errors": [
+            {"line": 2, "error": "username must be a string"},
+            {"line": 4, "error": "answered_at must be a string"},
+            {"line": 5, "error": "answer username must be a string"},
+        ],
+    }
+    assert sorted(q["message"] for q in database.get_all_questions()) == ["first", "second"]
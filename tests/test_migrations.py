@@ -0,0 +1,116 @@
+import pytest
+
+from backend import db, migrations
+from backend.migrations import SCHEMA_VERSION, migrate, pending, schema_version
+
+@pytest.fixture
+def path(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DATABASE_PATH", str(tmp_path / "qa.db"))
+    yield db.DATABASE_PATH
+    db.close_pool()
+
+@pytest.fixture
+def conn(path):
+    conn = db.get_connection(path, db.archive_path(path))
+    yield conn
+    conn.close()
+
+def seed_version_2(conn):
+    # Rows as they looked before answered_at and the stats counters.
+    migrate(conn, 2, run_analyze=False)
+    conn.executemany("INSERT INTO users (username, email, password) VALUES (?, ?, 'x')",
+                     [(f"user{i}", f"user{i}@example.com") for i in range(1, 8)])
+    for i in range(1, 21):
+        conn.execute("INSERT INTO questions (user_id, message, timestamp, status) VALUES (?, ?, ?, ?)",
+                     (i % 7 + 1, f"question {i}", f"2024-01-01T00:00:{i:02d}", "Answered" if i % 2 else "Pending"))
+        for j in range(i % 3):
+            conn.execute("INSERT INTO answers (question_id, user_id, message, timestamp) VALUES (?, ?, ?, ?)",
+                         (i, j + 1, f"answer {j}", f"2024-01-02T00:00:{i:02d}"))
+    conn.commit()
+
+def drift(conn) -> int:
+    activity = conn.execute(f"""
+        SELECT COUNT(*) FROM ({migrations.USER_ACTIVITY}) c LEFT JOIN user_stats s USING (user_id)
+        WHERE s.user_id IS NULL OR s.questions != c.questions OR s.answers != c.answers
+    """).fetchone()[0]
+    return activity + migrations.recount_stats(conn.cursor())
+
+def test_pending_and_migrate_in_steps(conn):
+    assert [m[0] for m in pending(conn)] == list(range(1, SCHEMA_VERSION + 1))
+    assert migrate(conn, 2, run_analyze=False) == [1, 2]
+    assert schema_version(conn) == 2
+    assert [m[0] for m in pending(conn)] == list(range(3, SCHEMA_VERSION + 1))
+    assert [m[0] for m in pending(conn, 4)] == [3, 4]
+    assert migrate(conn, run_analyze=False) == list(range(3, SCHEMA_VERSION + 1))
+    assert pending(conn) == []
+    assert migrate(conn) == []
+
+def test_backfills_run_in_short_batches(conn, monkeypatch):
+    seed_version_2(conn)
+    monkeypatch.setattr(migrations, "BACKFILL_BATCH_SIZE", 3)
+    statements = []
+    conn.set_trace_callback(statements.append)
+
+    assert migrate(conn, run_analyze=False) == [3, 4, 5]
+
+    conn.set_trace_callback(None)
+    # Three schema steps, two version bumps and the stats recount, then
+    # batches of 3 over 20 questions (twice) and 7 users, each run ending
+    # with an empty probe.
+    assert statements.count("BEGIN IMMEDIATE") == 3 + 2 + 1 + (7 + 1) * 2 + (3 + 1)
+    rows = {r["question_id"]: r for r in conn.execute("SELECT * FROM questions")}
+    for i, row in rows.items():
+        answered = "2024-01-02T00:00:%02d" % i if i % 3 else "2024-01-01T00:00:%02d" % i
+        assert row["answered_at"] == (answered if i % 2 else None)
+        assert row["answer_count"] == i % 3
+    stats = dict(conn.execute("SELECT key, value FROM stats").fetchall())
+    assert stats["questions:Answered"] == stats["questions:Pending"] == 10
+    assert stats["answers"] == sum(i % 3 for i in range(1, 21))
+    assert drift(conn) == 0
+
+def test_interrupted_backfill_runs_again(conn, monkeypatch):
+    seed_version_2(conn)
+
+    def crash(conn):
+        raise RuntimeError("killed")
+    monkeypatch.setitem(migrations.BACKFILLS, 5, crash)
+    with pytest.raises(RuntimeError):
+        migrate(conn, run_analyze=False)
+    # The schema step committed but the version did not move.
+    assert schema_version(conn) == 4
+    assert migrations.has_column(conn.cursor(), "questions", "answer_count")
+
+    monkeypatch.undo()
+    assert migrate(conn, run_analyze=False) == [5]
+    assert drift(conn) == 0
+
+def test_current_schema_skips_migrate(path, monkeypatch):
+    db.init_db()
+
+    def fail(*args, **kwargs):
+        raise AssertionError("migrate called on a current schema")
+    monkeypatch.setattr(db, "migrate", fail)
+    db.init_db()
+
+def test_outdated_schema_is_refused_without_migrate_on_startup(path, conn, monkeypatch):
+    migrate(conn, 3, run_analyze=False)
+    monkeypatch.setattr(db, "MIGRATE_ON_STARTUP", False)
+    with pytest.raises(RuntimeError, match=f"version 3, expected {SCHEMA_VERSION}"):
+        db.init_db()
+    assert schema_version(conn) == 3
+
+def test_cli_apply_to(path, capsys):
+    migrations.main(["--db", path, "apply", "--to", "3", "--no-analyze"])
+    out = capsys.readouterr().out
+    assert [line.split(":")[0] for line in out.splitlines()[:-1]] == ["applied 1", "applied 2", "applied 3"]
+    assert out.splitlines()[-1] == f"{path}: version 3"
+
+    migrations.main(["--db", path, "status"])
+    assert capsys.readouterr().out.splitlines()[1:] == [
+        f"  pending {version}: {name}" for version, name, _ in migrations.MIGRATIONS[3:]
+    ]
+
+    migrations.main(["--db", path, "apply", "--no-analyze"])
+    assert capsys.readouterr().out.splitlines()[-1] == f"{path}: version {SCHEMA_VERSION}"
+    migrations.main(["--db", path, "apply"])
+    assert capsys.readouterr().out.splitlines()[-1] == f"{path}: version {SCHEMA_VERSION} (nothing to do)"
@@ -0,0 +1,28 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.passwords import hash_password, hash_rounds, hasher
+from backend.routers import auth
+
+@pytest.fixture
+def client(database):
+    yield TestClient(app)
+    hasher.shutdown()
+
+def test_busy_hasher_returns_503_with_retry_after(client, database, monkeypatch):
+    database.create_user("alice", "alice@example.com", hash_password("secret", 4))
+    monkeypatch.setattr(hasher, "in_flight", hasher.max_concurrency + hasher.max_queue)
+    response = client.post("/auth/login", json={"email": "alice@example.com", "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_login_rehashes_outdated_cost(client, database, monkeypatch):
+    monkeypatch.setattr(auth, "BCRYPT_ROUNDS", 5)
+    user_id = database.create_user("alice", "alice@example.com", hash_password("secret", 4))
+    response = client.post("/auth/login", json={"email": "alice@example.com", "password": "secret"})
+    assert response.status_code == 200
+    # The rehash runs as a background task, after the response.
+    stored = database.get_user_by_id(user_id)["password"]
+    assert hash_rounds(stored) == 5
+    assert client.post("/auth/login", json={"email": "alice@example.com", "password": "secret"}).status_code == 200
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.ratelimit import RateLimitMiddleware, RateLimiter, limiter
+from backend.routers import questions
+from backend.routers.auth import create_access_token
+
+# One request per 10 seconds, burst of 2.
+POLICIES = {name: (0.1, 2) for name in ("login", "register", "questions", "answers", "admin")}
+
+def request(middleware, path, method="POST", token=None, host="10.0.0.1"):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    scope = {"type": "http", "method": method, "path": path, "headers": headers, "client": (host, 1234)}
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, None, send))
+    start = sent[0]
+    return start["status"], dict((k.decode(), v.decode()) for k, v in start.get("headers", []))
+
+async def ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200})
+    await send({"type": "http.response.body", "body": b""})
+
+@pytest.fixture
+def middleware():
+    return RateLimitMiddleware(ok, RateLimiter(POLICIES, max_keys=100, max_in_flight=4, enabled=True))
+
+def test_burst_then_429_with_retry_after(middleware):
+    assert [request(middleware, "/questions")[0] for _ in range(2)] == [200, 200]
+    status, headers = request(middleware, "/questions")
+    assert status == 429
+    # One token at 0.1 per second is 10 seconds away, rounded up.
+    assert headers["retry-after"] == "10"
+    assert middleware.limiter.stats()["limited"] == 1
+
+def test_policies_are_separate(middleware):
+    for _ in range(2):
+        request(middleware, "/questions")
+    assert request(middleware, "/questions")[0] == 429
+    assert request(middleware, "/questions/5/answer")[0] == 200
+    assert request(middleware, "/auth/login")[0] == 200
+    # GETs and unmatched routes are not limited.
+    assert request(middleware, "/questions", method="GET")[0] == 200
+    assert request(middleware, "/questions/5/unknown")[0] == 200
+
+def test_users_and_ips_have_their_own_budgets(middleware):
+    alice, bob = create_access_token(1), create_access_token(2)
+    for _ in range(2):
+        request(middleware, "/questions", token=alice)
+    assert request(middleware, "/questions", token=alice, host="10.0.0.9")[0] == 429
+    assert request(middleware, "/questions", token=bob)[0] == 200
+    # Anonymous requests count against the IP, not against a user.
+    assert request(middleware, "/questions")[0] == 200
+    assert request(middleware, "/questions", token="not-a-jwt")[0] == 200
+    assert request(middleware, "/questions")[0] == 429
+    assert request(middleware, "/questions", host="10.0.0.2")[0] == 200
+
+def test_least_recently_seen_key_is_evicted(middleware):
+    middleware.limiter.max_keys = 3
+    for host in ("10.0.0.1", "10.0.0.1", "10.0.0.2", "10.0.0.3"):
+        request(middleware, "/questions", host=host)
+    # 10.0.0.2 is now the oldest; 10.0.0.4 pushes it out.
+    request(middleware, "/questions", host="10.0.0.1")
+    request(middleware, "/questions", host="10.0.0.4")
+    keys = [identity for _, identity in middleware.limiter._buckets]
+    assert keys == ["ip:10.0.0.3", "ip:10.0.0.1", "ip:10.0.0.4"]
+    assert middleware.limiter.stats()["evictions"] == 1
+
+def test_sheds_at_the_in_flight_cap(middleware):
+    middleware.limiter.in_flight = 4
+    status, headers = request(middleware, "/questions", method="GET")
+    assert (status, headers["retry-after"]) == (503, "1")
+    assert request(middleware, "/health", method="GET")[0] == 200
+    assert middleware.limiter.stats()["shed"] == 1
+    middleware.limiter.in_flight = 3
+    assert request(middleware, "/questions", method="GET")[0] == 200
+    assert middleware.limiter.in_flight == 3
+
+def test_long_lived_streams_skip_the_cap_and_the_count(middleware):
+    middleware.limiter.in_flight = 4
+    seen = []
+
+    async def stream(scope, receive, send):
+        seen.append(middleware.limiter.in_flight)
+        await ok(scope, receive, send)
+
+    middleware.app = stream
+    assert request(middleware, "/questions/events", method="GET")[0] == 200
+    assert seen == [4]
+
+def test_app_returns_429_for_question_submissions(database, monkeypatch):
+    monkeypatch.setitem(limiter.policies, "questions", (0.5, 2))
+
+    async def broadcast(message):
+        pass
+    monkeypatch.setattr(questions.manager, "broadcast", broadcast)
+    client = TestClient(app)
+    responses = [client.post("/questions", json={"message": f"question {i}"}) for i in range(3)]
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[2].headers["Retry-After"] == "2"
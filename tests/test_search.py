@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.routers.questions import to_match_query
+
+@pytest.fixture
+def client(database):
+    first = database.create_question("How do I tune the connection pool?")["question_id"]
+    database.create_question("Pool sizing for replicas")
+    third = database.create_question("Where are the logs?")["question_id"]
+    database.create_answer(third, "Check the journald output for the worker")
+    database.update_question_status(first, "Answered")
+    return TestClient(app)
+
+def search(client, **params):
+    response = client.get("/questions/search", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+@pytest.mark.parametrize("q", ['"pool', 'pool"', "pool*", "-pool", "^pool", "(pool", "pool)"])
+def test_fts_punctuation_is_ignored(client, q):
+    # Passed through, each of these would be an FTS5 syntax error.
+    assert len(search(client, q=q)) == 2
+
+@pytest.mark.parametrize("q", ["pool OR", "pool NEAR", "pool AND", "NOT pool"])
+def test_fts_operators_are_searched_as_words(client, q):
+    # No question contains the operator word, so nothing matches.
+    assert search(client, q=q) == []
+
+def test_to_match_query_quotes_terms_and_prefixes_the_last():
+    assert to_match_query('pool OR "tune') == '"pool" "OR" "tune"*'
+    assert to_match_query("*** - ()") is None
+
+def test_punctuation_only_query_returns_nothing(client):
+    assert search(client, q='"*-') == []
+
+def test_last_term_is_a_prefix(client):
+    assert {r["message"] for r in search(client, q="conn")} == {"How do I tune the connection pool?"}
+    assert len(search(client, q="pool conn")) == 1
+    # Only the last term is a prefix.
+    assert search(client, q="conn pool") == []
+
+def test_hit_in_an_answer_only(client):
+    (result,) = search(client, q="journald")
+    assert result["message"] == "Where are the logs?"
+    assert result["snippet"] == "Check the <mark>journald</mark> output for the worker"
+    assert [a["message"] for a in result["answers"]] == ["Check the journald output for the worker"]
+
+def test_status_filter(client):
+    assert sorted(r["status"] for r in search(client, q="pool")) == ["Answered", "Pending"]
+    assert [r["message"] for r in search(client, q="pool", status="Answered")] == ["How do I tune the connection pool?"]
+    assert search(client, q="pool", status="Escalated") == []
+
+def test_cursor_pages_through_every_hit_once(database):
+    for i in range(7):
+        database.create_question(f"replica lag {i}")
+    client = TestClient(app)
+    seen, cursor = [], None
+    while True:
+        params = {"q": "replica", "limit": 3} | ({"cursor": cursor} if cursor else {})
+        response = client.get("/questions/search", params=params)
+        assert response.status_code == 200
+        seen += [r["question_id"] for r in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert len(seen) == 7 == len(set(seen))
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/questions/search", params={"q": "pool", "cursor": "nope"}).status_code == 400
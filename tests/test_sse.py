@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.config import SSE_RETRY_MS
+from backend.main import app
+from backend.routers import questions
+from backend.serialization import dumps_text
+from backend.websocket_manager import ConnectionManager
+
+RETRY = f"retry: {SSE_RETRY_MS}\n\n"
+
+def frame(change):
+    return f"id: {change['seq']}\ndata: {dumps_text(change)}\n\n"
+
+@pytest.fixture
+def changes(database):
+    return [database.create_question(f"question {i}")["change"] for i in range(3)]
+
+def test_replay_after_since_then_live_events(database, changes):
+    async def scenario():
+        manager = ConnectionManager(heartbeat_interval=0, keepalive_interval=0)
+        stream = manager.event_stream(changes[0]["seq"], "ip:client")
+        received = [await anext(stream) for _ in range(3)]
+        live = database.create_question("live")["change"]
+        # A live copy of a replayed change is not sent twice.
+        await manager._deliver(dumps_text(changes[2]), changes[2]["seq"])
+        await manager._deliver(dumps_text(live), live["seq"])
+        received.append(await anext(stream))
+        await stream.aclose()
+        return received, live, manager.stats()
+
+    received, live, stats = asyncio.run(scenario())
+    assert received == [RETRY, frame(changes[1]), frame(changes[2]), frame(live)]
+    assert stats["event_streams"] == stats["distinct_clients"] == 0
+
+def test_keepalive_comment_on_an_idle_stream(database):
+    async def scenario():
+        manager = ConnectionManager(heartbeat_interval=0, keepalive_interval=0.01)
+        await manager.start()
+        stream = manager.event_stream(None, "ip:client")
+        received = [await anext(stream), await asyncio.wait_for(anext(stream), 1)]
+        await stream.aclose()
+        await manager.stop()
+        return received
+
+    assert asyncio.run(scenario()) == [RETRY, ": keep-alive\n\n"]
+
+def test_queue_overflow_ends_the_stream(database, changes):
+    async def scenario():
+        manager = ConnectionManager(heartbeat_interval=0, keepalive_interval=0, stream_queue_size=2)
+        stream = manager.event_stream(None, "ip:client")
+        assert await anext(stream) == RETRY
+        for change in changes:
+            await manager._deliver(dumps_text(change), change["seq"])
+        # Nothing half-delivered: the stream just ends, to be resumed by id.
+        received = [item async for item in stream]
+        return received, manager.stats()
+
+    received, stats = asyncio.run(scenario())
+    assert received == []
+    assert stats["stream_overflows"] == 1
+    assert stats["event_streams"] == stats["distinct_clients"] == 0
+
+@pytest.fixture
+def manager(monkeypatch):
+    manager = ConnectionManager(heartbeat_interval=0, keepalive_interval=0, max_per_ip=1)
+    monkeypatch.setattr(questions, "manager", manager)
+    return manager
+
+def test_last_event_id_takes_precedence_over_since(changes, manager, monkeypatch):
+    stream = manager.event_stream
+
+    async def replay_only(since, key):
+        # The live part never ends on its own; stop after the replay.
+        async for item in stream(since, key):
+            yield item
+            if item.startswith(f"id: {changes[-1]['seq']}\n"):
+                return
+
+    monkeypatch.setattr(manager, "event_stream", replay_only)
+    response = TestClient(app).get(
+        "/questions/events", params={"since": 0}, headers={"Last-Event-ID": str(changes[1]["seq"])}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.text == RETRY + frame(changes[2])
+
+def test_over_capacity_is_refused_with_503(database, manager):
+    manager._register("ip:testclient")
+    response = TestClient(app).get("/questions/events")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert response.json() == {"detail": "Too many connections for this client"}
+    assert manager.stats()["rejected"] == 1
@@ -0,0 +1,35 @@
+import sqlite3
+
+def seed(database):
+    user_id = database.create_user("alice", "alice@example.com", "x")
+    question_id = database.create_question("first", user_id, "alice")["question_id"]
+    database.create_question("second")
+    database.create_answer(question_id, "reply", user_id, "alice")
+    return user_id, question_id
+
+def test_clean_counters_take_no_write_lock(database):
+    seed(database)
+    # Another writer holds the lock; a check that tried to take it would
+    # fail with "database is locked" once the busy timeout ran out.
+    writer = sqlite3.connect(database.DATABASE_PATH, timeout=0)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        with database.get_db() as conn:
+            conn.execute("PRAGMA busy_timeout = 0")
+        assert database.rebuild_stats() == {"totals": 0, "answer_counts": 0, "users": 0}
+    finally:
+        writer.rollback()
+        writer.close()
+
+def test_drift_is_repaired(database):
+    user_id, question_id = seed(database)
+    expected = database.get_stats()
+    with database.get_db() as conn:
+        conn.execute("UPDATE stats SET value = value + 5 WHERE key IN ('answers', 'questions:Pending')")
+        conn.execute("UPDATE questions SET answer_count = 7 WHERE question_id = ?", (question_id,))
+        conn.execute("DELETE FROM user_stats WHERE user_id = ?", (user_id,))
+
+    assert database.rebuild_stats() == {"totals": 2, "answer_counts": 1, "users": 1}
+    assert database.get_stats() == expected
+    assert database.get_user_stats(user_id) == {"questions": 1, "answers": 1}
+    assert database.rebuild_stats() == {"totals": 0, "answer_counts": 0, "users": 0}
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from backend import webhooks
+from backend.webhooks import WebhookDispatcher
+
+URL = "http://receiver.test/hook"
+
+@pytest.fixture
+def outbox(database, monkeypatch):
+    monkeypatch.setattr(database, "WEBHOOK_URL", URL)
+    # No jitter, so each retry delay is exactly backoff_base * 2 ** (attempts - 1).
+    monkeypatch.setattr(webhooks.random, "uniform", lambda low, high: high)
+    return database
+
+class Receiver:
+    """Stand-in endpoint: records every body and answers from ``respond``."""
+
+    def __init__(self, respond=lambda request: httpx.Response(204)):
+        self.bodies = []
+        self.respond = respond
+
+    def __call__(self, request):
+        self.bodies.append(json.loads(request.content))
+        return self.respond(request)
+
+def dispatch(receiver, rounds=1, **options):
+    """Run ``rounds`` dispatch passes against ``receiver``; returns the dispatcher."""
+    dispatcher = WebhookDispatcher(URL, **{"backoff_base": 10, "backoff_max": 1000, **options})
+
+    async def run():
+        dispatcher._client = httpx.AsyncClient(transport=httpx.MockTransport(receiver))
+        try:
+            for _ in range(rounds):
+                await dispatcher._dispatch_due()
+        finally:
+            await dispatcher._client.aclose()
+    asyncio.run(run())
+    return dispatcher
+
+def rows(db):
+    with db.get_db() as conn:
+        return [dict(row) for row in conn.execute("SELECT * FROM webhook_outbox ORDER BY outbox_id")]
+
+def make_due(db):
+    with db.get_db() as conn:
+        conn.execute("UPDATE webhook_outbox SET next_attempt_at = 0")
+
+def test_success_deletes_the_outbox_row(outbox):
+    question = outbox.create_question("hello")
+    receiver = Receiver()
+    dispatcher = dispatch(receiver)
+    assert receiver.bodies == [{
+        "event": "new_question", "question_id": question["question_id"], "message": "hello",
+        "username": None, "timestamp": question["timestamp"],
+    }]
+    assert rows(outbox) == []
+    assert dispatcher.delivered == 1
+
+def server_error(request):
+    return httpx.Response(503)
+
+def timeout(request):
+    raise httpx.ReadTimeout("receiver too slow", request=request)
+
+@pytest.mark.parametrize("respond", [server_error, timeout])
+def test_failures_reschedule_with_growing_backoff(outbox, respond):
+    outbox.create_question("hello")
+    delays = []
+    for attempt in range(1, 4):
+        make_due(outbox)
+        before = time.time()
+        dispatch(Receiver(respond))
+        row, = rows(outbox)
+        assert row["status"] == "pending"
+        assert row["attempts"] == attempt
+        assert row["last_error"]
+        delays.append(row["next_attempt_at"] - before)
+    assert [round(delay) for delay in delays] == [10, 20, 40]
+
+def test_rescheduled_row_is_not_resent_before_it_is_due(outbox):
+    outbox.create_question("hello")
+    dispatch(Receiver(server_error))
+    receiver = Receiver()
+    dispatch(receiver)
+    assert receiver.bodies == []
+    assert rows(outbox)[0]["attempts"] == 1
+
+def test_row_goes_dead_after_max_attempts(outbox):
+    outbox.create_question("hello")
+    for _ in range(3):
+        make_due(outbox)
+        dispatcher = dispatch(Receiver(server_error), max_attempts=3)
+    row, = rows(outbox)
+    assert row["status"] == "dead"
+    assert row["attempts"] == 3
+    assert dispatcher.dead == 1
+    # Dead rows are kept for inspection but never claimed again.
+    make_due(outbox)
+    receiver = Receiver()
+    dispatch(receiver, max_attempts=3)
+    assert receiver.bodies == []
+    assert outbox.get_webhook_outbox_counts() == {"dead": 1}
+
+def test_batches_are_sent_as_an_events_list(outbox):
+    for i in range(3):
+        outbox.create_question(f"question {i}")
+    receiver = Receiver()
+    dispatch(receiver, batch_size=10)
+    body, = receiver.bodies
+    assert [event["event"] for event in body["events"]] == ["new_question"] * 3
+    assert [event["message"] for event in body["events"]] == ["question 0", "question 1", "question 2"]
+    assert rows(outbox) == []
+
+def test_expired_lease_is_reclaimed(outbox):
+    outbox.create_question("hello")
+    # A worker leased the row and died before completing or failing it.
+    assert len(outbox.claim_webhooks(10, lease_seconds=0.2)) == 1
+    receiver = Receiver()
+    dispatch(receiver)
+    assert receiver.bodies == []
+    time.sleep(0.3)
+    dispatch(receiver)
+    assert [body["event"] for body in receiver.bodies] == ["new_question"]
+    assert rows(outbox) == []
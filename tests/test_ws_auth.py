@@ -0,0 +1,48 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.routers.auth import create_access_token
+from backend.websocket_manager import manager
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(manager, "max_per_user", 1)
+    return TestClient(app)
+
+def keys_after(ws, *messages):
+    # The subscribed reply comes back only once everything before it is handled.
+    for message in messages:
+        ws.send_json(message)
+    ws.send_json({"type": "subscribe"})
+    replies = []
+    while True:
+        reply = ws.receive_json()
+        if reply["type"] == "subscribed":
+            return replies, dict(manager._per_key)
+        replies.append(reply)
+
+def test_auth_message_counts_the_socket_as_the_user(client):
+    with client.websocket_connect("/ws/questions") as ws:
+        assert keys_after(ws) == ([], {"ip:testclient": 1})
+        replies, keys = keys_after(ws, {"type": "auth", "token": create_access_token(7)})
+        assert replies == [] and keys == {"user:7": 1}
+
+def test_invalid_token_leaves_the_socket_anonymous(client):
+    with client.websocket_connect("/ws/questions") as ws:
+        replies, keys = keys_after(ws, {"type": "auth", "token": "not-a-jwt"})
+        assert replies == [{"type": "error", "detail": "invalid token"}]
+        assert keys == {"ip:testclient": 1}
+
+def test_auth_over_the_user_limit_closes_the_socket(client):
+    token = create_access_token(7)
+    with client.websocket_connect("/ws/questions") as first:
+        keys_after(first, {"type": "auth", "token": token})
+        with client.websocket_connect("/ws/questions") as second:
+            second.send_json({"type": "auth", "token": token})
+            assert second.receive() == {"type": "websocket.close", "code": 1013, "reason": "Too many connections for this client"}
+        assert keys_after(first)[1] == {"user:7": 1}
+
+def test_query_token_still_works(client):
+    with client.websocket_connect(f"/ws/questions?token={create_access_token(7)}") as ws:
+        assert keys_after(ws)[1] == {"user:7": 1}
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+from backend.serialization import dumps_text
+from backend.websocket_manager import ConnectionManager
+
+class FakeSocket:
+    def __init__(self):
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.received.append(json.loads(text))
+
+async def subscribed_socket(manager, **filters):
+    socket = FakeSocket()
+    await manager.connect(socket)
+    manager.handle_message(socket, json.dumps({"type": "subscribe", **filters}))
+    return socket
+
+async def deliver(manager, *changes):
+    for change in changes:
+        await manager._deliver(dumps_text(change), change["seq"])
+    await asyncio.sleep(0.01)
+
+def events(socket):
+    return [(m["type"], m["data"].get("status")) for m in socket.received if m["type"] != "subscribed"]
+
+def test_escalated_subscriber_sees_both_transitions_and_answers(database):
+    async def scenario():
+        manager = ConnectionManager(heartbeat_interval=0, keepalive_interval=0)
+        escalated = await subscribed_socket(manager, statuses=["Escalated"])
+        pending = await subscribed_socket(manager, statuses=["Pending"], types=["status_update"])
+        question_id = database.create_question("help")["question_id"]
+        await deliver(manager,
+            database.update_question_status(question_id, "Escalated")["change"],
+            database.create_answer(question_id, "on it")["change"],
+            database.update_question_status(question_id, "Answered")["change"],
+        )
+        return events(escalated), events(pending)
+
+    escalated, pending = asyncio.run(scenario())
+    assert escalated == [("status_update", "Escalated"), ("new_answer", None), ("status_update", "Answered")]
+    # Pending -> Escalated leaves Pending; the later change never touched it.
+    assert pending == [("status_update", "Escalated")]
+
+def test_statuses_filter_new_questions_and_bulk_changes(database):
+    async def scenario():
+        manager = ConnectionManager(heartbeat_interval=0, keepalive_interval=0)
+        answered = await subscribed_socket(manager, statuses=["Answered"])
+        first = database.create_question("first")
+        second = database.create_question("second")
+        await deliver(manager, first["change"], second["change"])
+        bulk = database.update_questions_status([first["question_id"], second["question_id"]], "Answered")
+        await deliver(manager, bulk["change"])
+        return answered.received
+
+    received = asyncio.run(scenario())
+    assert [m["type"] for m in received] == ["subscribed", "status_update"]
+    assert [(q["previous_status"], q["status"]) for q in received[1]["data"]] == [("Pending", "Answered")] * 2